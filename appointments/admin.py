@@ -1,8 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from .busqueda import filtro_busqueda_personas
 from .models import (
     Usuario, Paciente, Medico, Especialidad, 
-    Turno, HorarioAtencion, ConfiguracionSistema, ObraSocial
+    Turno, HorarioAtencion, ConfiguracionSistema, ObraSocial, Ausencia
 )
 
 
@@ -40,6 +41,11 @@ class MedicoAdmin(admin.ModelAdmin):
     list_filter = ['activo', 'especialidades']
     search_fields = ['usuario__first_name', 'usuario__last_name', 'matricula']
     filter_horizontal = ['especialidades']
+    autocomplete_fields = ['usuario']
+    list_select_related = ['usuario']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('especialidades')
     
     def get_nombre_completo(self, obj):
         return obj.usuario.get_full_name()
@@ -55,6 +61,16 @@ class PacienteAdmin(admin.ModelAdmin):
     list_display = ['get_nombre_completo', 'get_obra_social', 'numero_afiliado']
     list_filter = ['obra_social_obj']
     search_fields = ['usuario__first_name', 'usuario__last_name', 'usuario__dni']
+    autocomplete_fields = ['usuario', 'obra_social_obj']
+    list_select_related = ['usuario', 'obra_social_obj']
+    ordering = ['usuario__apellido_normalizado', 'usuario__nombre_normalizado', 'id']
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Búsqueda por prefijos sobre columnas indexadas (también la usa el autocompletado)
+        filtro = filtro_busqueda_personas(search_term, 'usuario__')
+        if filtro is None:
+            return queryset, False
+        return queryset.filter(filtro), False
     
     def get_nombre_completo(self, obj):
         return obj.usuario.get_full_name()
@@ -70,6 +86,18 @@ class HorarioAtencionAdmin(admin.ModelAdmin):
     list_display = ['medico', 'get_dia_semana_display', 'hora_inicio', 'hora_fin', 'activo']
     list_filter = ['dia_semana', 'activo']
     search_fields = ['medico__usuario__first_name', 'medico__usuario__last_name']
+    autocomplete_fields = ['medico']
+    list_select_related = ['medico__usuario']
+
+
+@admin.register(Ausencia)
+class AusenciaAdmin(admin.ModelAdmin):
+    list_display = ['medico', 'fecha_inicio', 'fecha_fin', 'hora_inicio', 'hora_fin', 'motivo']
+    list_filter = ['fecha_inicio']
+    search_fields = ['motivo', 'medico__usuario__last_name', 'medico__matricula']
+    autocomplete_fields = ['medico']
+    list_select_related = ['medico__usuario']
+    date_hierarchy = 'fecha_inicio'
 
 
 @admin.register(Turno)
@@ -78,11 +106,13 @@ class TurnoAdmin(admin.ModelAdmin):
     list_filter = ['estado', 'fecha', 'especialidad']
     search_fields = ['paciente__usuario__first_name', 'medico__usuario__first_name']
     date_hierarchy = 'fecha'
+    autocomplete_fields = ['paciente', 'medico', 'especialidad']
+    list_select_related = ['paciente__usuario', 'medico__usuario', 'especialidad']
 
 
 @admin.register(ConfiguracionSistema)
 class ConfiguracionSistemaAdmin(admin.ModelAdmin):
-    list_display = ['nombre_consultorio', 'horario_apertura', 'horario_cierre']
+    list_display = ['nombre_consultorio', 'horario_apertura', 'horario_cierre', 'validacion_automatica']
     
     def has_add_permission(self, request):
         # Solo permitir una configuración
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SistemaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'appointments'
+
+    def ready(self):
+        # Registrar señales
+        from . import signals
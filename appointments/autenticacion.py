@@ -0,0 +1,65 @@
+"""
+Autenticación y control de acceso por rol
+
+PerfilBackend carga el usuario de la sesión junto con su perfil de médico
+o de paciente en una sola consulta (LEFT JOIN a ambas tablas). Como
+AuthenticationMiddleware guarda el resultado en request.user, las vistas
+acceden a request.user.perfil_medico o perfil_paciente sin consultar de
+nuevo la base. ModelBackend sigue en AUTHENTICATION_BACKENDS para no
+cerrar las sesiones que se iniciaron con él; PerfilBackend rechaza las
+credenciales inválidas para que no se verifiquen dos veces.
+
+rol_requerido reemplaza la verificación de rol al comienzo de cada vista
+de los paneles.
+"""
+from functools import wraps
+
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+# Perfiles que se cargan junto con el usuario de la sesión
+CAMPOS_PERFIL = ('perfil_medico', 'perfil_paciente')
+
+
+class PerfilBackend(ModelBackend):
+    """ModelBackend que trae el perfil del usuario en la misma consulta"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        usuario = super().authenticate(request, username=username, password=password, **kwargs)
+        if usuario is None:
+            # Corta la cadena: ModelBackend volvería a calcular el hash de la misma clave
+            raise PermissionDenied
+        return usuario
+
+    def get_user(self, user_id):
+        Usuario = get_user_model()
+        try:
+            usuario = Usuario._default_manager.select_related(*CAMPOS_PERFIL).get(pk=user_id)
+        except Usuario.DoesNotExist:
+            return None
+        return usuario if self.user_can_authenticate(usuario) else None
+
+
+def rol_requerido(rol, respuesta_json=False):
+    """
+    Exige sesión iniciada y el rol indicado. Si el rol no coincide redirige
+    al dashboard con un mensaje, o con respuesta_json responde 403 en JSON
+    (vistas llamadas por AJAX).
+    """
+    def decorador(vista):
+        @login_required
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.user.rol != rol:
+                if respuesta_json:
+                    return JsonResponse({'success': False, 'message': 'No tienes permisos.'}, status=403)
+                messages.error(request, 'No tienes permisos.')
+                return redirect('dashboard')
+            return vista(request, *args, **kwargs)
+        return envoltura
+    return decorador
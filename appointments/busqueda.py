@@ -0,0 +1,73 @@
+"""
+Búsqueda de personas por DNI, apellido y nombre
+
+Compara contra columnas normalizadas (minúsculas y sin acentos) con rangos
+[prefijo, siguiente prefijo), que se resuelven con índices B-tree tanto en
+SQLite como en PostgreSQL. En PostgreSQL con la extensión pg_trgm, las
+palabras de 3 o más letras también se buscan como subcadena usando los
+índices trigram.
+"""
+import unicodedata
+from functools import lru_cache
+from typing import Optional
+
+from django.db import connection
+from django.db.models import Q
+
+# Cantidad de resultados de las búsquedas rápidas (API y autocompletado)
+RESULTADOS_BUSQUEDA = 20
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas, sin acentos y con espacios simples"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return ' '.join(texto.lower().split())
+
+
+@lru_cache(maxsize=None)
+def _trigram_instalado(vendor: str) -> bool:
+    if vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def trigram_disponible() -> bool:
+    return _trigram_instalado(connection.vendor)
+
+
+def _rango_prefijo(campo: str, prefijo: str) -> Q:
+    """Equivale a campo LIKE 'prefijo%' pero como rango, que siempre puede usar el índice"""
+    siguiente = prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+    return Q(**{f'{campo}__gte': prefijo, f'{campo}__lt': siguiente})
+
+
+def filtro_busqueda_personas(termino: Optional[str], prefijo: str = '') -> Optional[Q]:
+    """
+    Q para buscar usuarios por DNI (si el término es numérico), email (si
+    tiene @) o palabras de apellido y nombre. Con prefijo='usuario__' se
+    aplica a perfiles como Paciente. Retorna None si el término está vacío.
+    """
+    termino = normalizar(termino)
+    if not termino:
+        return None
+    if termino.isdigit():
+        return _rango_prefijo(f'{prefijo}dni', termino)
+    if '@' in termino:
+        return Q(**{f'{prefijo}email__istartswith': termino})
+
+    apellido = f'{prefijo}apellido_normalizado'
+    nombre = f'{prefijo}nombre_normalizado'
+    usar_trigram = trigram_disponible()
+
+    # Cada palabra debe coincidir con el apellido o el nombre
+    por_palabras = Q()
+    for palabra in termino.split():
+        if usar_trigram and len(palabra) >= 3:
+            por_palabras &= Q(**{f'{apellido}__contains': palabra}) | Q(**{f'{nombre}__contains': palabra})
+        else:
+            por_palabras &= _rango_prefijo(apellido, palabra) | _rango_prefijo(nombre, palabra)
+    # Apellidos compuestos ("de la fuente") como prefijo completo
+    return _rango_prefijo(apellido, termino) | por_palabras
@@ -0,0 +1,11 @@
+"""
+Procesadores de contexto de las plantillas
+"""
+from django.utils.functional import SimpleLazyObject
+
+from .models import ConfiguracionSistema
+
+
+def configuracion(request):
+    """Configuración del sistema (cacheada), leída solo si la plantilla la usa"""
+    return {'configuracion': SimpleLazyObject(ConfiguracionSistema.actual)}
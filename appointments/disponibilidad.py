@@ -0,0 +1,586 @@
+"""
+Motor de disponibilidad de turnos
+
+Carga de una sola vez los horarios de atención, los turnos que ocupan
+horario y las ausencias y cierres del rango, y calcula los slots libres en
+memoria. La cantidad de consultas no depende de la cantidad de médicos ni
+de slots.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Ausencia, ConfiguracionSistema, HorarioAtencion, Medico, Slot, Turno
+from .utils import es_dia_laboral
+
+# Duración de cada slot de turno
+MINUTOS_SLOT = 30
+DURACION_SLOT = timedelta(minutes=MINUTOS_SLOT)
+
+# Búsqueda del próximo turno: días de turnos leídos por consulta y horizonte máximo
+DIAS_POR_BLOQUE = 14
+DIAS_BUSQUEDA_MAXIMO = 180
+
+# Caché de disponibilidad: vida de cada resultado y de los tokens de invalidación
+SEGUNDOS_CACHE_DISPONIBILIDAD = 60 * 10
+SEGUNDOS_CACHE_TOKENS = 60 * 60 * 24
+CLAVE_ACIERTOS_CACHE = 'disp:stats:aciertos'
+CLAVE_FALLOS_CACHE = 'disp:stats:fallos'
+
+# Turnos que cuentan como carga de un médico en el día
+ESTADOS_CARGA_DIARIA = ('activo', 'en_atencion', 'atendido')
+
+# Todos los minutos del día, para las ausencias de día completo
+MASCARA_DIA_COMPLETO = (1 << 24 * 60) - 1
+
+
+def generar_slots(hora_inicio: time, hora_fin: time) -> List[time]:
+    """Retorna las horas de inicio de cada slot de 30 minutos en [hora_inicio, hora_fin)"""
+    slots = []
+    actual = datetime.combine(date.min, hora_inicio)
+    fin = datetime.combine(date.min, hora_fin)
+    while actual < fin:
+        slots.append(actual.time())
+        actual += DURACION_SLOT
+    return slots
+
+
+def minuto_del_dia(hora: time) -> int:
+    return hora.hour * 60 + hora.minute
+
+
+def mascara_slots(hora_inicio: time, hora_fin: time) -> int:
+    """Bitset con un bit por cada inicio de slot en [hora_inicio, hora_fin)"""
+    mascara = 0
+    minuto_fin = minuto_del_dia(hora_fin)
+    for minuto in range(minuto_del_dia(hora_inicio), minuto_fin, MINUTOS_SLOT):
+        mascara |= 1 << minuto
+    return mascara
+
+
+def mascara_rango(hora_inicio: time, hora_fin: time) -> int:
+    """Bitset con todos los minutos de [hora_inicio, hora_fin)"""
+    return (1 << minuto_del_dia(hora_fin)) - (1 << minuto_del_dia(hora_inicio))
+
+
+def horas_de_mascara(mascara: int) -> List[time]:
+    """Retorna las horas de los bits encendidos, en orden"""
+    horas = []
+    while mascara:
+        bit = mascara & -mascara
+        minuto = bit.bit_length() - 1
+        horas.append(time(minuto // 60, minuto % 60))
+        mascara ^= bit
+    return horas
+
+
+def fin_de_slot(fecha: date, hora: time) -> time:
+    """Hora en que termina el slot que empieza a `hora` (sin pasar de medianoche)"""
+    fin = datetime.combine(fecha, hora) + DURACION_SLOT
+    return fin.time() if fin.date() == fecha else time.max
+
+
+def mascara_ausencia(hora_inicio: Optional[time], hora_fin: Optional[time]) -> int:
+    """
+    Bitset de los minutos bloqueados por una ausencia: todo el día, o los
+    inicios de slot cuyo slot se superpone con [hora_inicio, hora_fin).
+    Sirve tanto para los slots ofrecidos como para los minutos cubiertos.
+    """
+    if hora_inicio is None or hora_fin is None:
+        return MASCARA_DIA_COMPLETO
+    primer_minuto = max(minuto_del_dia(hora_inicio) - MINUTOS_SLOT + 1, 0)
+    return (1 << minuto_del_dia(hora_fin)) - (1 << primer_minuto)
+
+
+class Ausencias:
+    """
+    Ausencias y cierres de un rango de fechas, como intervalos ordenados por
+    fecha de inicio para cada médico (None para los cierres del consultorio).
+
+    Se construye con `cargar()`, una sola consulta por el índice de
+    intervalos de Ausencia.
+    """
+
+    def __init__(self, filas: Iterable[Tuple[Optional[int], date, date, Optional[time], Optional[time]]] = ()):
+        self.por_medico: Dict[Optional[int], List[Tuple[date, date, int]]] = defaultdict(list)
+        for medico_id, fecha_inicio, fecha_fin, hora_inicio, hora_fin in filas:
+            self.por_medico[medico_id].append((fecha_inicio, fecha_fin, mascara_ausencia(hora_inicio, hora_fin)))
+        for intervalos in self.por_medico.values():
+            intervalos.sort(key=lambda intervalo: intervalo[0])
+
+    @classmethod
+    def cargar(cls, fecha_desde: date, fecha_hasta: date, medico_ids: Optional[Iterable[int]] = None):
+        """Ausencias de los médicos (o de todos) y cierres del consultorio que tocan el rango"""
+        ausencias = Ausencia.objects.filter(fecha_fin__gte=fecha_desde, fecha_inicio__lte=fecha_hasta)
+        if medico_ids is not None:
+            ausencias = ausencias.filter(Q(medico__isnull=True) | Q(medico_id__in=list(medico_ids)))
+        return cls(ausencias.values_list('medico_id', 'fecha_inicio', 'fecha_fin', 'hora_inicio', 'hora_fin'))
+
+    def __bool__(self):
+        return bool(self.por_medico)
+
+    def mascara(self, medico_id: int, fecha: date) -> int:
+        """Minutos bloqueados del médico en la fecha, por sus ausencias o por cierres"""
+        mascara = 0
+        for clave in (None, medico_id):
+            for fecha_inicio, fecha_fin, bits in self.por_medico.get(clave, ()):
+                if fecha_inicio > fecha:
+                    break
+                if fecha_fin >= fecha:
+                    mascara |= bits
+        return mascara
+
+
+def filtro_ausencias_slot(fecha: date, hora: time) -> Q:
+    """Q de las ausencias y cierres que se superponen con el slot que empieza en fecha y hora"""
+    return Q(fecha_inicio__lte=fecha, fecha_fin__gte=fecha) & (
+        Q(hora_inicio__isnull=True) | Q(hora_inicio__lt=fin_de_slot(fecha, hora), hora_fin__gt=hora)
+    )
+
+
+def ausencia_en_horario(medico_id: Optional[int], fecha: date, hora: time) -> Optional[Ausencia]:
+    """Retorna la ausencia del médico o el cierre del consultorio que bloquea el slot, o None"""
+    ausencias = Ausencia.objects.filter(filtro_ausencias_slot(fecha, hora))
+    if medico_id:
+        ausencias = ausencias.filter(Q(medico__isnull=True) | Q(medico_id=medico_id))
+    else:
+        ausencias = ausencias.filter(medico__isnull=True)
+    return ausencias.order_by('medico_id').first()
+
+
+class Disponibilidad:
+    """
+    Disponibilidad precargada para un conjunto de médicos en un rango de fechas.
+
+    Cada día de un médico se representa con bitsets de un bit por minuto:
+    los slots que ofrece y los minutos que cubren sus horarios (según sus
+    horarios de atención) y los slots ocupados (según los turnos). Las
+    preguntas sobre toda una especialidad se resuelven con OR/AND entre
+    los bitsets de los médicos. Las ausencias y cierres se suman como
+    minutos bloqueados.
+
+    Se construye con `cargar()`, que ejecuta una consulta para los horarios
+    de atención, otra para los turnos que ocupan horario y otra para las
+    ausencias.
+    """
+
+    def __init__(self, horarios: Iterable[HorarioAtencion], ocupados: Iterable[Tuple[int, date, time]] = ()):
+        self.medicos: Dict[int, Medico] = {}
+        # Por día de la semana: {medico_id: (slots ofrecidos, minutos cubiertos)}
+        self.agenda_semanal: Dict[int, Dict[int, Tuple[int, int]]] = defaultdict(dict)
+        for horario in horarios:
+            self.medicos[horario.medico_id] = horario.medico
+            agenda = self.agenda_semanal[horario.dia_semana]
+            ofrecidos, cubiertos = agenda.get(horario.medico_id, (0, 0))
+            agenda[horario.medico_id] = (
+                ofrecidos | mascara_slots(horario.hora_inicio, horario.hora_fin),
+                cubiertos | mascara_rango(horario.hora_inicio, horario.hora_fin),
+            )
+        self.medico_ids = set(self.medicos)
+        # {(medico_id, fecha): slots ocupados}
+        self.ocupados: Dict[Tuple[int, date], int] = defaultdict(int)
+        self.agregar_ocupados(ocupados)
+        self.ausencias = Ausencias()
+
+    @classmethod
+    def cargar(cls, fecha_desde: date, fecha_hasta: Optional[date] = None, medico_id=None,
+               especialidad_id=None, estados: Iterable[str] = Turno.ESTADOS_OCUPAN_HORARIO):
+        """
+        Carga horarios y turnos ocupados para un médico o una especialidad.
+
+        Si se indica `medico_id` no se filtra por médico activo, igual que
+        la búsqueda por médico de la API.
+        """
+        if fecha_hasta is None:
+            fecha_hasta = fecha_desde
+
+        # Solo los días de la semana que caen dentro del rango
+        dias = {(fecha_desde + timedelta(days=i)).weekday()
+                for i in range(min((fecha_hasta - fecha_desde).days + 1, 7))}
+        disponibilidad = cls.cargar_horarios(medico_id, especialidad_id, dias)
+        disponibilidad.cargar_ocupados(fecha_desde, fecha_hasta, estados)
+        return disponibilidad
+
+    @classmethod
+    def cargar_horarios(cls, medico_id=None, especialidad_id=None, dias: Optional[Iterable[int]] = None):
+        """Carga solo los horarios de atención, sin turnos ocupados"""
+        horarios = HorarioAtencion.objects.filter(activo=True).select_related(
+            'medico__usuario'
+        ).order_by('medico__usuario__last_name', 'medico__usuario__first_name', 'hora_inicio')
+        if medico_id is not None:
+            horarios = horarios.filter(medico_id=medico_id)
+        else:
+            horarios = horarios.filter(
+                medico__especialidades__id=especialidad_id,
+                medico__activo=True
+            )
+        if dias is not None:
+            horarios = horarios.filter(dia_semana__in=list(dias))
+        return cls(horarios)
+
+    def cargar_ocupados(self, fecha_desde: date, fecha_hasta: date,
+                        estados: Iterable[str] = Turno.ESTADOS_OCUPAN_HORARIO):
+        """Reemplaza los turnos ocupados y las ausencias por los del rango indicado"""
+        self.ocupados.clear()
+        self.ausencias = Ausencias()
+        if self.medico_ids:
+            self.agregar_ocupados(Turno.objects.filter(
+                medico_id__in=self.medico_ids,
+                fecha__gte=fecha_desde,
+                fecha__lte=fecha_hasta,
+                estado__in=list(estados)
+            ).values_list('medico_id', 'fecha', 'hora'))
+            self.ausencias = Ausencias.cargar(fecha_desde, fecha_hasta, self.medico_ids)
+
+    def agregar_ocupados(self, ocupados: Iterable[Tuple[int, date, time]]):
+        for medico_id, fecha, hora in ocupados:
+            self.ocupados[(medico_id, fecha)] |= 1 << minuto_del_dia(hora)
+
+    def bloqueados(self, medico_id: int, fecha: date) -> int:
+        """Minutos del médico en la fecha ocupados por turnos o bloqueados por ausencias"""
+        bloqueados = self.ocupados.get((medico_id, fecha), 0)
+        if self.ausencias:
+            bloqueados |= self.ausencias.mascara(medico_id, fecha)
+        return bloqueados
+
+    def slots_libres(self, fecha: date) -> List[Tuple[time, Medico]]:
+        """Retorna (hora, médico) de cada slot libre de la fecha, ordenados por hora"""
+        libres = []
+        for medico_id, (ofrecidos, _) in self.agenda_semanal.get(fecha.weekday(), {}).items():
+            medico = self.medicos[medico_id]
+            for hora in horas_de_mascara(ofrecidos & ~self.bloqueados(medico_id, fecha)):
+                libres.append((hora, medico))
+        # Orden estable: dentro de cada hora se mantiene el orden por apellido
+        libres.sort(key=lambda slot: slot[0])
+        return libres
+
+    def horas_con_medico_libre(self, fecha: date) -> List[time]:
+        """
+        Retorna las horas en las que al menos un médico está libre.
+
+        Una hora candidata (inicio de slot de algún médico) está disponible si
+        algún médico cuyo horario la cubre no tiene turno a esa hora.
+        """
+        candidatas = 0
+        cubiertas_libres = 0
+        for medico_id, (ofrecidos, cubiertos) in self.agenda_semanal.get(fecha.weekday(), {}).items():
+            candidatas |= ofrecidos
+            cubiertas_libres |= cubiertos & ~self.bloqueados(medico_id, fecha)
+        return horas_de_mascara(candidatas & cubiertas_libres)
+
+
+class DisponibilidadMaterializada:
+    """
+    Disponibilidad leída de la tabla Slot con una sola consulta por rango.
+
+    Ofrece la misma interfaz de lectura que Disponibilidad. Cada médico se
+    considera solo en las horas de su propia grilla de slots.
+    """
+
+    def __init__(self, slots: Iterable[Slot]):
+        self.libres_por_fecha: Dict[date, List[Tuple[time, Medico]]] = defaultdict(list)
+        for slot in slots:
+            self.libres_por_fecha[slot.fecha].append((slot.hora, slot.medico))
+
+    @classmethod
+    def cargar(cls, fecha_desde: date, fecha_hasta: Optional[date] = None, medico_id=None, especialidad_id=None):
+        if fecha_hasta is None:
+            fecha_hasta = fecha_desde
+        slots = Slot.objects.filter(
+            fecha__gte=fecha_desde,
+            fecha__lte=fecha_hasta,
+            ocupado=False
+        ).select_related('medico__usuario')
+        if medico_id is not None:
+            slots = slots.filter(medico_id=medico_id)
+        else:
+            slots = slots.filter(
+                medico__especialidades__id=especialidad_id,
+                medico__activo=True
+            )
+        slots = slots.order_by('fecha', 'hora', 'medico__usuario__last_name', 'medico__usuario__first_name')
+        return cls(slots)
+
+    def slots_libres(self, fecha: date) -> List[Tuple[time, Medico]]:
+        return self.libres_por_fecha.get(fecha, [])
+
+    def horas_con_medico_libre(self, fecha: date) -> List[time]:
+        return list(dict.fromkeys(hora for hora, _ in self.slots_libres(fecha)))
+
+
+def fecha_cobertura_slots() -> Optional[date]:
+    """Última fecha generada en la tabla Slot, o None si la tabla no está habilitada"""
+    if not getattr(settings, 'MEDITURNOS_SLOTS_MATERIALIZADOS', False):
+        return None
+    return ConfiguracionSistema.actual().slots_generados_hasta
+
+
+def slots_cubren(fecha_desde: date, fecha_hasta: date, cobertura: Optional[date]) -> bool:
+    """Indica si la tabla Slot, generada hasta `cobertura`, tiene todo el rango (desde hoy en adelante)"""
+    return cobertura is not None and timezone.localdate() <= fecha_desde and fecha_hasta <= cobertura
+
+
+def cargar_disponibilidad(fecha_desde: date, fecha_hasta: Optional[date] = None, medico_id=None,
+                          especialidad_id=None, estados: Iterable[str] = Turno.ESTADOS_OCUPAN_HORARIO):
+    """
+    Retorna la disponibilidad del rango, leída de la tabla Slot si está
+    habilitada y cubre el rango, o calculada desde los horarios de atención.
+
+    La tabla Slot solo registra los estados de Turno.ESTADOS_OCUPAN_HORARIO;
+    con otros estados siempre se calcula.
+    """
+    if fecha_hasta is None:
+        fecha_hasta = fecha_desde
+    if (tuple(estados) == Turno.ESTADOS_OCUPAN_HORARIO
+            and slots_cubren(fecha_desde, fecha_hasta, fecha_cobertura_slots())):
+        return DisponibilidadMaterializada.cargar(fecha_desde, fecha_hasta, medico_id, especialidad_id)
+    return Disponibilidad.cargar(fecha_desde, fecha_hasta, medico_id, especialidad_id, estados)
+
+
+def medicos_disponibles(especialidad_id, fecha: date, hora: time):
+    """
+    Retorna en una sola consulta los médicos activos de la especialidad cuyo
+    horario de atención cubre la hora, que no tienen turno ocupando ese
+    horario ni una ausencia (o cierre del consultorio) que lo bloquee,
+    ordenados por apellido y anotados con `turnos_del_dia`.
+    """
+    horario_cubre = HorarioAtencion.objects.filter(
+        medico=OuterRef('pk'),
+        activo=True,
+        dia_semana=fecha.weekday(),
+        hora_inicio__lte=hora,
+        hora_fin__gt=hora
+    )
+    horario_ocupado = Turno.objects.filter(
+        medico=OuterRef('pk'),
+        fecha=fecha,
+        hora=hora,
+        estado__in=Turno.ESTADOS_OCUPAN_HORARIO
+    )
+    ausente = Ausencia.objects.filter(
+        filtro_ausencias_slot(fecha, hora),
+        Q(medico__isnull=True) | Q(medico=OuterRef('pk'))
+    )
+    return Medico.objects.filter(
+        Exists(horario_cubre),
+        ~Exists(horario_ocupado),
+        ~Exists(ausente),
+        especialidades__id=especialidad_id,
+        activo=True
+    ).annotate(
+        turnos_del_dia=Count(
+            'turnos',
+            filter=Q(turnos__fecha=fecha, turnos__estado__in=ESTADOS_CARGA_DIARIA)
+        )
+    ).select_related('usuario').order_by('usuario__last_name', 'usuario__first_name', 'pk')
+
+
+def buscar_proximos_turnos(especialidad_id, cantidad: int, desde: date,
+                           hora_minima: Optional[time] = None) -> List[Tuple[date, time, Medico]]:
+    """
+    Retorna los primeros `cantidad` turnos libres (fecha, hora, médico) desde una fecha.
+
+    Se ofrece un médico por horario (el primero por apellido). Los horarios se
+    cargan una vez y los turnos ocupados y ausencias se leen en bloques de DIAS_POR_BLOQUE
+    días (o directamente de la tabla Slot si cubre el bloque); la búsqueda
+    termina apenas se completa la cantidad pedida o al superar
+    DIAS_BUSQUEDA_MAXIMO. `hora_minima` descarta horas ya pasadas del
+    primer día.
+    """
+    cobertura = fecha_cobertura_slots()
+    disponibilidad = None
+
+    encontrados = []
+    limite = desde + timedelta(days=DIAS_BUSQUEDA_MAXIMO)
+    inicio_bloque = desde
+    while inicio_bloque < limite:
+        fin_bloque = min(inicio_bloque + timedelta(days=DIAS_POR_BLOQUE - 1), limite)
+        if slots_cubren(inicio_bloque, fin_bloque, cobertura):
+            bloque = DisponibilidadMaterializada.cargar(
+                inicio_bloque, fin_bloque, especialidad_id=especialidad_id
+            )
+        else:
+            if disponibilidad is None:
+                disponibilidad = Disponibilidad.cargar_horarios(especialidad_id=especialidad_id)
+                if not disponibilidad.medico_ids:
+                    return encontrados
+            disponibilidad.cargar_ocupados(inicio_bloque, fin_bloque)
+            bloque = disponibilidad
+
+        fecha = inicio_bloque
+        while fecha <= fin_bloque:
+            if es_dia_laboral(fecha)[0]:
+                horas_vistas = set()
+                for hora, medico in bloque.slots_libres(fecha):
+                    if hora in horas_vistas:
+                        continue
+                    if fecha == desde and hora_minima is not None and hora <= hora_minima:
+                        continue
+                    horas_vistas.add(hora)
+                    encontrados.append((fecha, hora, medico))
+                    if len(encontrados) >= cantidad:
+                        return encontrados
+            fecha += timedelta(days=1)
+
+        inicio_bloque = fin_bloque + timedelta(days=1)
+
+    return encontrados
+
+
+# Caché de disponibilidad
+#
+# Cada resultado se guarda con una clave que incluye dos tokens: uno del
+# médico o especialidad (cambia con sus horarios) y otro de la fecha (cambia
+# con los turnos de ese día). Invalidar es reemplazar el token, así un
+# cálculo que empezó antes de la invalidación queda guardado con el token
+# viejo y nunca se vuelve a leer.
+
+def _clave_token(tipo: str, objeto_id, fecha: Optional[date] = None) -> str:
+    if fecha is None:
+        return f'disp:token:{tipo}:{objeto_id}'
+    return f'disp:token:{tipo}:{objeto_id}:{fecha.isoformat()}'
+
+
+def _obtener_tokens(claves: List[str]) -> Dict[str, str]:
+    tokens = cache.get_many(claves)
+    faltantes = [clave for clave in claves if clave not in tokens]
+    if faltantes:
+        # add() no pisa un token que otro proceso haya renovado mientras tanto
+        for clave in faltantes:
+            cache.add(clave, uuid4().hex, SEGUNDOS_CACHE_TOKENS)
+        tokens.update(cache.get_many(faltantes))
+    return tokens
+
+
+def _renovar_tokens(claves: Iterable[str]):
+    cache.set_many({clave: uuid4().hex for clave in claves}, SEGUNDOS_CACHE_TOKENS)
+
+
+def _contar(clave: str, cantidad: int):
+    if not cantidad:
+        return
+    try:
+        cache.incr(clave, cantidad)
+    except ValueError:
+        if not cache.add(clave, cantidad, None):
+            cache.incr(clave, cantidad)
+
+
+def disponibilidad_cacheada(tipo: str, objeto_id, fechas: Iterable[date], variante: str,
+                            calcular: Callable[[List[date]], Dict[date, object]]) -> Dict[date, object]:
+    """
+    Retorna {fecha: resultado} para un médico (`tipo='medico'`) o una
+    especialidad (`tipo='especialidad'`), leyendo de la caché las fechas
+    guardadas y llamando a `calcular(fechas_faltantes)` una sola vez para el resto.
+
+    `variante` distingue los distintos resultados que se guardan por fecha.
+    """
+    fechas = list(fechas)
+    clave_version = _clave_token(tipo, objeto_id)
+    claves_fecha = {fecha: _clave_token(tipo, objeto_id, fecha) for fecha in fechas}
+    # Los tokens se leen antes de calcular para no guardar resultados invalidados
+    tokens = _obtener_tokens([clave_version] + list(claves_fecha.values()))
+
+    claves = {}
+    for fecha, clave_fecha in claves_fecha.items():
+        if clave_version in tokens and clave_fecha in tokens:
+            claves[fecha] = (f'disp:{variante}:{tipo}:{objeto_id}:{fecha.isoformat()}:'
+                             f'{tokens[clave_version]}:{tokens[clave_fecha]}')
+
+    guardados = cache.get_many(list(claves.values()))
+    resultado = {fecha: guardados[clave] for fecha, clave in claves.items() if clave in guardados}
+    faltantes = [fecha for fecha in fechas if fecha not in resultado]
+    _contar(CLAVE_ACIERTOS_CACHE, len(resultado))
+    _contar(CLAVE_FALLOS_CACHE, len(faltantes))
+
+    if faltantes:
+        calculados = calcular(faltantes)
+        cache.set_many(
+            {claves[fecha]: calculados[fecha] for fecha in faltantes if fecha in claves},
+            SEGUNDOS_CACHE_DISPONIBILIDAD
+        )
+        resultado.update(calculados)
+    return resultado
+
+
+def horas_libres_cacheadas(fechas: Iterable[date], medico_id=None, especialidad_id=None) -> Dict[date, List[str]]:
+    """
+    Retorna {fecha: ['HH:MM', ...]} con las horas en las que algún médico
+    está libre. Las fechas que no están en caché se calculan juntas con una
+    sola carga de disponibilidad.
+    """
+    def calcular(faltantes):
+        disponibilidad = cargar_disponibilidad(
+            min(faltantes), max(faltantes), medico_id=medico_id, especialidad_id=especialidad_id
+        )
+        return {
+            fecha: [hora.strftime('%H:%M') for hora in disponibilidad.horas_con_medico_libre(fecha)]
+            for fecha in faltantes
+        }
+
+    if medico_id is not None:
+        return disponibilidad_cacheada('medico', medico_id, fechas, 'horas', calcular)
+    return disponibilidad_cacheada('especialidad', especialidad_id, fechas, 'horas', calcular)
+
+
+def _especialidades_por_medico(medico_ids) -> Dict[int, List[int]]:
+    especialidades = defaultdict(list)
+    for medico_id, especialidad_id in Medico.especialidades.through.objects.filter(
+        medico_id__in=list(medico_ids)
+    ).values_list('medico_id', 'especialidad_id'):
+        especialidades[medico_id].append(especialidad_id)
+    return especialidades
+
+
+def _renovar_al_confirmar(claves: List[str]):
+    if claves:
+        transaction.on_commit(lambda: _renovar_tokens(claves))
+
+
+def invalidar_agendas(agendas: Iterable[Tuple[int, date]]):
+    """
+    Invalida la disponibilidad cacheada de esos (medico_id, fecha) y de las
+    especialidades de cada médico, al confirmarse la transacción en curso.
+    """
+    agendas = {(medico_id, fecha) for medico_id, fecha in agendas if medico_id}
+    if not agendas:
+        return
+    especialidades = _especialidades_por_medico({medico_id for medico_id, _ in agendas})
+    claves = []
+    for medico_id, fecha in agendas:
+        claves.append(_clave_token('medico', medico_id, fecha))
+        for especialidad_id in especialidades.get(medico_id, []):
+            claves.append(_clave_token('especialidad', especialidad_id, fecha))
+    _renovar_al_confirmar(claves)
+
+
+def invalidar_medicos(medico_ids: Iterable[int], especialidad_ids: Iterable[int] = ()):
+    """
+    Invalida toda la disponibilidad cacheada de los médicos y de sus
+    especialidades (y de `especialidad_ids`, que ya no estén asociadas).
+    """
+    medico_ids = set(medico_ids)
+    especialidad_ids = set(especialidad_ids)
+    for ids in _especialidades_por_medico(medico_ids).values():
+        especialidad_ids.update(ids)
+    _renovar_al_confirmar(
+        [_clave_token('medico', medico_id) for medico_id in medico_ids]
+        + [_clave_token('especialidad', especialidad_id) for especialidad_id in especialidad_ids]
+    )
+
+
+def estadisticas_cache() -> Tuple[int, int]:
+    """Retorna (aciertos, fallos) acumulados de la caché de disponibilidad"""
+    valores = cache.get_many([CLAVE_ACIERTOS_CACHE, CLAVE_FALLOS_CACHE])
+    return valores.get(CLAVE_ACIERTOS_CACHE, 0), valores.get(CLAVE_FALLOS_CACHE, 0)
+
+
+def reiniciar_estadisticas_cache():
+    cache.delete_many([CLAVE_ACIERTOS_CACHE, CLAVE_FALLOS_CACHE])
@@ -0,0 +1,222 @@
+"""
+Estadísticas de turnos precalculadas
+
+EstadisticaDiariaTurnos guarda cuántos turnos hay por día, médico,
+especialidad y estado. Las señales de Turno suman y restan a medida que
+los turnos se crean, cambian de estado o se eliminan, y los cambios hechos
+con update() (validación en lote, rechazo de pendientes) se registran
+explícitamente con registrar_cambios_estado. Las consultas de la página
+de estadísticas leen solo esta tabla.
+
+El comando reconstruir_estadisticas recalcula las filas desde los turnos,
+por ejemplo después de cargas con bulk_create, que no disparan señales.
+
+Los contadores del dashboard de administración y los del mes de cada
+médico se calculan con agregaciones condicionales y se cachean; cualquier
+cambio de turnos registrado aquí invalida los que afecta.
+"""
+from collections import Counter
+from datetime import date, timedelta
+from typing import Iterable, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Especialidad, EstadisticaDiariaTurnos, Medico, Paciente, Turno
+
+# Filas insertadas por sentencia al reconstruir
+FILAS_POR_LOTE = 1000
+
+# Contadores del dashboard de administración
+CLAVE_METRICAS_DASHBOARD = 'dashboard:metricas'
+SEGUNDOS_CACHE_METRICAS = 30
+
+# Contadores del mes en el dashboard de cada médico
+SEGUNDOS_CACHE_CONTADORES_MEDICO = 60 * 10
+
+
+def aplicar_variaciones(variaciones: Counter):
+    """Suma a cada (fecha, medico_id, especialidad_id, estado) su variación"""
+    transaction.on_commit(invalidar_metricas_dashboard)
+    meses_medicos = {(medico_id, fecha) for fecha, medico_id, _, _ in variaciones if medico_id}
+    if meses_medicos:
+        transaction.on_commit(lambda: invalidar_contadores_medicos(meses_medicos))
+    for (fecha, medico_id, especialidad_id, estado), variacion in variaciones.items():
+        if not variacion:
+            continue
+        clave = {'fecha': fecha, 'medico_id': medico_id, 'especialidad_id': especialidad_id, 'estado': estado}
+        if EstadisticaDiariaTurnos.objects.filter(**clave).update(total=F('total') + variacion):
+            continue
+        if variacion < 0:
+            # La fila ya no existe: se borró en cascada con su médico o especialidad
+            continue
+        try:
+            with transaction.atomic():
+                EstadisticaDiariaTurnos.objects.create(total=variacion, **clave)
+        except IntegrityError:
+            # Otra transacción creó la fila entre el update y el insert
+            EstadisticaDiariaTurnos.objects.filter(**clave).update(total=F('total') + variacion)
+
+
+def registrar_turno(turno: Turno, creado: bool = False, eliminado: bool = False):
+    """Refleja en las estadísticas el alta, baja o cambio de un turno"""
+    variaciones = Counter()
+    anterior = None if creado else turno.clave_estadistica(originales=True)
+    actual = None if eliminado else turno.clave_estadistica()
+    if anterior == actual:
+        return
+    if anterior is not None:
+        variaciones[anterior] -= 1
+    if actual is not None:
+        variaciones[actual] += 1
+    aplicar_variaciones(variaciones)
+
+
+def registrar_cambios_estado(turnos: Iterable[Tuple[date, Optional[int], int]], estado_anterior: str, estado_nuevo: str):
+    """Registra el cambio de estado de los (fecha, medico_id, especialidad_id) actualizados con update()"""
+    variaciones = Counter()
+    for fecha, medico_id, especialidad_id in turnos:
+        variaciones[(fecha, medico_id, especialidad_id, estado_anterior)] -= 1
+        variaciones[(fecha, medico_id, especialidad_id, estado_nuevo)] += 1
+    aplicar_variaciones(variaciones)
+
+
+def reconstruir_estadisticas(desde: date = None, hasta: date = None) -> int:
+    """Recalcula las filas del rango de fechas (o todas) desde los turnos. Retorna cuántas quedaron."""
+    turnos = Turno.objects.all()
+    existentes = EstadisticaDiariaTurnos.objects.all()
+    if desde:
+        turnos = turnos.filter(fecha__gte=desde)
+        existentes = existentes.filter(fecha__gte=desde)
+    if hasta:
+        turnos = turnos.filter(fecha__lte=hasta)
+        existentes = existentes.filter(fecha__lte=hasta)
+
+    grupos = turnos.order_by().values('fecha', 'medico_id', 'especialidad_id', 'estado').annotate(cantidad=Count('id'))
+    cantidad = 0
+    with transaction.atomic():
+        existentes.delete()
+        lote = []
+        for grupo in grupos.iterator(chunk_size=FILAS_POR_LOTE):
+            lote.append(EstadisticaDiariaTurnos(
+                fecha=grupo['fecha'], medico_id=grupo['medico_id'],
+                especialidad_id=grupo['especialidad_id'], estado=grupo['estado'], total=grupo['cantidad']
+            ))
+            if len(lote) >= FILAS_POR_LOTE:
+                EstadisticaDiariaTurnos.objects.bulk_create(lote)
+                cantidad += len(lote)
+                lote = []
+        EstadisticaDiariaTurnos.objects.bulk_create(lote)
+        cantidad += len(lote)
+    return cantidad
+
+
+def resumen_estadisticas(desde: date = None, hasta: date = None, desde_meses: date = None) -> dict:
+    """
+    Totales por estado, por especialidad, médicos más solicitados y turnos
+    por mes del rango de fechas, leídos de las estadísticas precalculadas.
+    `desde_meses` limita además la serie mensual.
+    """
+    filas = EstadisticaDiariaTurnos.objects.all()
+    if desde:
+        filas = filas.filter(fecha__gte=desde)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+
+    nombres_estado = dict(Turno.ESTADOS)
+    por_estado = list(filas.values('estado').annotate(total=Sum('total')).filter(total__gt=0).order_by('-total'))
+    for item in por_estado:
+        item['estado_display'] = nombres_estado.get(item['estado'], item['estado'])
+
+    por_mes = filas.filter(fecha__gte=desde_meses) if desde_meses else filas
+    return {
+        'turnos_por_estado': por_estado,
+        'turnos_por_especialidad': filas.values('especialidad__nombre').annotate(
+            total=Sum('total')
+        ).filter(total__gt=0).order_by('-total'),
+        'medicos_populares': filas.filter(medico__isnull=False).values(
+            'medico_id', 'medico__usuario__first_name', 'medico__usuario__last_name'
+        ).annotate(total=Sum('total')).filter(total__gt=0).order_by('-total')[:5],
+        'turnos_por_mes': por_mes.annotate(mes=TruncMonth('fecha')).values('mes').annotate(
+            total=Sum('total')
+        ).order_by('mes'),
+    }
+
+
+def _clave_metricas(fecha: date) -> str:
+    return f'{CLAVE_METRICAS_DASHBOARD}:{fecha.isoformat()}'
+
+
+def metricas_dashboard() -> dict:
+    """
+    Totales de pacientes, médicos y especialidades activos y turnos de hoy
+    por estado. Los de turnos salen de una sola consulta con agregaciones
+    condicionales sobre el índice por fecha.
+    """
+    hoy = timezone.localdate()
+    clave = _clave_metricas(hoy)
+    metricas = cache.get(clave)
+    if metricas is not None:
+        return metricas
+
+    metricas = Turno.objects.filter(fecha=hoy).aggregate(
+        turnos_hoy=Count('id'),
+        turnos_pendientes=Count('id', filter=Q(estado='pendiente')),
+        turnos_activos=Count('id', filter=Q(estado='activo')),
+        turnos_atendidos=Count('id', filter=Q(estado='atendido')),
+        turnos_cancelados=Count('id', filter=Q(estado__in=['cancelado_paciente', 'cancelado_medico'])),
+    )
+    metricas.update(
+        total_pacientes=Paciente.objects.count(),
+        total_medicos=Medico.objects.filter(activo=True).count(),
+        total_especialidades=Especialidad.objects.filter(activo=True).count(),
+    )
+    cache.set(clave, metricas, SEGUNDOS_CACHE_METRICAS)
+    return metricas
+
+
+def invalidar_metricas_dashboard():
+    cache.delete(_clave_metricas(timezone.localdate()))
+
+
+def _primer_dia_mes_siguiente(fecha: date) -> date:
+    return (fecha.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _clave_contadores_medico(medico_id: int, fecha: date) -> str:
+    return f'medico:{medico_id}:mes:{fecha:%Y-%m}'
+
+
+def contadores_mes_medico(medico_id: int, fecha: date = None) -> dict:
+    """
+    Turnos del médico en el mes de `fecha` (por defecto hoy): total,
+    atendidos, ausentes y cancelados. Se filtra por rango de fechas para usar
+    el índice (medico, fecha, estado) y el resultado se cachea por médico y mes.
+    """
+    fecha = fecha or timezone.localdate()
+    clave = _clave_contadores_medico(medico_id, fecha)
+    contadores = cache.get(clave)
+    if contadores is not None:
+        return contadores
+
+    desde = fecha.replace(day=1)
+    contadores = Turno.objects.filter(
+        medico_id=medico_id,
+        fecha__gte=desde,
+        fecha__lt=_primer_dia_mes_siguiente(desde)
+    ).aggregate(
+        total_turnos_mes=Count('id'),
+        turnos_atendidos_mes=Count('id', filter=Q(estado='atendido')),
+        turnos_ausentes_mes=Count('id', filter=Q(estado='ausente')),
+        turnos_cancelados_mes=Count('id', filter=Q(estado__in=['cancelado_paciente', 'cancelado_medico'])),
+    )
+    cache.set(clave, contadores, SEGUNDOS_CACHE_CONTADORES_MEDICO)
+    return contadores
+
+
+def invalidar_contadores_medicos(meses: Iterable[Tuple[int, date]]):
+    """Descarta los contadores cacheados de esos (medico_id, fecha del mes)"""
+    cache.delete_many({_clave_contadores_medico(medico_id, fecha) for medico_id, fecha in meses})
@@ -0,0 +1,92 @@
+"""
+Exportación de turnos en CSV o JSON Lines
+
+Las filas se leen con values_list().iterator(), que en PostgreSQL usa un
+cursor del lado del servidor, y se escriben de a una: la memoria usada no
+depende de la cantidad de turnos exportados.
+"""
+import csv
+import json
+from typing import Iterator, Tuple
+
+from .listados import filtrar_turnos
+from .models import Turno
+
+FORMATOS_EXPORTACION = ('csv', 'jsonl')
+
+# Filas leídas por viaje a la base
+FILAS_POR_LECTURA = 2000
+
+# (columna exportada, campo del turno)
+COLUMNAS_EXPORTACION = (
+    ('turno', 'id'),
+    ('fecha', 'fecha'),
+    ('hora', 'hora'),
+    ('estado', 'estado'),
+    ('paciente_apellido', 'paciente__usuario__last_name'),
+    ('paciente_nombre', 'paciente__usuario__first_name'),
+    ('paciente_dni', 'paciente__usuario__dni'),
+    ('obra_social', None),
+    ('numero_afiliado', 'paciente__numero_afiliado'),
+    ('medico_apellido', 'medico__usuario__last_name'),
+    ('medico_nombre', 'medico__usuario__first_name'),
+    ('medico_matricula', 'medico__matricula'),
+    ('especialidad', 'especialidad__nombre'),
+)
+
+# Campos con los que se arma la obra social, como Paciente.get_obra_social_display
+CAMPOS_OBRA_SOCIAL = (
+    'paciente__obra_social_obj__sigla',
+    'paciente__obra_social_obj__nombre',
+    'paciente__obra_social',
+)
+
+ENCABEZADOS = tuple(columna for columna, _ in COLUMNAS_EXPORTACION)
+
+
+def _obra_social(sigla, nombre, legacy) -> str:
+    if nombre:
+        return f"{sigla} - {nombre}" if sigla else nombre
+    return legacy or 'Particular'
+
+
+def filas_exportacion(parametros) -> Iterator[Tuple]:
+    """
+    Turnos que cumplen los filtros de admin_turnos (ver filtrar_turnos),
+    en orden de fecha y hora, como tuplas en el orden de ENCABEZADOS.
+    """
+    campos = [campo for _, campo in COLUMNAS_EXPORTACION if campo] + list(CAMPOS_OBRA_SOCIAL)
+    posicion_estado = ENCABEZADOS.index('estado')
+    posicion_obra_social = ENCABEZADOS.index('obra_social')
+    nombres_estado = dict(Turno.ESTADOS)
+
+    turnos = filtrar_turnos(Turno.objects.values_list(*campos), parametros).order_by('fecha', 'hora', 'id')
+    for fila in turnos.iterator(chunk_size=FILAS_POR_LECTURA):
+        datos = list(fila[:-len(CAMPOS_OBRA_SOCIAL)])
+        datos[posicion_estado] = nombres_estado.get(datos[posicion_estado], datos[posicion_estado])
+        datos.insert(posicion_obra_social, _obra_social(*fila[-len(CAMPOS_OBRA_SOCIAL):]))
+        yield tuple('' if valor is None else valor for valor in datos)
+
+
+class _Eco:
+    """Archivo que devuelve lo escrito en lugar de guardarlo (para csv.writer)"""
+    def write(self, valor):
+        return valor
+
+
+def lineas_csv(filas) -> Iterator[str]:
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(ENCABEZADOS)
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def lineas_jsonl(filas) -> Iterator[str]:
+    for fila in filas:
+        yield json.dumps(dict(zip(ENCABEZADOS, fila)), ensure_ascii=False, default=str) + '\n'
+
+
+def exportar_turnos(parametros, formato: str = 'csv') -> Iterator[str]:
+    """Líneas del archivo de exportación en el formato pedido"""
+    filas = filas_exportacion(parametros)
+    return lineas_jsonl(filas) if formato == 'jsonl' else lineas_csv(filas)
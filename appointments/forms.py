@@ -1,9 +1,43 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from django.db.models import Q
-from .models import Usuario, Paciente, Medico, Especialidad, Turno, HorarioAtencion, ObraSocial
+from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
+from .busqueda import filtro_busqueda_personas
+from .disponibilidad import ausencia_en_horario
+from .models import Usuario, Paciente, Medico, Especialidad, Turno, HorarioAtencion, ObraSocial, Ausencia, ConfiguracionSistema
 from .utils import es_dia_laboral, es_feriado
-from datetime import datetime, time, date
+from datetime import datetime, date
+
+
+class SelectAutocompletar(forms.Select):
+    """
+    Select que solo renderiza la opción elegida; el resto se busca en
+    `url` al escribir (ver setupAutocompletar en utils.js). La validación
+    sigue usando el queryset completo del campo.
+    """
+    def __init__(self, url, attrs=None):
+        super().__init__({'class': 'form-control', 'data-autocompletar-url': url, **(attrs or {})})
+    
+    def optgroups(self, name, value, attrs=None):
+        seleccionados = {str(valor) for valor in value if valor not in (None, '')}
+        opciones = []
+        empty_label = getattr(getattr(self.choices, 'field', None), 'empty_label', None)
+        if empty_label is not None:
+            opciones.append(('', empty_label))
+        if seleccionados:
+            try:
+                opciones.extend(self.choices.choice(obj) for obj in self.choices.queryset.filter(pk__in=seleccionados))
+            except (TypeError, ValueError, ValidationError):
+                pass
+        return [
+            (None, [self.create_option(name, valor, etiqueta, str(valor) in seleccionados, indice, attrs=attrs)], indice)
+            for indice, (valor, etiqueta) in enumerate(opciones)
+        ]
+
+
+def etiqueta_paciente(paciente):
+    return f"{paciente} - DNI {paciente.usuario.dni}"
+
 
 class RegistroPacienteForm(UserCreationForm):
     first_name = forms.CharField(max_length=30, required=True, label='Nombre')
@@ -163,17 +197,12 @@ class AsignarMedicoForm(forms.Form):
         # Solo mostrar usuarios que no sean médicos ni admins
         queryset = Usuario.objects.filter(rol='paciente')
         
-        if busqueda:
-            # Filtrar por búsqueda
-            queryset = queryset.filter(
-                Q(first_name__icontains=busqueda) |
-                Q(last_name__icontains=busqueda) |
-                Q(email__icontains=busqueda) |
-                Q(dni__icontains=busqueda) |
-                Q(username__icontains=busqueda)
-            )
+        filtro = filtro_busqueda_personas(busqueda)
+        if filtro is not None:
+            # Filtrar por búsqueda (prefijos sobre columnas indexadas)
+            queryset = queryset.filter(filtro)
         
-        self.fields['usuario'].queryset = queryset
+        self.fields['usuario'].queryset = queryset.order_by('apellido_normalizado', 'nombre_normalizado', 'id')
         
         # Personalizar la representación del usuario
         self.fields['usuario'].label_from_instance = lambda obj: f"{obj.get_full_name()} - {obj.email} (DNI: {obj.dni})"
@@ -198,30 +227,77 @@ class HorarioAtencionForm(forms.ModelForm):
         if hora_inicio and hora_fin and hora_inicio >= hora_fin:
             raise forms.ValidationError('La hora de inicio debe ser anterior a la hora de fin.')
         
-        # Validar horarios del consultorio (7:00 - 16:00)
-        if hora_inicio and (hora_inicio < time(7, 0) or hora_inicio > time(16, 0)):
-            raise forms.ValidationError('El horario debe estar entre 7:00 y 16:00.')
-        
-        if hora_fin and (hora_fin < time(7, 0) or hora_fin > time(16, 0)):
-            raise forms.ValidationError('El horario debe estar entre 7:00 y 16:00.')
+        # Validar horarios del consultorio
+        config = ConfiguracionSistema.actual()
+        apertura, cierre = config.horario_apertura, config.horario_cierre
+        for hora in (hora_inicio, hora_fin):
+            if hora and (hora < apertura or hora > cierre):
+                raise forms.ValidationError(
+                    f'El horario debe estar entre {apertura.hour}:{apertura:%M} y {cierre.hour}:{cierre:%M}.'
+                )
         
         return cleaned_data
 
 
+class AusenciaForm(forms.ModelForm):
+    class Meta:
+        model = Ausencia
+        fields = ['medico', 'fecha_inicio', 'fecha_fin', 'hora_inicio', 'hora_fin', 'motivo']
+        widgets = {
+            'medico': SelectAutocompletar(reverse_lazy('admin_autocompletar', args=['medicos']), attrs={
+                'data-autocompletar-placeholder': 'Buscar por apellido, nombre o matrícula...'
+            }),
+            'fecha_inicio': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'fecha_fin': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'hora_inicio': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+            'hora_fin': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+            'motivo': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Vacaciones, congreso, mantenimiento...'}),
+        }
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['medico'].queryset = Medico.objects.select_related('usuario')
+        self.fields['medico'].empty_label = 'Todo el consultorio'
+        self.fields['medico'].label = 'Médico'
+
+
 class TurnoForm(forms.ModelForm):
     class Meta:
         model = Turno
         fields = ['paciente', 'medico', 'especialidad', 'fecha', 'hora', 'motivo_consulta', 'estado']
         widgets = {
-            'paciente': forms.Select(attrs={'class': 'form-control'}),
-            'medico': forms.Select(attrs={'class': 'form-control'}),
-            'especialidad': forms.Select(attrs={'class': 'form-control'}),
+            'paciente': SelectAutocompletar(reverse_lazy('admin_autocompletar', args=['pacientes']), attrs={
+                'data-autocompletar-placeholder': 'Buscar por DNI, apellido o nombre...'
+            }),
+            'medico': SelectAutocompletar(reverse_lazy('admin_autocompletar', args=['medicos']), attrs={
+                'data-autocompletar-placeholder': 'Buscar por apellido, nombre o matrícula...'
+            }),
+            'especialidad': SelectAutocompletar(reverse_lazy('admin_autocompletar', args=['especialidades']), attrs={
+                'data-autocompletar-placeholder': 'Buscar especialidad...',
+                'data-autocompletar-minimo': '1'
+            }),
             'fecha': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'hora': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
             'motivo_consulta': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'estado': forms.Select(attrs={'class': 'form-control'}),
         }
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['paciente'].queryset = Paciente.objects.select_related('usuario')
+        self.fields['paciente'].label_from_instance = etiqueta_paciente
+        self.fields['medico'].queryset = Medico.objects.select_related('usuario')
+    
+    def toma_horario_nuevo(self, estado):
+        """True si es un turno nuevo o si al guardarlo pasa a reservar un horario que antes no tenía"""
+        if not self.instance.pk:
+            return True
+        reservan = ('pendiente', *Turno.ESTADOS_OCUPAN_HORARIO)
+        if estado not in reservan:
+            return False
+        # clean() corre antes de copiar los datos del formulario a la instancia
+        return self.instance.estado not in reservan or bool({'medico', 'fecha', 'hora'} & set(self.changed_data))
+    
     def clean(self):
         cleaned_data = super().clean()
         fecha = cleaned_data.get('fecha')
@@ -238,6 +314,13 @@ class TurnoForm(forms.ModelForm):
             if not es_laboral:
                 raise forms.ValidationError(mensaje)
         
+        # Validar ausencias del médico y cierres del consultorio. Al editar, solo si
+        # el turno toma un horario nuevo: cancelar uno ya tomado debe poder guardarse
+        if fecha and hora and self.toma_horario_nuevo(cleaned_data.get('estado')):
+            ausencia = ausencia_en_horario(medico.pk if medico else None, fecha, hora)
+            if ausencia:
+                raise forms.ValidationError(ausencia.mensaje())
+        
         # Validar conflicto de horarios (solo con turnos activos si es pendiente)
         if fecha and hora and medico:
             estado_actual = cleaned_data.get('estado')
@@ -341,6 +424,10 @@ class PacienteTurnoForm(forms.ModelForm):
                     f'Lo sentimos, el horario {hora.strftime("%H:%M")} ya no está disponible para este médico. '
                     'Por favor, seleccione otro horario.'
                 )
+            
+            ausencia = ausencia_en_horario(medico.pk, fecha, hora)
+            if ausencia:
+                raise forms.ValidationError(ausencia.mensaje())
         
         return cleaned_data
 
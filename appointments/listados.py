@@ -0,0 +1,134 @@
+"""
+Filtros y paginación por clave para los listados
+
+Los filtros comparan columnas directamente (igualdades y rangos de fecha)
+para que la base pueda resolverlos con índices. La paginación por clave
+busca a partir de la última fila mostrada en lugar de usar OFFSET y COUNT,
+por lo que el costo de una página no depende del tamaño de la tabla.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+from typing import List, Optional, Sequence, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from .models import Turno
+
+TURNOS_POR_PAGINA = 50
+
+# Clave única del orden de los listados de turnos (descendente)
+CLAVE_TURNOS = ('fecha', 'hora', 'id')
+
+# Columnas leídas para cada fila del listado (sin instanciar modelos)
+CAMPOS_LISTADO_TURNOS = (
+    'id', 'fecha', 'hora', 'estado',
+    'paciente__usuario__first_name', 'paciente__usuario__last_name',
+    'medico__usuario__first_name', 'medico__usuario__last_name',
+    'especialidad__nombre',
+)
+
+# Clave única del directorio de pacientes (ascendente, por apellido y nombre)
+CLAVE_PACIENTES = ('usuario__apellido_normalizado', 'usuario__nombre_normalizado', 'id')
+
+CAMPOS_LISTADO_PACIENTES = CLAVE_PACIENTES + (
+    'obra_social', 'usuario__first_name', 'usuario__last_name',
+    'usuario__dni', 'usuario__email', 'usuario__telefono',
+)
+
+
+def fecha_parametro(valor) -> Optional[date]:
+    """Fecha AAAA-MM-DD de un parámetro, o None si falta o es inválida"""
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def filtrar_turnos(turnos, parametros):
+    """
+    Aplica los filtros fecha_desde, fecha_hasta, estado y medico de un
+    diccionario de parámetros (por ejemplo request.GET). Los valores
+    inválidos se ignoran.
+    """
+    fecha_desde = fecha_parametro(parametros.get('fecha_desde'))
+    fecha_hasta = fecha_parametro(parametros.get('fecha_hasta'))
+    estado = parametros.get('estado')
+    medico_id = parametros.get('medico')
+
+    if fecha_desde:
+        turnos = turnos.filter(fecha__gte=fecha_desde)
+    if fecha_hasta:
+        turnos = turnos.filter(fecha__lte=fecha_hasta)
+    if estado in dict(Turno.ESTADOS):
+        turnos = turnos.filter(estado=estado)
+    if medico_id and medico_id.isdigit():
+        turnos = turnos.filter(medico_id=int(medico_id))
+    return turnos
+
+
+def codificar_cursor(fila: dict, campos: Sequence[str]) -> str:
+    valores = [fila[campo] if isinstance(fila[campo], (int, str)) else fila[campo].isoformat() for campo in campos]
+    return urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+
+def decodificar_cursor(valor, campos: Sequence[str]) -> Optional[list]:
+    try:
+        valores = json.loads(urlsafe_b64decode(valor.encode()))
+    except (AttributeError, ValueError):
+        return None
+    if not isinstance(valores, list) or len(valores) != len(campos):
+        return None
+    return valores
+
+
+def _filtrar_desde_cursor(filas, campos: Sequence[str], cursor, operador: str):
+    """
+    Filtra las filas posteriores al cursor en orden lexicográfico
+    ((a, b) > (va, vb) es a > va o (a = va y b > vb)), o retorna None si el
+    cursor es inválido.
+    """
+    valores = decodificar_cursor(cursor, campos)
+    if valores is None:
+        return None
+    condicion = Q()
+    for i, campo in enumerate(campos):
+        igualdades = dict(zip(campos[:i], valores[:i]))
+        condicion |= Q(**igualdades, **{f'{campo}__{operador}': valores[i]})
+    try:
+        return filas.filter(condicion)
+    except (TypeError, ValueError, ValidationError):
+        return None
+
+
+def pagina_por_clave(filas, despues: str = None, antes: str = None, campos: Sequence[str] = CLAVE_TURNOS,
+                     descendente: bool = True, tamano: int = TURNOS_POR_PAGINA) -> Tuple[List[dict], Optional[str], Optional[str]]:
+    """
+    Retorna (filas, cursor_anterior, cursor_siguiente) de un queryset de
+    valores ordenado por `campos` (todos descendentes o todos ascendentes).
+    La clave debe ser única, por eso el último campo suele ser el id.
+
+    `despues` pide la página que sigue al cursor y `antes` la que lo
+    precede; los cursores retornados son None en los extremos.
+    """
+    avanzar, retroceder = ('lt', 'gt') if descendente else ('gt', 'lt')
+    orden = [f'-{campo}' if descendente else campo for campo in campos]
+    orden_inverso = [campo if descendente else f'-{campo}' for campo in campos]
+
+    anteriores = _filtrar_desde_cursor(filas, campos, antes, retroceder) if antes else None
+    if anteriores is not None:
+        resultado = list(anteriores.order_by(*orden_inverso)[:tamano + 1])
+        hay_anterior = len(resultado) > tamano
+        resultado = resultado[:tamano][::-1]
+        hay_siguiente = True
+    else:
+        siguientes = _filtrar_desde_cursor(filas, campos, despues, avanzar) if despues else None
+        resultado = list((siguientes if siguientes is not None else filas).order_by(*orden)[:tamano + 1])
+        hay_siguiente = len(resultado) > tamano
+        resultado = resultado[:tamano]
+        hay_anterior = siguientes is not None
+
+    anterior = codificar_cursor(resultado[0], campos) if resultado and hay_anterior else None
+    siguiente = codificar_cursor(resultado[-1], campos) if resultado and hay_siguiente else None
+    return resultado, anterior, siguiente
@@ -0,0 +1,192 @@
+"""
+Benchmark de la API de horarios disponibles por especialidad
+
+La latencia se mide sin caché, para que cada request calcule la
+disponibilidad; la última columna repite la medición con una caché
+propia de cada tamaño, ya cargada por el primer request.
+
+Con --micro compara solo el cálculo en memoria (bitsets contra recorridos
+de objetos), con los datos ya cargados.
+
+Crea datos sintéticos dentro de una transacción que se revierte al final,
+por lo que puede ejecutarse sobre cualquier base sin dejar rastros.
+"""
+import statistics
+import time as reloj
+from datetime import date, time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from appointments.disponibilidad import Disponibilidad, generar_slots
+from appointments.models import (
+    Usuario, Paciente, Medico, Especialidad, HorarioAtencion, Turno
+)
+from appointments.utils import es_dia_laboral
+from appointments.views.paciente_turnos_wizard import api_horarios_disponibles_especialidad
+
+SIN_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def cache_propia(nombre):
+    """Caché en memoria vacía y separada de las demás mediciones"""
+    return {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'benchmark-{nombre}'}}
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia de api_horarios_disponibles_especialidad según la cantidad de médicos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--medicos',
+            type=int,
+            nargs='+',
+            default=[5, 10, 25, 50, 100],
+            help='Cantidades de médicos por especialidad a medir',
+        )
+        parser.add_argument(
+            '--micro',
+            action='store_true',
+            help='Compara en memoria los bitsets contra los recorridos de objetos, sin medir la base',
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=20,
+            help='Cantidad de requests por medición',
+        )
+
+    def handle(self, *args, **options):
+        fecha = date.today() + timedelta(days=7)
+        while not es_dia_laboral(fecha)[0]:
+            fecha += timedelta(days=1)
+
+        self.stdout.write(f'Fecha de prueba: {fecha.isoformat()}')
+        if options['micro']:
+            self.stdout.write(
+                f"{'Médicos':>8} {'Horas objetos (ms)':>19} {'Horas bitset (ms)':>18}"
+            )
+        else:
+            self.stdout.write(
+                f"{'Médicos':>8} {'Consultas':>10} {'Mediana (ms)':>13} {'p95 (ms)':>9} {'Con caché (ms)':>15}"
+            )
+
+        for cantidad in options['medicos']:
+            with transaction.atomic():
+                request = self._preparar(cantidad, fecha)
+                if options['micro']:
+                    resultados = self._medir_micro(request, fecha, options['repeticiones'])
+                else:
+                    # La transacción se revierte, así que la invalidación al confirmar nunca
+                    # ocurre: con la caché compartida se medirían aciertos del tamaño anterior
+                    with override_settings(CACHES=SIN_CACHE):
+                        consultas, tiempos = self._medir(request, options['repeticiones'])
+                    with override_settings(CACHES=cache_propia(cantidad)):
+                        _, tiempos_cache = self._medir(request, options['repeticiones'])
+                transaction.set_rollback(True)
+
+            if options['micro']:
+                self.stdout.write(f'{cantidad:>8} {resultados[0]:>19.3f} {resultados[1]:>18.3f}')
+                continue
+
+            tiempos.sort()
+            p95 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))]
+            self.stdout.write(
+                f'{cantidad:>8} {consultas:>10} {statistics.median(tiempos):>13.2f} {p95:>9.2f} '
+                f'{statistics.median(tiempos_cache):>15.3f}'
+            )
+
+    def _preparar(self, cantidad, fecha):
+        """Crea una especialidad con `cantidad` médicos atendiendo de 7 a 16 y la mitad de sus slots ocupados"""
+        especialidad = Especialidad.objects.create(nombre='Benchmark disponibilidad')
+        usuario_paciente = Usuario.objects.create(username='benchmark_paciente', rol='paciente')
+        paciente = Paciente.objects.create(usuario=usuario_paciente)
+
+        turnos = []
+        for i in range(cantidad):
+            usuario = Usuario.objects.create(
+                username=f'benchmark_medico_{i}',
+                first_name='Médico',
+                last_name=f'Benchmark {i:03d}',
+                rol='medico'
+            )
+            medico = Medico.objects.create(usuario=usuario, matricula=f'BENCH{i:05d}')
+            medico.especialidades.add(especialidad)
+            HorarioAtencion.objects.create(
+                medico=medico,
+                dia_semana=fecha.weekday(),
+                hora_inicio=time(7, 0),
+                hora_fin=time(16, 0)
+            )
+            for hora in range(7, 16):
+                turnos.append(Turno(
+                    paciente=paciente,
+                    medico=medico,
+                    especialidad=especialidad,
+                    fecha=fecha,
+                    hora=time(hora, 0),
+                    estado='activo'
+                ))
+        Turno.objects.bulk_create(turnos)
+
+        request = RequestFactory().get('/api/horarios-disponibles-especialidad/', {
+            'especialidad_id': especialidad.id,
+            'fecha': fecha.isoformat(),
+        })
+        request.user = usuario_paciente
+        return request
+
+    def _medir(self, request, repeticiones):
+        with CaptureQueriesContext(connection) as contexto:
+            api_horarios_disponibles_especialidad(request)
+        consultas = len(contexto)
+
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = reloj.perf_counter()
+            api_horarios_disponibles_especialidad(request)
+            tiempos.append((reloj.perf_counter() - inicio) * 1000)
+        return consultas, tiempos
+
+    def _medir_micro(self, request, fecha, repeticiones):
+        """Mediana de cada cálculo en memoria, con los datos ya cargados de la base"""
+        especialidad_id = request.GET['especialidad_id']
+        disponibilidad = Disponibilidad.cargar(fecha, especialidad_id=especialidad_id)
+        horarios = list(HorarioAtencion.objects.filter(
+            dia_semana=fecha.weekday(),
+            activo=True,
+            medico__especialidades__id=especialidad_id,
+            medico__activo=True
+        ).select_related('medico'))
+        ocupados = set(Turno.objects.filter(
+            fecha=fecha,
+            estado__in=Turno.ESTADOS_OCUPAN_HORARIO
+        ).values_list('medico_id', 'hora'))
+
+        calculos = [
+            lambda: self._horas_por_objetos(horarios, ocupados, fecha),
+            lambda: disponibilidad.horas_con_medico_libre(fecha),
+        ]
+        medianas = []
+        for calculo in calculos:
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = reloj.perf_counter()
+                calculo()
+                tiempos.append((reloj.perf_counter() - inicio) * 1000)
+            medianas.append(statistics.median(tiempos))
+        return medianas
+
+    @staticmethod
+    def _horas_por_objetos(horarios, ocupados, fecha):
+        """Recorrido anterior: cada slot contra cada horario que lo cubre"""
+        horas = set()
+        for horario in horarios:
+            for hora in generar_slots(horario.hora_inicio, horario.hora_fin):
+                for otro in horarios:
+                    if otro.hora_inicio <= hora < otro.hora_fin and (otro.medico_id, hora) not in ocupados:
+                        horas.add(hora)
+                        break
+        return sorted(horas)
@@ -0,0 +1,32 @@
+"""
+Comando para consultar los aciertos y fallos de la caché de disponibilidad
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from appointments.disponibilidad import estadisticas_cache, reiniciar_estadisticas_cache
+
+
+class Command(BaseCommand):
+    help = 'Muestra los aciertos y fallos de la caché de disponibilidad'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reiniciar',
+            action='store_true',
+            help='Pone los contadores en cero después de mostrarlos',
+        )
+
+    def handle(self, *args, **options):
+        aciertos, fallos = estadisticas_cache()
+        total = aciertos + fallos
+        tasa = aciertos * 100 / total if total else 0
+
+        self.stdout.write(f'Backend: {settings.CACHES["default"]["BACKEND"]}')
+        self.stdout.write(f'Aciertos: {aciertos}')
+        self.stdout.write(f'Fallos:   {fallos}')
+        self.stdout.write(self.style.SUCCESS(f'Tasa de aciertos: {tasa:.1f}%'))
+
+        if options['reiniciar']:
+            reiniciar_estadisticas_cache()
+            self.stdout.write(self.style.SUCCESS('✓ Contadores reiniciados'))
@@ -0,0 +1,49 @@
+"""
+Comando para exportar turnos en CSV o JSON Lines
+
+Usa los mismos filtros que la gestión de turnos y escribe las filas a
+medida que las lee, por lo que sirve para exportar meses completos (por
+ejemplo para facturar a las obras sociales).
+"""
+from django.core.management.base import BaseCommand
+
+from appointments.exportacion import FORMATOS_EXPORTACION, exportar_turnos
+
+
+class Command(BaseCommand):
+    help = 'Exporta turnos con datos de paciente, obra social, médico y especialidad'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=FORMATOS_EXPORTACION, default='csv')
+        parser.add_argument('--fecha-desde', help='Fecha inicial (AAAA-MM-DD)')
+        parser.add_argument('--fecha-hasta', help='Fecha final (AAAA-MM-DD)')
+        parser.add_argument('--estado', help='Estado de los turnos')
+        parser.add_argument('--medico', help='ID del médico')
+        parser.add_argument(
+            '--salida',
+            default='-',
+            help='Archivo de destino (por defecto la salida estándar)',
+        )
+
+    def handle(self, *args, **options):
+        parametros = {
+            'fecha_desde': options['fecha_desde'],
+            'fecha_hasta': options['fecha_hasta'],
+            'estado': options['estado'],
+            'medico': options['medico'],
+        }
+        lineas = exportar_turnos(parametros, options['formato'])
+
+        if options['salida'] == '-':
+            for linea in lineas:
+                self.stdout.write(linea, ending='')
+            return
+
+        cantidad = 0
+        with open(options['salida'], 'w', encoding='utf-8', newline='') as archivo:
+            for linea in lineas:
+                archivo.write(linea)
+                cantidad += 1
+        if options['formato'] == 'csv':
+            cantidad -= 1
+        self.stdout.write(self.style.SUCCESS(f"✓ Se exportaron {cantidad} turno(s) a {options['salida']}"))
@@ -0,0 +1,32 @@
+"""
+Comando para recalcular las estadísticas precalculadas de turnos
+
+Las estadísticas se mantienen solas a medida que cambian los turnos; este
+comando las recalcula desde cero, por ejemplo después de importar turnos
+con bulk_create o de editar la base a mano. Conviene ejecutarlo con poca
+actividad, ya que los cambios de turnos del rango durante la
+reconstrucción pueden no quedar contados.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from appointments.estadisticas import reconstruir_estadisticas
+from appointments.listados import fecha_parametro
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las estadísticas diarias de turnos desde la tabla de turnos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Fecha inicial (AAAA-MM-DD); por defecto todas')
+        parser.add_argument('--hasta', help='Fecha final (AAAA-MM-DD); por defecto todas')
+
+    def handle(self, *args, **options):
+        fechas = {}
+        for opcion in ('desde', 'hasta'):
+            if options[opcion]:
+                fechas[opcion] = fecha_parametro(options[opcion])
+                if fechas[opcion] is None:
+                    raise CommandError(f"Fecha inválida para --{opcion}: {options[opcion]}")
+
+        cantidad = reconstruir_estadisticas(**fechas)
+        self.stdout.write(self.style.SUCCESS(f"✓ Se recalcularon {cantidad} fila(s) de estadísticas"))
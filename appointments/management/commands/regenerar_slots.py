@@ -0,0 +1,36 @@
+"""
+Comando para regenerar y verificar la tabla de slots (disponibilidad materializada)
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from appointments.slots import regenerar_slots, verificar_slots
+
+
+class Command(BaseCommand):
+    help = 'Regenera la tabla de slots para el horizonte configurado o verifica que esté sincronizada'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=None,
+            help='Días a generar desde hoy (por defecto MEDITURNOS_SLOTS_HORIZONTE_DIAS)',
+        )
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo compara la tabla con los horarios y turnos actuales, sin modificarla',
+        )
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            diferencias = verificar_slots()
+            for diferencia in diferencias:
+                self.stdout.write(self.style.WARNING(f'  ⚠ {diferencia}'))
+            if diferencias:
+                raise CommandError(f'La tabla de slots tiene {len(diferencias)} diferencia(s)')
+            self.stdout.write(self.style.SUCCESS('✓ La tabla de slots está sincronizada'))
+            return
+
+        cantidad = regenerar_slots(dias=options['dias'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Se generaron {cantidad} slots'))
@@ -0,0 +1,163 @@
+"""
+Prueba de estrés de la validación concurrente de turnos
+
+Crea solicitudes pendientes que compiten por los mismos horarios y las
+valida en paralelo desde varios hilos con Turno.activar(). Al final
+verifica que ningún horario haya quedado con más de un turno activo.
+
+Como cada hilo usa su propia conexión, los datos se confirman en la base
+configurada y se eliminan al terminar, por eso exige --confirmar. La
+prueba de rutina es ValidacionConcurrenteTests en appointments/tests.py,
+que corre sobre la base de pruebas; este comando sirve para medir con
+más hilos y solicitudes contra SQLite o PostgreSQL (con DATABASE_URL).
+"""
+import random
+import threading
+import time as reloj
+from datetime import date, time, timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections
+from django.db.models import Count
+
+from appointments.models import Usuario, Paciente, Medico, Especialidad, Turno
+from appointments.utils import es_dia_laboral
+
+PREFIJO = 'stress_validacion'
+
+
+class Command(BaseCommand):
+    help = 'Valida turnos en conflicto desde varios hilos y verifica que no haya doble reserva'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=16,
+            help='Cantidad de hilos validando en paralelo',
+        )
+        parser.add_argument(
+            '--horarios',
+            type=int,
+            default=10,
+            help='Cantidad de horarios en disputa',
+        )
+        parser.add_argument(
+            '--solicitudes',
+            type=int,
+            default=8,
+            help='Solicitudes pendientes por horario',
+        )
+        parser.add_argument(
+            '--confirmar',
+            action='store_true',
+            help='Acepta crear y borrar datos de prueba en la base configurada',
+        )
+
+    def handle(self, *args, **options):
+        if not options['confirmar']:
+            raise CommandError(
+                f"Este comando crea y borra datos en la base configurada ({connection.settings_dict['NAME']}). "
+                'Use --confirmar para ejecutarlo, o `manage.py test appointments` para la prueba de rutina.'
+            )
+        self.stdout.write(f'Motor: {connection.vendor}')
+        medico = None
+        try:
+            medico, turno_ids = self._preparar(options['horarios'], options['solicitudes'])
+            resultados, segundos = self._validar_en_paralelo(turno_ids, options['hilos'])
+            dobles = self._dobles_reservas(medico)
+        finally:
+            self._limpiar()
+
+        self.stdout.write(f'Validaciones intentadas: {len(turno_ids)} en {segundos:.2f} s')
+        self.stdout.write(f"  Activados:            {resultados['activados']}")
+        self.stdout.write(f"  Rechazados (ocupado): {resultados['rechazados']}")
+        self.stdout.write(f"  Errores de la base:   {resultados['errores']}")
+
+        if dobles:
+            raise CommandError(f'Doble reserva en {len(dobles)} horario(s): {dobles}')
+        if resultados['activados'] > options['horarios']:
+            raise CommandError('Se activaron más turnos que horarios en disputa')
+        self.stdout.write(self.style.SUCCESS('✓ Ningún horario quedó con más de un turno activo'))
+
+    def _preparar(self, horarios, solicitudes):
+        self._limpiar()
+        especialidad = Especialidad.objects.create(nombre=f'{PREFIJO} especialidad')
+        usuario = Usuario.objects.create(
+            username=f'{PREFIJO}_medico', first_name='Stress', last_name='Validación', rol='medico'
+        )
+        medico = Medico.objects.create(usuario=usuario, matricula=f'{PREFIJO}')
+        medico.especialidades.add(especialidad)
+
+        pacientes = [
+            Paciente.objects.create(usuario=Usuario.objects.create(
+                username=f'{PREFIJO}_paciente_{i}', rol='paciente'
+            ))
+            for i in range(solicitudes)
+        ]
+
+        fecha = date.today() + timedelta(days=7)
+        while not es_dia_laboral(fecha)[0]:
+            fecha += timedelta(days=1)
+
+        turnos = Turno.objects.bulk_create([
+            Turno(
+                paciente=paciente, medico=medico, especialidad=especialidad,
+                fecha=fecha, hora=time(8 + i // 2, 30 * (i % 2)), estado='pendiente'
+            )
+            for i in range(horarios)
+            for paciente in pacientes
+        ])
+        turno_ids = [turno.pk for turno in turnos]
+        if None in turno_ids:
+            turno_ids = list(Turno.objects.filter(medico=medico).values_list('pk', flat=True))
+        random.shuffle(turno_ids)
+        return medico, turno_ids
+
+    def _validar_en_paralelo(self, turno_ids, hilos):
+        pendientes = list(turno_ids)
+        candado = threading.Lock()
+        largada = threading.Barrier(hilos)
+        resultados = {'activados': 0, 'rechazados': 0, 'errores': 0}
+
+        def trabajar():
+            try:
+                largada.wait()
+                while True:
+                    with candado:
+                        if not pendientes:
+                            return
+                        turno_id = pendientes.pop()
+                    turno = Turno.objects.get(pk=turno_id)
+                    try:
+                        turno.activar()
+                        resultado = 'activados'
+                    except ValidationError:
+                        resultado = 'rechazados'
+                    except DatabaseError:
+                        # Por ejemplo "database is locked" en SQLite
+                        resultado = 'errores'
+                    with candado:
+                        resultados[resultado] += 1
+            finally:
+                connections.close_all()
+
+        inicio = reloj.perf_counter()
+        trabajadores = [threading.Thread(target=trabajar) for _ in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+        return resultados, reloj.perf_counter() - inicio
+
+    def _dobles_reservas(self, medico):
+        return list(Turno.objects.filter(
+            medico=medico,
+            estado__in=Turno.ESTADOS_OCUPAN_HORARIO
+        ).values('fecha', 'hora').annotate(cantidad=Count('pk')).filter(cantidad__gt=1))
+
+    def _limpiar(self):
+        Turno.objects.filter(medico__usuario__username=f'{PREFIJO}_medico').delete()
+        Usuario.objects.filter(username__startswith=f'{PREFIJO}_').delete()
+        Especialidad.objects.filter(nombre=f'{PREFIJO} especialidad').delete()
@@ -0,0 +1,47 @@
+"""
+Comando para validar automáticamente las solicitudes sin competencia
+
+Pensado para ejecutarse periódicamente (por ejemplo con cron) cuando la
+configuración del sistema tiene la validación automática programada.
+"""
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from appointments.models import ConfiguracionSistema
+from appointments.validacion import validar_automaticamente
+
+
+class Command(BaseCommand):
+    help = 'Activa los turnos pendientes que no compiten con otras solicitudes por su horario'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limite',
+            type=int,
+            default=None,
+            help='Cantidad máxima de turnos a validar en esta ejecución',
+        )
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Validar aunque la configuración del sistema indique validación manual',
+        )
+
+    def handle(self, *args, **options):
+        config = ConfiguracionSistema.actual()
+        if config.validacion_automatica == 'manual' and not options['forzar']:
+            self.stdout.write(self.style.WARNING(
+                '⚠ La validación automática está desactivada en la configuración del sistema (use --forzar)'
+            ))
+            return
+
+        resultados = validar_automaticamente(limite=options['limite'])
+        resumen = Counter(resultado['resultado'] for resultado in resultados)
+        for resultado in resultados:
+            if resultado['resultado'] != 'activado':
+                self.stdout.write(f"  Turno #{resultado['id']}: {resultado['mensaje']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Se validaron {resumen['activado']} turno(s) sin competencia"
+        ))
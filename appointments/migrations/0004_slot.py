@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0003_alter_turno_medico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='configuracionsistema',
+            name='slots_generados_hasta',
+            field=models.DateField(blank=True, editable=False, help_text='Última fecha cubierta por la tabla de slots', null=True),
+        ),
+        migrations.CreateModel(
+            name='Slot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('hora', models.TimeField()),
+                ('ocupado', models.BooleanField(default=False)),
+                ('medico', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='appointments.medico')),
+            ],
+            options={
+                'verbose_name': 'Slot',
+                'verbose_name_plural': 'Slots',
+                'ordering': ['fecha', 'hora'],
+                'indexes': [models.Index(fields=['fecha', 'ocupado', 'hora'], name='slot_fecha_ocupado_hora_idx')],
+                'unique_together': {('medico', 'fecha', 'hora')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:58
+
+from collections import defaultdict
+
+from django.db import IntegrityError, migrations, models
+
+
+def verificar_horarios_sin_duplicados(apps, schema_editor):
+    """
+    El constraint no se puede crear si un horario tiene más de un turno activo.
+    No se elige cuál conservar: se listan los turnos para resolverlos a mano.
+    """
+    Turno = apps.get_model('appointments', 'Turno')
+    por_horario = defaultdict(list)
+    for turno_id, medico_id, fecha, hora in Turno.objects.filter(
+        medico__isnull=False,
+        estado__in=['activo', 'en_atencion']
+    ).order_by('medico_id', 'fecha', 'hora', 'id').values_list('id', 'medico_id', 'fecha', 'hora'):
+        por_horario[(medico_id, fecha, hora)].append(turno_id)
+    duplicados = [
+        f"  médico {medico_id}, {fecha} {hora:%H:%M}: turnos {', '.join(map(str, ids))}"
+        for (medico_id, fecha, hora), ids in por_horario.items() if len(ids) > 1
+    ]
+    if duplicados:
+        raise IntegrityError(
+            'Hay horarios con más de un turno activo o en atención. Deje uno solo por horario '
+            '(cancele o devuelva a pendiente los demás) y vuelva a ejecutar migrate:\n' + '\n'.join(duplicados)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_slot'),
+    ]
+
+    operations = [
+        migrations.RunPython(verificar_horarios_sin_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='turno',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado__in', ['activo', 'en_atencion'])), fields=('medico', 'fecha', 'hora'), name='turno_horario_ocupado_unico', violation_error_message='Ya existe un turno activo para este médico en ese horario.'),
+        ),
+    ]
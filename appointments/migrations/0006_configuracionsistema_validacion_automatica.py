@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_turno_horario_ocupado_unico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='configuracionsistema',
+            name='validacion_automatica',
+            field=models.CharField(choices=[('manual', 'Manual (cada solicitud la valida un administrador)'), ('programada', 'Programada (comando validar_turnos_automaticamente)'), ('al_solicitar', 'Al solicitar el turno')], default='manual', help_text='Activar sin intervención las solicitudes que no compiten con otras por el horario', max_length=20),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_configuracionsistema_validacion_automatica'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['fecha', 'hora', 'id'], name='turno_fecha_hora_id_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:05
+
+import unicodedata
+
+from django.db import DatabaseError, migrations, models, transaction
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return ' '.join(texto.lower().split())
+
+
+def completar_normalizados(apps, schema_editor):
+    Usuario = apps.get_model('appointments', 'Usuario')
+    lote = []
+    for usuario in Usuario.objects.only('first_name', 'last_name').iterator(chunk_size=2000):
+        usuario.apellido_normalizado = normalizar(usuario.last_name)
+        usuario.nombre_normalizado = normalizar(usuario.first_name)
+        lote.append(usuario)
+        if len(lote) >= 2000:
+            Usuario.objects.bulk_update(lote, ['apellido_normalizado', 'nombre_normalizado'])
+            lote = []
+    if lote:
+        Usuario.objects.bulk_update(lote, ['apellido_normalizado', 'nombre_normalizado'])
+
+
+def crear_indices_trigram(apps, schema_editor):
+    """En PostgreSQL, índices trigram para buscar subcadenas de apellido y nombre"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        # Crear la extensión requiere permisos; sin ella la búsqueda usa solo prefijos
+        with transaction.atomic():
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        return
+    for columna in ('apellido_normalizado', 'nombre_normalizado'):
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS usuario_{columna}_trgm_idx '
+            f'ON appointments_usuario USING gin ({columna} gin_trgm_ops)'
+        )
+
+
+def eliminar_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for columna in ('apellido_normalizado', 'nombre_normalizado'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS usuario_{columna}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_turno_fecha_hora_id_idx'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='apellido_normalizado',
+            field=models.CharField(blank=True, editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='nombre_normalizado',
+            field=models.CharField(blank=True, editable=False, max_length=150),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['apellido_normalizado', 'nombre_normalizado', 'id'], name='usuario_apellido_norm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['nombre_normalizado'], name='usuario_nombre_norm_idx'),
+        ),
+        migrations.RunPython(completar_normalizados, migrations.RunPython.noop),
+        migrations.RunPython(crear_indices_trigram, eliminar_indices_trigram),
+    ]
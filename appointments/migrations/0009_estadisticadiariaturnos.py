@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def calcular_estadisticas(apps, schema_editor):
+    Turno = apps.get_model('appointments', 'Turno')
+    EstadisticaDiariaTurnos = apps.get_model('appointments', 'EstadisticaDiariaTurnos')
+    grupos = Turno.objects.order_by().values('fecha', 'medico_id', 'especialidad_id', 'estado').annotate(cantidad=Count('id'))
+    EstadisticaDiariaTurnos.objects.bulk_create(
+        (
+            EstadisticaDiariaTurnos(
+                fecha=grupo['fecha'], medico_id=grupo['medico_id'],
+                especialidad_id=grupo['especialidad_id'], estado=grupo['estado'], total=grupo['cantidad']
+            )
+            for grupo in grupos.iterator(chunk_size=1000)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0008_usuario_busqueda_normalizada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaDiariaTurnos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente de Validación'), ('activo', 'Activo'), ('en_atencion', 'En Atención'), ('atendido', 'Atendido'), ('cancelado_paciente', 'Cancelado por Paciente'), ('cancelado_medico', 'Cancelado por Médico'), ('ausente', 'Ausente'), ('rechazado', 'Rechazado')], max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('especialidad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='appointments.especialidad')),
+                ('medico', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='appointments.medico')),
+            ],
+            options={
+                'verbose_name': 'Estadística Diaria de Turnos',
+                'verbose_name_plural': 'Estadísticas Diarias de Turnos',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'medico', 'especialidad', 'estado'), name='estadistica_diaria_unica')],
+            },
+        ),
+        migrations.RunPython(calcular_estadisticas, migrations.RunPython.noop),
+    ]
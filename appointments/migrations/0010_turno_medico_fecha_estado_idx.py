@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0009_estadisticadiariaturnos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['medico', 'fecha', 'estado'], name='turno_medico_fecha_estado_idx'),
+        ),
+    ]
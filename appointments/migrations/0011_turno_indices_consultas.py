@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0010_turno_medico_fecha_estado_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['paciente', 'fecha', 'hora'], name='turno_paciente_fecha_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['estado', 'fecha', 'hora'], name='turno_estado_fecha_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(condition=models.Q(('estado', 'pendiente')), fields=['medico', 'fecha', 'hora'], name='turno_pendiente_horario_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['fecha_creacion'], name='turno_fecha_creacion_idx'),
+        ),
+    ]
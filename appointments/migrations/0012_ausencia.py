@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0011_turno_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ausencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField()),
+                ('hora_inicio', models.TimeField(blank=True, help_text='Vacío para todo el día', null=True)),
+                ('hora_fin', models.TimeField(blank=True, help_text='Vacío para todo el día', null=True)),
+                ('motivo', models.CharField(max_length=200)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('medico', models.ForeignKey(blank=True, help_text='Vacío para un cierre de todo el consultorio', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ausencias', to='appointments.medico')),
+            ],
+            options={
+                'verbose_name': 'Ausencia',
+                'verbose_name_plural': 'Ausencias y Cierres',
+                'ordering': ['fecha_inicio', 'hora_inicio'],
+                'indexes': [models.Index(fields=['fecha_fin', 'fecha_inicio'], name='ausencia_intervalo_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('fecha_fin__gte', models.F('fecha_inicio'))), name='ausencia_fechas_ordenadas', violation_error_message='La fecha de fin no puede ser anterior a la de inicio.'), models.CheckConstraint(condition=models.Q(models.Q(('hora_fin__isnull', True), ('hora_inicio__isnull', True)), models.Q(('hora_fin__gt', models.F('hora_inicio')), ('hora_fin__isnull', False), ('hora_inicio__isnull', False)), _connector='OR'), name='ausencia_horas_validas', violation_error_message='Indique hora de inicio y de fin (la de inicio anterior), o ninguna para todo el día.')],
+            },
+        ),
+    ]
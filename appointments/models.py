@@ -1,8 +1,14 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
 from django.core.validators import RegexValidator
 from django.utils import timezone
 from datetime import time
+from time import monotonic
+from uuid import uuid4
+
+from .busqueda import normalizar
 
 # Modelo de Obra Social
 class ObraSocial(models.Model):
@@ -36,6 +42,9 @@ class Usuario(AbstractUser):
     telefono = models.CharField(max_length=15, blank=True)
     direccion = models.CharField(max_length=200, blank=True)
     fecha_nacimiento = models.DateField(null=True, blank=True)
+    # Apellido y nombre en minúsculas y sin acentos, para búsquedas por prefijo indexadas
+    apellido_normalizado = models.CharField(max_length=150, blank=True, editable=False)
+    nombre_normalizado = models.CharField(max_length=150, blank=True, editable=False)
     
     # Campos requeridos para createsuperuser
     REQUIRED_FIELDS = ['email']
@@ -43,9 +52,21 @@ class Usuario(AbstractUser):
     class Meta:
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
+        indexes = [
+            models.Index(fields=['apellido_normalizado', 'nombre_normalizado', 'id'], name='usuario_apellido_norm_idx'),
+            models.Index(fields=['nombre_normalizado'], name='usuario_nombre_norm_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_full_name()} ({self.get_rol_display()})"
+    
+    def save(self, *args, **kwargs):
+        self.apellido_normalizado = normalizar(self.last_name)
+        self.nombre_normalizado = normalizar(self.first_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'first_name', 'last_name'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'apellido_normalizado', 'nombre_normalizado'}
+        super().save(*args, **kwargs)
 
 
 # Modelo de Especialidad
@@ -113,6 +134,80 @@ class HorarioAtencion(models.Model):
         return f"{self.medico} - {self.get_dia_semana_display()} {self.hora_inicio}-{self.hora_fin}"
 
 
+# Modelo de Ausencia: ausencias de un médico o cierres de todo el consultorio
+class Ausencia(models.Model):
+    medico = models.ForeignKey(
+        Medico, on_delete=models.CASCADE, related_name='ausencias', null=True, blank=True,
+        help_text='Vacío para un cierre de todo el consultorio'
+    )
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField()
+    hora_inicio = models.TimeField(null=True, blank=True, help_text='Vacío para todo el día')
+    hora_fin = models.TimeField(null=True, blank=True, help_text='Vacío para todo el día')
+    motivo = models.CharField(max_length=200)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Ausencia'
+        verbose_name_plural = 'Ausencias y Cierres'
+        ordering = ['fecha_inicio', 'hora_inicio']
+        indexes = [
+            # Ausencias que se superponen con un rango: fecha_fin >= desde y fecha_inicio <= hasta
+            models.Index(fields=['fecha_fin', 'fecha_inicio'], name='ausencia_intervalo_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(fecha_fin__gte=models.F('fecha_inicio')),
+                name='ausencia_fechas_ordenadas',
+                violation_error_message='La fecha de fin no puede ser anterior a la de inicio.',
+            ),
+            # Ambas horas vacías (todo el día) o ambas cargadas y ordenadas
+            models.CheckConstraint(
+                condition=(
+                    models.Q(hora_inicio__isnull=True, hora_fin__isnull=True)
+                    | models.Q(hora_inicio__isnull=False, hora_fin__isnull=False, hora_fin__gt=models.F('hora_inicio'))
+                ),
+                name='ausencia_horas_validas',
+                violation_error_message='Indique hora de inicio y de fin (la de inicio anterior), o ninguna para todo el día.',
+            ),
+        ]
+    
+    def __str__(self):
+        quien = self.medico or 'Consultorio'
+        periodo = f"{self.fecha_inicio:%d/%m/%Y}"
+        if self.fecha_fin != self.fecha_inicio:
+            periodo += f" al {self.fecha_fin:%d/%m/%Y}"
+        if not self.es_dia_completo:
+            periodo += f" {self.hora_inicio:%H:%M}-{self.hora_fin:%H:%M}"
+        return f"{quien} - {periodo}: {self.motivo}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._medico_id_original = instance.__dict__.get('medico_id')
+        return instance
+    
+    @property
+    def es_dia_completo(self):
+        return self.hora_inicio is None
+    
+    def medicos_afectados(self):
+        """
+        Ids de los médicos cuya agenda cambió (el actual y el anterior si se
+        editó), o None si la ausencia es o era un cierre del consultorio.
+        """
+        ids = {self.medico_id, getattr(self, '_medico_id_original', self.medico_id)}
+        if None in ids:
+            return None
+        return ids
+    
+    def mensaje(self):
+        """Explicación para los formularios que rechazan un turno por esta ausencia"""
+        if self.medico_id is None:
+            return f"El consultorio está cerrado en ese horario: {self.motivo}"
+        return f"El médico no atiende en ese horario: {self.motivo}"
+
+
 # Modelo de Paciente (Perfil extendido)
 class Paciente(models.Model):
     usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, related_name='perfil_paciente')
@@ -151,6 +246,21 @@ class Turno(models.Model):
         ('rechazado', 'Rechazado'),
     )
     
+    # Estados en los que el turno ocupa el horario del médico
+    ESTADOS_OCUPAN_HORARIO = ('activo', 'en_atencion')
+    
+    # Clase CSS del badge de cada estado
+    CLASES_BADGE_ESTADO = {
+        'pendiente': 'badge-pendiente',
+        'activo': 'badge-confirmado',
+        'en_atencion': 'badge-confirmado',
+        'atendido': 'badge-atendido',
+        'cancelado_paciente': 'badge-cancelado',
+        'cancelado_medico': 'badge-cancelado',
+        'ausente': 'badge-ausente',
+        'rechazado': 'badge-rechazado',
+    }
+    
     paciente = models.ForeignKey(Paciente, on_delete=models.CASCADE, related_name='turnos')
     medico = models.ForeignKey(Medico, on_delete=models.CASCADE, related_name='turnos', null=True, blank=True)
     especialidad = models.ForeignKey(Especialidad, on_delete=models.CASCADE)
@@ -166,12 +276,93 @@ class Turno(models.Model):
         verbose_name = 'Turno'
         verbose_name_plural = 'Turnos'
         ordering = ['-fecha', '-hora']
-        # No usar unique_together para permitir múltiples solicitudes pendientes
-        # La validación se hace en el formulario y al activar turnos
+        # No usar unique_together para permitir múltiples solicitudes pendientes:
+        # la unicidad solo se exige entre los turnos que ocupan el horario
+        indexes = [
+            # Orden y paginación por clave del listado de turnos
+            models.Index(fields=['fecha', 'hora', 'id'], name='turno_fecha_hora_id_idx'),
+            # Turnos de un médico por rango de fechas (agenda y contadores del mes)
+            models.Index(fields=['medico', 'fecha', 'estado'], name='turno_medico_fecha_estado_idx'),
+            # Turnos de un paciente (próximos e historial)
+            models.Index(fields=['paciente', 'fecha', 'hora'], name='turno_paciente_fecha_hora_idx'),
+            # Listados filtrados por estado y rango de fechas
+            models.Index(fields=['estado', 'fecha', 'hora'], name='turno_estado_fecha_hora_idx'),
+            # Solicitudes pendientes por horario (cola de pendientes y competencia
+            # entre solicitudes); los horarios ocupados usan turno_horario_ocupado_unico
+            models.Index(
+                fields=['medico', 'fecha', 'hora'],
+                condition=models.Q(estado='pendiente'),
+                name='turno_pendiente_horario_idx',
+            ),
+            # Últimos turnos solicitados (dashboard de administración)
+            models.Index(fields=['fecha_creacion'], name='turno_fecha_creacion_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['medico', 'fecha', 'hora'],
+                condition=models.Q(estado__in=['activo', 'en_atencion']),
+                name='turno_horario_ocupado_unico',
+                violation_error_message='Ya existe un turno activo para este médico en ese horario.',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.paciente} - {self.medico} - {self.fecha} {self.hora}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.guardar_valores_originales()
+        return instance
+    
+    def guardar_valores_originales(self):
+        """Recuerda los campos que determinan si el turno ocupa un horario y cómo se cuenta en las estadísticas"""
+        self._valores_originales = {
+            campo: self.__dict__.get(campo)
+            for campo in ('medico_id', 'especialidad_id', 'fecha', 'hora', 'estado')
+        }
+    
+    def horario_ocupado(self):
+        """Retorna (medico_id, fecha, hora) si el turno ocupa un horario, o None"""
+        if self.medico_id and self.estado in self.ESTADOS_OCUPAN_HORARIO:
+            return (self.medico_id, self.fecha, self.hora)
+        return None
+    
+    def horarios_afectados(self):
+        """
+        Retorna los (medico_id, fecha, hora) cuya ocupación cambió desde que
+        el turno se leyó de la base (el horario anterior y el actual).
+        """
+        originales = getattr(self, '_valores_originales', None) or {}
+        anterior = None
+        if originales.get('medico_id') and originales.get('estado') in self.ESTADOS_OCUPAN_HORARIO:
+            anterior = (originales['medico_id'], originales['fecha'], originales['hora'])
+        actual = self.horario_ocupado()
+        if anterior == actual:
+            return set()
+        return {clave for clave in (anterior, actual) if clave is not None}
+    
+    def agendas_afectadas(self):
+        """
+        Retorna los (medico_id, fecha) cuya disponibilidad pudo cambiar con el
+        turno, contando también los estados pendientes (que la API muestra ocupados).
+        """
+        originales = getattr(self, '_valores_originales', None) or {}
+        actual = (self.medico_id, self.fecha)
+        if originales and all(originales[campo] == getattr(self, campo) for campo in originales):
+            return set()
+        anterior = (originales.get('medico_id'), originales.get('fecha'))
+        return {agenda for agenda in (anterior, actual) if agenda[0]}
+    
+    def clave_estadistica(self, originales=False):
+        """(fecha, medico_id, especialidad_id, estado) con que el turno se cuenta en EstadisticaDiariaTurnos"""
+        if not originales:
+            return (self.fecha, self.medico_id, self.especialidad_id, self.estado)
+        valores = getattr(self, '_valores_originales', None)
+        if not valores:
+            return None
+        return (valores['fecha'], valores['medico_id'], valores['especialidad_id'], valores['estado'])
+    
     def get_estado_color(self):
         colores = {
             'pendiente': 'warning',
@@ -187,28 +378,19 @@ class Turno(models.Model):
     
     def get_estado_badge_class(self):
         """Retorna la clase CSS personalizada para el badge del estado"""
-        clases = {
-            'pendiente': 'badge-pendiente',
-            'activo': 'badge-confirmado',
-            'en_atencion': 'badge-confirmado',
-            'atendido': 'badge-atendido',
-            'cancelado_paciente': 'badge-cancelado',
-            'cancelado_medico': 'badge-cancelado',
-            'ausente': 'badge-ausente',
-            'rechazado': 'badge-rechazado',
-        }
-        return clases.get(self.estado, 'badge-estado')
+        return self.CLASES_BADGE_ESTADO.get(self.estado, 'badge-estado')
     
     def puede_cancelar(self):
         """Verifica si el turno puede ser cancelado"""
         if self.estado in ['atendido', 'cancelado_paciente', 'cancelado_medico', 'ausente', 'rechazado']:
             return False
-        # No permitir cancelar turnos con menos de 2 horas de anticipación
+        # No permitir cancelar turnos con menos anticipación que la configurada
+        horas_minimas = ConfiguracionSistema.actual().cancelacion_horas_minimas
         ahora = timezone.now()
         turno_datetime = timezone.make_aware(
             timezone.datetime.combine(self.fecha, self.hora)
         )
-        return turno_datetime > ahora + timezone.timedelta(hours=2)
+        return turno_datetime > ahora + timezone.timedelta(hours=horas_minimas)
     
     def puede_activar(self):
         """Verifica si el turno puede ser activado (validado)"""
@@ -223,10 +405,44 @@ class Turno(models.Model):
             medico=self.medico,
             fecha=self.fecha,
             hora=self.hora,
-            estado__in=['activo', 'en_atencion']
+            estado__in=self.ESTADOS_OCUPAN_HORARIO
         ).exclude(pk=self.pk if self.pk else None)
         return turnos_conflicto.exists()
     
+    def activar(self):
+        """
+        Valida el turno (pendiente -> activo) y rechaza los pendientes del mismo
+        horario en una sola transacción. Retorna la cantidad de rechazados.
+
+        Se bloquea la fila del médico para serializar las validaciones de su
+        agenda; el constraint turno_horario_ocupado_unico es la garantía final.
+        Lanza ValidationError si el turno no se puede activar.
+        """
+        if not self.medico_id:
+            raise ValidationError('No se puede validar un turno sin médico asignado.')
+        
+        with transaction.atomic():
+            Medico.objects.select_for_update().get(pk=self.medico_id)
+            estado_actual = Turno.objects.filter(pk=self.pk).values_list('estado', flat=True).first()
+            if estado_actual != 'pendiente':
+                raise ValidationError('Este turno no está pendiente de validación.')
+            if self.tiene_sobreposicion():
+                raise ValidationError('Ya existe otro turno activo en el mismo horario para este médico.')
+            from .disponibilidad import ausencia_en_horario
+            ausencia = ausencia_en_horario(self.medico_id, self.fecha, self.hora)
+            if ausencia:
+                raise ValidationError(ausencia.mensaje())
+            
+            self.estado = 'activo'
+            try:
+                with transaction.atomic():
+                    self.save()
+            except IntegrityError:
+                self.estado = estado_actual
+                raise ValidationError('Ya existe otro turno activo en el mismo horario para este médico.')
+            
+            return self.rechazar_turnos_pendientes_conflictivos()
+    
     def rechazar_turnos_pendientes_conflictivos(self):
         """Rechaza automáticamente todos los turnos pendientes que coincidan con este turno"""
         turnos_a_rechazar = Turno.objects.filter(
@@ -236,13 +452,87 @@ class Turno(models.Model):
             estado='pendiente'
         ).exclude(pk=self.pk)
         
-        cantidad = turnos_a_rechazar.count()
-        turnos_a_rechazar.update(estado='rechazado')
-        return cantidad
+        with transaction.atomic():
+            # Bloqueados para que el paciente no los cancele entre la lectura y la actualización
+            rechazados = list(turnos_a_rechazar.select_for_update().values_list('pk', 'especialidad_id'))
+            pks = [pk for pk, _ in rechazados]
+            actualizados = Turno.objects.filter(pk__in=pks, estado='pendiente').update(
+                estado='rechazado', fecha_modificacion=timezone.now()
+            )
+            if actualizados != len(rechazados):
+                # Sin bloqueo de filas (SQLite) alguno pudo cambiar de estado: contar solo los rechazados aquí
+                rechazados = list(Turno.objects.filter(pk__in=pks, estado='rechazado').values_list('pk', 'especialidad_id'))
+        if rechazados:
+            # update() no dispara señales: invalidar la disponibilidad cacheada
+            # y mover los turnos de estado en las estadísticas
+            from .disponibilidad import invalidar_agendas
+            from .estadisticas import registrar_cambios_estado
+            invalidar_agendas([(self.medico_id, self.fecha)])
+            registrar_cambios_estado(
+                ((self.fecha, self.medico_id, especialidad_id) for _, especialidad_id in rechazados),
+                'pendiente', 'rechazado'
+            )
+        return len(rechazados)
+
+
+# Modelo de Slot (disponibilidad materializada, opcional)
+class Slot(models.Model):
+    medico = models.ForeignKey(Medico, on_delete=models.CASCADE, related_name='slots')
+    fecha = models.DateField()
+    hora = models.TimeField()
+    ocupado = models.BooleanField(default=False)
+    
+    class Meta:
+        verbose_name = 'Slot'
+        verbose_name_plural = 'Slots'
+        unique_together = ['medico', 'fecha', 'hora']
+        ordering = ['fecha', 'hora']
+        indexes = [
+            models.Index(fields=['fecha', 'ocupado', 'hora'], name='slot_fecha_ocupado_hora_idx'),
+        ]
+    
+    def __str__(self):
+        estado = 'ocupado' if self.ocupado else 'libre'
+        return f"{self.medico} - {self.fecha} {self.hora} ({estado})"
+
+
+# Modelo de estadísticas precalculadas (ver estadisticas.py)
+class EstadisticaDiariaTurnos(models.Model):
+    fecha = models.DateField()
+    medico = models.ForeignKey(Medico, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    especialidad = models.ForeignKey(Especialidad, on_delete=models.CASCADE, related_name='+')
+    estado = models.CharField(max_length=20, choices=Turno.ESTADOS)
+    total = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Estadística Diaria de Turnos'
+        verbose_name_plural = 'Estadísticas Diarias de Turnos'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'medico', 'especialidad', 'estado'],
+                name='estadistica_diaria_unica',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} - {self.medico or 'Sin médico'} - {self.especialidad} - {self.estado}: {self.total}"
+
+
+# Token de versión de la configuración en la caché compartida
+CLAVE_VERSION_CONFIGURACION = 'configuracion:version'
+
+# Cada proceso revisa el token a lo sumo una vez en este intervalo
+SEGUNDOS_REVISION_CONFIGURACION = 5
 
 
 # Modelo de Configuración del Sistema
 class ConfiguracionSistema(models.Model):
+    VALIDACION_AUTOMATICA = (
+        ('manual', 'Manual (cada solicitud la valida un administrador)'),
+        ('programada', 'Programada (comando validar_turnos_automaticamente)'),
+        ('al_solicitar', 'Al solicitar el turno'),
+    )
+    
     nombre_consultorio = models.CharField(max_length=200, default="MediTurnos")
     direccion = models.CharField(max_length=300, blank=True)
     telefono = models.CharField(max_length=20, blank=True)
@@ -251,6 +541,11 @@ class ConfiguracionSistema(models.Model):
     horario_cierre = models.TimeField(default=time(16, 0))
     turnos_simultaneos = models.IntegerField(default=1, help_text="Turnos simultáneos por médico")
     cancelacion_horas_minimas = models.IntegerField(default=2, help_text="Horas mínimas para cancelar")
+    validacion_automatica = models.CharField(
+        max_length=20, choices=VALIDACION_AUTOMATICA, default='manual',
+        help_text="Activar sin intervención las solicitudes que no compiten con otras por el horario"
+    )
+    slots_generados_hasta = models.DateField(null=True, blank=True, editable=False, help_text="Última fecha cubierta por la tabla de slots")
     
     class Meta:
         verbose_name = 'Configuración del Sistema'
@@ -259,7 +554,42 @@ class ConfiguracionSistema(models.Model):
     def __str__(self):
         return self.nombre_consultorio
     
+    # Copia del proceso: (configuración, token de versión, última revisión)
+    _copia_local = None
+    
     @classmethod
     def get_configuracion(cls):
         config, created = cls.objects.get_or_create(pk=1)
-        return config
\ No newline at end of file
+        return config
+    
+    @classmethod
+    def actual(cls):
+        """
+        Configuración vigente, de solo lectura. Cada proceso guarda una copia
+        y la vuelve a leer de la base únicamente cuando cambia el token de
+        versión de la caché compartida, que se renueva al guardarla.
+        """
+        ahora = monotonic()
+        copia = cls._copia_local
+        if copia is not None and ahora - copia[2] < SEGUNDOS_REVISION_CONFIGURACION:
+            return copia[0]
+
+        token = cache.get(CLAVE_VERSION_CONFIGURACION)
+        if token is None:
+            # add() no pisa un token que otro proceso haya renovado mientras tanto
+            cache.add(CLAVE_VERSION_CONFIGURACION, uuid4().hex, None)
+            token = cache.get(CLAVE_VERSION_CONFIGURACION)
+        if copia is not None and token is not None and copia[1] == token:
+            cls._copia_local = (copia[0], token, ahora)
+            return copia[0]
+
+        # El token se leyó antes que la base: si cambia mientras tanto, se relee en la próxima revisión
+        config = cls.get_configuracion()
+        cls._copia_local = (config, token, ahora)
+        return config
+    
+    @classmethod
+    def invalidar_cache(cls):
+        """Obliga a todos los procesos a releer la configuración"""
+        cache.set(CLAVE_VERSION_CONFIGURACION, uuid4().hex, None)
+        cls._copia_local = None
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""
+Señales para mantener sincronizados los datos derivados de turnos y horarios
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .disponibilidad import invalidar_agendas, invalidar_medicos
+from .estadisticas import invalidar_metricas_dashboard, registrar_turno
+from .models import Ausencia, ConfiguracionSistema, Especialidad, HorarioAtencion, Medico, Paciente, Turno
+from .slots import actualizar_slots, regenerar_slots, slots_habilitados
+
+
+@receiver(post_save, sender=HorarioAtencion)
+@receiver(post_delete, sender=HorarioAtencion)
+def horario_modificado(sender, instance, **kwargs):
+    """Regenera los slots del médico cuando cambian sus horarios de atención"""
+    invalidar_medicos([instance.medico_id])
+    if slots_habilitados():
+        regenerar_slots(medico_ids=[instance.medico_id])
+
+
+@receiver(post_save, sender=Ausencia)
+@receiver(post_delete, sender=Ausencia)
+def ausencia_modificada(sender, instance, **kwargs):
+    """Invalida la disponibilidad y regenera los slots de los médicos afectados (todos si es un cierre)"""
+    medico_ids = instance.medicos_afectados()
+    if medico_ids is None:
+        medico_ids = list(Medico.objects.values_list('pk', flat=True))
+    instance._medico_id_original = instance.medico_id
+    invalidar_medicos(medico_ids)
+    if slots_habilitados():
+        regenerar_slots(medico_ids=medico_ids)
+
+
+@receiver(post_save, sender=ConfiguracionSistema)
+@receiver(post_delete, sender=ConfiguracionSistema)
+def configuracion_modificada(sender, instance, **kwargs):
+    """Descarta la configuración cacheada en todos los procesos al confirmarse el cambio"""
+    transaction.on_commit(ConfiguracionSistema.invalidar_cache)
+
+
+@receiver(post_save, sender=Medico)
+def medico_guardado(sender, instance, created, **kwargs):
+    """Invalida la disponibilidad cacheada si el médico pudo activarse o desactivarse"""
+    if not created:
+        invalidar_medicos([instance.pk])
+
+
+@receiver(post_save, sender=Paciente)
+@receiver(post_delete, sender=Paciente)
+@receiver(post_save, sender=Medico)
+@receiver(post_delete, sender=Medico)
+@receiver(post_save, sender=Especialidad)
+@receiver(post_delete, sender=Especialidad)
+def totales_modificados(sender, instance, **kwargs):
+    """Descarta las métricas del dashboard, que incluyen los totales de pacientes, médicos y especialidades"""
+    transaction.on_commit(invalidar_metricas_dashboard)
+
+
+@receiver(m2m_changed, sender=Medico.especialidades.through)
+def especialidades_modificadas(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalida la disponibilidad cacheada al asociar o quitar especialidades"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # instance es una Especialidad y pk_set son médicos
+        medico_ids = pk_set if pk_set is not None else instance.medicos.values_list('pk', flat=True)
+        invalidar_medicos(medico_ids, especialidad_ids=[instance.pk])
+    else:
+        invalidar_medicos([instance.pk], especialidad_ids=pk_set or ())
+
+
+@receiver(post_save, sender=Turno)
+def turno_guardado(sender, instance, created, **kwargs):
+    """Actualiza los slots y las estadísticas que cambiaron con el turno"""
+    afectados = instance.horarios_afectados()
+    agendas = instance.agendas_afectadas()
+    registrar_turno(instance, creado=created)
+    instance.guardar_valores_originales()
+    invalidar_agendas(agendas)
+    if afectados and slots_habilitados():
+        actualizar_slots(afectados)
+
+
+@receiver(post_delete, sender=Turno)
+def turno_eliminado(sender, instance, **kwargs):
+    """Libera el slot que ocupaba el turno eliminado y lo descuenta de las estadísticas"""
+    invalidar_agendas([(instance.medico_id, instance.fecha)])
+    registrar_turno(instance, eliminado=True)
+    ocupado = instance.horario_ocupado()
+    if ocupado and slots_habilitados():
+        actualizar_slots([ocupado])
@@ -0,0 +1,148 @@
+"""
+Mantenimiento de la tabla Slot (disponibilidad materializada)
+
+La tabla se regenera completa con el comando `regenerar_slots`, se
+regenera por médico cuando cambian sus horarios de atención o sus
+ausencias (todos los médicos con los cierres del consultorio) y se
+actualiza slot por slot cuando un turno entra o sale de los estados que
+ocupan horario. Los horarios bloqueados por ausencias no tienen slot.
+"""
+from collections import defaultdict
+from datetime import date, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .disponibilidad import Ausencias, generar_slots, minuto_del_dia
+from .models import ConfiguracionSistema, HorarioAtencion, Slot, Turno
+from .utils import es_dia_laboral
+
+ClaveSlot = Tuple[int, date, time]
+
+
+def slots_habilitados() -> bool:
+    return getattr(settings, 'MEDITURNOS_SLOTS_MATERIALIZADOS', False)
+
+
+def calcular_slots(desde: date, hasta: date, medico_ids: Optional[Iterable[int]] = None) -> Dict[ClaveSlot, bool]:
+    """Calcula {(medico_id, fecha, hora): ocupado} desde los horarios de atención, los turnos y las ausencias"""
+    horarios = HorarioAtencion.objects.filter(activo=True)
+    turnos = Turno.objects.filter(
+        fecha__gte=desde,
+        fecha__lte=hasta,
+        medico__isnull=False,
+        estado__in=Turno.ESTADOS_OCUPAN_HORARIO
+    )
+    if medico_ids is not None:
+        medico_ids = list(medico_ids)
+        horarios = horarios.filter(medico_id__in=medico_ids)
+        turnos = turnos.filter(medico_id__in=medico_ids)
+
+    horarios_por_dia = defaultdict(list)
+    for medico_id, dia_semana, hora_inicio, hora_fin in horarios.values_list(
+        'medico_id', 'dia_semana', 'hora_inicio', 'hora_fin'
+    ):
+        horarios_por_dia[dia_semana].append((medico_id, generar_slots(hora_inicio, hora_fin)))
+    ocupados = set(turnos.values_list('medico_id', 'fecha', 'hora'))
+    ausencias = Ausencias.cargar(desde, hasta, medico_ids)
+
+    slots = {}
+    fecha = desde
+    while fecha <= hasta:
+        if es_dia_laboral(fecha)[0]:
+            for medico_id, horas in horarios_por_dia.get(fecha.weekday(), []):
+                bloqueados = ausencias.mascara(medico_id, fecha) if ausencias else 0
+                for hora in horas:
+                    if bloqueados >> minuto_del_dia(hora) & 1:
+                        continue
+                    clave = (medico_id, fecha, hora)
+                    slots[clave] = clave in ocupados
+        fecha += timedelta(days=1)
+    return slots
+
+
+def regenerar_slots(medico_ids: Optional[Iterable[int]] = None, dias: Optional[int] = None) -> int:
+    """
+    Reconstruye los slots desde hoy. Sin `medico_ids` regenera todo el
+    horizonte y actualiza la cobertura; con `medico_ids` regenera solo
+    esos médicos hasta la cobertura actual. Retorna la cantidad de slots.
+    """
+    hoy = timezone.localdate()
+    config = ConfiguracionSistema.get_configuracion()
+    if medico_ids is None:
+        if dias is None:
+            dias = settings.MEDITURNOS_SLOTS_HORIZONTE_DIAS
+        hasta = hoy + timedelta(days=dias - 1)
+    else:
+        medico_ids = list(medico_ids)
+        hasta = config.slots_generados_hasta
+        if hasta is None or hasta < hoy:
+            return 0
+
+    slots = calcular_slots(hoy, hasta, medico_ids)
+    with transaction.atomic():
+        if medico_ids is None:
+            # Regeneración completa: también se descartan los slots de días pasados
+            Slot.objects.all().delete()
+        else:
+            Slot.objects.filter(medico_id__in=medico_ids, fecha__gte=hoy).delete()
+        Slot.objects.bulk_create(
+            [
+                Slot(medico_id=medico_id, fecha=fecha, hora=hora, ocupado=ocupado)
+                for (medico_id, fecha, hora), ocupado in slots.items()
+            ],
+            batch_size=1000
+        )
+        if medico_ids is None:
+            config.slots_generados_hasta = hasta
+            config.save(update_fields=['slots_generados_hasta'])
+    return len(slots)
+
+
+def actualizar_slots(claves: Iterable[ClaveSlot]):
+    """Recalcula el estado ocupado de los slots indicados, una consulta por slot"""
+    for medico_id, fecha, hora in claves:
+        Slot.objects.filter(medico_id=medico_id, fecha=fecha, hora=hora).update(
+            ocupado=Exists(Turno.objects.filter(
+                medico_id=OuterRef('medico_id'),
+                fecha=OuterRef('fecha'),
+                hora=OuterRef('hora'),
+                estado__in=Turno.ESTADOS_OCUPAN_HORARIO
+            ))
+        )
+
+
+def verificar_slots() -> List[str]:
+    """Compara la tabla con los slots calculados y retorna las diferencias encontradas"""
+    hasta = ConfiguracionSistema.get_configuracion().slots_generados_hasta
+    if hasta is None:
+        return ['La tabla de slots nunca fue generada']
+
+    hoy = timezone.localdate()
+    esperados = calcular_slots(hoy, hasta)
+    guardados = {
+        (medico_id, fecha, hora): ocupado
+        for medico_id, fecha, hora, ocupado in Slot.objects.filter(
+            fecha__gte=hoy, fecha__lte=hasta
+        ).values_list('medico_id', 'fecha', 'hora', 'ocupado')
+    }
+
+    diferencias = []
+    for clave in sorted(esperados.keys() | guardados.keys()):
+        esperado = esperados.get(clave)
+        guardado = guardados.get(clave)
+        if esperado != guardado:
+            medico_id, fecha, hora = clave
+            diferencias.append(
+                f'Médico {medico_id} {fecha} {hora:%H:%M}: esperado {_describir(esperado)}, guardado {_describir(guardado)}'
+            )
+    return diferencias
+
+
+def _describir(ocupado: Optional[bool]) -> str:
+    if ocupado is None:
+        return 'sin slot'
+    return 'ocupado' if ocupado else 'libre'
@@ -1,3 +1,573 @@
-from django.test import TestCase
+import threading
+import time as reloj
+import re
+from datetime import time, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Count
+from django.db.models.query import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .disponibilidad import horas_libres_cacheadas
+from .estadisticas import metricas_dashboard
+from .forms import TurnoForm
+from .models import (
+    Ausencia, ConfiguracionSistema, Especialidad, EstadisticaDiariaTurnos, HorarioAtencion, Medico, Paciente, Slot,
+    Turno, Usuario
+)
+from .slots import regenerar_slots, verificar_slots
+from .validacion import procesar_lote
+
+
+class MediTurnosTestCase(TestCase):
+    """Datos mínimos: una especialidad, dos médicos que atienden todos los días, un paciente y un administrador"""
+
+    def setUp(self):
+        # Las cachés no se revierten con la transacción de cada prueba
+        cache.clear()
+        ConfiguracionSistema._copia_local = None
+
+        self.especialidad = Especialidad.objects.create(nombre='Clínica Médica')
+        self.medicos = [self.agregar_medico(i) for i in range(2)]
+        self.medico = self.medicos[0]
+
+        usuario = Usuario.objects.create_user(username='paciente', password='clave', rol='paciente', dni='30000000')
+        self.paciente = Paciente.objects.create(usuario=usuario)
+        self.admin = Usuario.objects.create_user(username='admin', password='clave', rol='admin', dni='30000001')
+
+    def agregar_medico(self, numero):
+        """Médico de la especialidad que atiende de 7 a 16 todos los días"""
+        usuario = Usuario.objects.create(
+            username=f'medico{numero}', first_name=f'Médico{numero}', last_name=f'Apellido{numero}',
+            rol='medico', dni=f'{20000000 + numero}'
+        )
+        medico = Medico.objects.create(usuario=usuario, matricula=f'MN{numero}')
+        medico.especialidades.add(self.especialidad)
+        HorarioAtencion.objects.bulk_create([
+            HorarioAtencion(medico=medico, dia_semana=dia, hora_inicio=time(7), hora_fin=time(16)) for dia in range(7)
+        ])
+        return medico
+
+    def fecha_futura(self, dias=7):
+        """Un día laboral a `dias` o más días de hoy"""
+        from .utils import es_dia_laboral
+        fecha = timezone.localdate() + timedelta(days=dias)
+        while not es_dia_laboral(fecha)[0]:
+            fecha += timedelta(days=1)
+        return fecha
+
+    def crear_turno(self, medico=None, paciente=None, fecha=None, hora=time(9), estado='activo'):
+        return Turno.objects.create(
+            paciente=paciente or self.paciente, medico=medico or self.medico, especialidad=self.especialidad,
+            fecha=fecha or self.fecha_futura(), hora=hora, estado=estado
+        )
+
+
+class EliminacionEnCascadaTests(MediTurnosTestCase):
+    """Eliminar un médico o una especialidad con turnos no debe dejar estadísticas huérfanas"""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_turno(estado='activo')
+        self.crear_turno(hora=time(10), estado='pendiente')
+        self.client.force_login(self.admin)
+
+    def test_eliminar_medico_con_turnos(self):
+        respuesta = self.client.post(reverse('admin_medico_eliminar', args=[self.medico.pk]))
+        self.assertRedirects(respuesta, reverse('admin_medicos'), fetch_redirect_response=False)
+        self.assertFalse(Medico.objects.filter(pk=self.medico.pk).exists())
+        self.assertFalse(Turno.objects.filter(medico_id=self.medico.pk).exists())
+        self.assertFalse(EstadisticaDiariaTurnos.objects.filter(medico_id=self.medico.pk).exists())
+
+    def test_eliminar_especialidad_con_turnos(self):
+        respuesta = self.client.post(reverse('admin_especialidad_eliminar', args=[self.especialidad.pk]))
+        self.assertRedirects(respuesta, reverse('admin_especialidades'), fetch_redirect_response=False)
+        self.assertFalse(EstadisticaDiariaTurnos.objects.exists())
+
+    def test_eliminar_turno_descuenta_estadisticas(self):
+        Turno.objects.filter(estado='pendiente').get().delete()
+        self.assertEqual(
+            list(EstadisticaDiariaTurnos.objects.filter(total__gt=0).values_list('estado', 'total')),
+            [('activo', 1)]
+        )
+
+
+class AutenticacionTests(MediTurnosTestCase):
+    """Inicio de sesión con PerfilBackend y sesiones anteriores a él"""
+
+    def test_login_usa_perfil_backend(self):
+        self.assertTrue(self.client.login(username='paciente', password='clave'))
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], 'appointments.autenticacion.PerfilBackend')
+        self.assertFalse(self.client.login(username='paciente', password='incorrecta'))
+
+    def test_sesion_iniciada_con_model_backend_sigue_valida(self):
+        self.client.force_login(self.paciente.usuario, backend='django.contrib.auth.backends.ModelBackend')
+        respuesta = self.client.get(reverse('paciente_dashboard'))
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_rol_requerido(self):
+        respuesta = self.client.get(reverse('admin_dashboard'))
+        self.assertRedirects(respuesta, f"{reverse('login')}?next={reverse('admin_dashboard')}")
+
+        self.client.force_login(self.paciente.usuario)
+        respuesta = self.client.get(reverse('admin_dashboard'))
+        self.assertRedirects(respuesta, reverse('dashboard'), fetch_redirect_response=False)
+        respuesta = self.client.get(reverse('admin_dashboard_metricas'))
+        self.assertEqual(respuesta.status_code, 403)
+        self.assertFalse(respuesta.json()['success'])
+
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('admin_dashboard')).status_code, 200)
+        self.assertTrue(self.client.get(reverse('admin_dashboard_metricas')).json()['success'])
+
+
+class BusquedaUsuariosTests(MediTurnosTestCase):
+    """Búsqueda de pacientes al asignar el rol de médico"""
+
+    def setUp(self):
+        super().setUp()
+        usuario = self.paciente.usuario
+        usuario.first_name, usuario.last_name = 'José', 'Pérez'
+        usuario.save()
+        self.client.force_login(self.admin)
+
+    def buscar(self, termino):
+        respuesta = self.client.get(reverse('admin_medico_crear'), {'buscar': termino})
+        return list(respuesta.context['usuarios_encontrados'])
+
+    def test_busca_por_apellido_dni_o_email(self):
+        self.assertEqual(self.buscar('perez'), [self.paciente.usuario])
+        self.assertEqual(self.buscar('Pér jo'), [self.paciente.usuario])
+        self.assertEqual(self.buscar('3000'), [self.paciente.usuario])
+
+    def test_no_incluye_medicos(self):
+        self.assertEqual(self.buscar('apellido'), [])
+
+
+class ActivacionTurnoTests(MediTurnosTestCase):
+    """Turno.activar rechaza las demás solicitudes del horario"""
+
+    def totales(self):
+        return dict(EstadisticaDiariaTurnos.objects.filter(total__gt=0).values_list('estado', 'total'))
+
+    def test_activar_rechaza_competidores(self):
+        fecha = self.fecha_futura()
+        turno = self.crear_turno(fecha=fecha, estado='pendiente')
+        otros = [self.crear_turno(fecha=fecha, estado='pendiente') for _ in range(2)]
+
+        self.assertEqual(turno.activar(), 2)
+        for otro in otros:
+            modificado = otro.fecha_modificacion
+            otro.refresh_from_db()
+            self.assertEqual(otro.estado, 'rechazado')
+            self.assertGreater(otro.fecha_modificacion, modificado)
+        self.assertEqual(self.totales(), {'activo': 1, 'rechazado': 2})
+
+    def test_no_rechaza_solicitudes_canceladas(self):
+        fecha = self.fecha_futura()
+        turno = self.crear_turno(fecha=fecha, estado='pendiente')
+        cancelado = self.crear_turno(fecha=fecha, estado='pendiente')
+        cancelado.estado = 'cancelado_paciente'
+        cancelado.save()
+
+        self.assertEqual(turno.activar(), 0)
+        cancelado.refresh_from_db()
+        self.assertEqual(cancelado.estado, 'cancelado_paciente')
+        self.assertEqual(self.totales(), {'activo': 1, 'cancelado_paciente': 1})
+
+    def test_cancelacion_durante_el_rechazo(self):
+        """Una solicitud cancelada entre la lectura y la actualización no se pisa ni se cuenta"""
+        fecha = self.fecha_futura()
+        turno = self.crear_turno(fecha=fecha, estado='pendiente')
+        competidor = self.crear_turno(fecha=fecha, estado='pendiente')
+        actualizar = QuerySet.update
+
+        def cancelar_antes(queryset, **valores):
+            if valores.get('estado') == 'rechazado':
+                actualizar(Turno.objects.filter(pk=competidor.pk), estado='cancelado_paciente')
+            return actualizar(queryset, **valores)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=cancelar_antes):
+            self.assertEqual(turno.activar(), 0)
+        competidor.refresh_from_db()
+        self.assertEqual(competidor.estado, 'cancelado_paciente')
+        self.assertNotIn('rechazado', self.totales())
+
+
+class AusenciaTurnoFormTests(MediTurnosTestCase):
+    """TurnoForm frente a una ausencia cargada después de dar el turno"""
+
+    def setUp(self):
+        super().setUp()
+        self.turno = self.crear_turno()
+        Ausencia.objects.create(
+            medico=self.medico, fecha_inicio=self.turno.fecha, fecha_fin=self.turno.fecha, motivo='Congreso'
+        )
+
+    def formulario(self, instancia=None, **cambios):
+        datos = {
+            'paciente': self.paciente.pk, 'medico': self.medico.pk, 'especialidad': self.especialidad.pk,
+            'fecha': self.turno.fecha, 'hora': '09:00', 'motivo_consulta': '', 'estado': 'activo', **cambios
+        }
+        return TurnoForm(datos, instance=instancia)
+
+    def test_cancelar_turno_dentro_de_la_ausencia(self):
+        formulario = self.formulario(self.turno, estado='cancelado_medico')
+        self.assertTrue(formulario.is_valid(), formulario.errors)
+        formulario.save()
+        self.assertEqual(Turno.objects.get(pk=self.turno.pk).estado, 'cancelado_medico')
+
+    def test_no_toma_horarios_de_la_ausencia(self):
+        self.assertFalse(self.formulario(hora='10:00').is_valid())
+        self.assertFalse(self.formulario(self.turno, hora='10:00').is_valid())
+        Turno.objects.filter(pk=self.turno.pk).update(estado='cancelado_medico')
+        self.assertFalse(self.formulario(Turno.objects.get(pk=self.turno.pk)).is_valid())
+
+
+class DisponibilidadRangoTests(MediTurnosTestCase):
+    """api_disponibilidad_rango"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.paciente.usuario)
+
+    def pedir(self, **parametros):
+        return self.client.get(reverse('api_disponibilidad_rango'), {'especialidad_id': self.especialidad.pk, **parametros})
+
+    def test_rango_de_dias_laborales(self):
+        fecha = self.fecha_futura()
+        self.crear_turno(fecha=fecha, hora=time(9), medico=self.medicos[0])
+        self.crear_turno(fecha=fecha, hora=time(9), medico=self.medicos[1])
+        respuesta = self.pedir(desde=fecha.isoformat(), dias=1)
+        self.assertEqual(respuesta.status_code, 200)
+        horas = [horario['hora'] for horario in respuesta.json()['dias'][0]['horarios']]
+        self.assertNotIn('09:00', horas)
+        self.assertIn('09:30', horas)
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.pedir(dias='x').status_code, 400)
+        self.assertEqual(self.pedir(dias=0).status_code, 400)
+
+    def test_rango_fuera_del_calendario(self):
+        self.assertEqual(self.pedir(desde='9999-12-30', dias=10).status_code, 400)
+
+    def test_ultimos_dias_del_calendario(self):
+        respuesta = self.pedir(desde='9999-12-27', dias=5)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['hasta'], '9999-12-31')
+
+
+class HorariosEspecialidadTests(MediTurnosTestCase):
+    """api_horarios_disponibles_especialidad: resultado y consultas que no dependen de la cantidad de médicos"""
+
+    def setUp(self):
+        super().setUp()
+        self.fecha = self.fecha_futura()
+        self.client.force_login(self.paciente.usuario)
+
+    def pedir(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as contexto:
+            respuesta = self.client.get(reverse('api_horarios_disponibles_especialidad'), {
+                'especialidad_id': self.especialidad.pk, 'fecha': self.fecha.isoformat()
+            })
+        self.assertEqual(respuesta.status_code, 200)
+        return [slot['hora'] for slot in respuesta.json()], len(contexto.captured_queries)
+
+    def test_horas_con_algun_medico_libre(self):
+        for medico in self.medicos:
+            self.crear_turno(medico=medico, fecha=self.fecha, hora=time(8))
+        self.crear_turno(medico=self.medicos[0], fecha=self.fecha, hora=time(9))
+        horas, _ = self.pedir()
+        self.assertEqual(horas[:3], ['07:00', '07:30', '08:30'])
+        self.assertIn('09:00', horas)
+        self.assertEqual(horas[-1], '15:30')
+
+    def test_consultas_constantes(self):
+        _, consultas = self.pedir()
+        for numero in range(2, 12):
+            self.agregar_medico(numero)
+        _, consultas_con_mas_medicos = self.pedir()
+        self.assertEqual(consultas, consultas_con_mas_medicos)
+
+
+class SlotsMaterializadosTests(MediTurnosTestCase):
+    """La tabla de slots sigue a los turnos y a los horarios de atención"""
+
+    @override_settings(MEDITURNOS_SLOTS_MATERIALIZADOS=True)
+    def test_slots_materializados(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            regenerar_slots(dias=14)
+        fecha = self.fecha_futura()
+        turno = self.crear_turno(fecha=fecha, hora=time(9))
+        self.assertTrue(Slot.objects.get(medico=self.medico, fecha=fecha, hora=time(9)).ocupado)
+
+        turno.hora = time(10)
+        turno.save()
+        self.assertFalse(Slot.objects.get(medico=self.medico, fecha=fecha, hora=time(9)).ocupado)
+        self.assertTrue(Slot.objects.get(medico=self.medico, fecha=fecha, hora=time(10)).ocupado)
+
+        horario = HorarioAtencion.objects.filter(medico=self.medicos[1]).first()
+        horario.hora_fin = time(12)
+        horario.save()
+        turno.delete()
+        self.assertEqual(verificar_slots(), [])
+
+
+class CacheDisponibilidadTests(MediTurnosTestCase):
+    """La disponibilidad cacheada se invalida al confirmarse los cambios"""
+
+    def test_cache_se_invalida_al_confirmar(self):
+        fecha = self.fecha_futura()
+        self.assertIn('09:00', horas_libres_cacheadas([fecha], medico_id=self.medico.pk)[fecha])
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.crear_turno(fecha=fecha, hora=time(9))
+        # Hasta confirmar, otros procesos no deben descartar lo cacheado
+        self.assertIn('09:00', horas_libres_cacheadas([fecha], medico_id=self.medico.pk)[fecha])
+        for callback in callbacks:
+            callback()
+        self.assertNotIn('09:00', horas_libres_cacheadas([fecha], medico_id=self.medico.pk)[fecha])
+
+
+class MetricasDashboardTests(MediTurnosTestCase):
+    """Las métricas cacheadas del dashboard siguen a los totales de pacientes, médicos y especialidades"""
+
+    def totales(self):
+        metricas = metricas_dashboard()
+        return metricas['total_pacientes'], metricas['total_medicos'], metricas['total_especialidades']
+
+    def test_totales_se_invalidan(self):
+        self.assertEqual(self.totales(), (1, 2, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            Paciente.objects.create(usuario=Usuario.objects.create(username='otro', rol='paciente', dni='30000002'))
+            self.medico.activo = False
+            self.medico.save()
+            Especialidad.objects.create(nombre='Cardiología')
+        self.assertEqual(self.totales(), (2, 1, 2))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.paciente.usuario.delete()
+        self.assertEqual(self.totales(), (1, 1, 2))
+
+
+class HorarioOcupadoTests(MediTurnosTestCase):
+    """Un solo turno ocupa cada horario y la validación no queda a medias"""
+
+    def test_un_turno_activo_por_horario(self):
+        fecha = self.fecha_futura()
+        self.crear_turno(fecha=fecha)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.crear_turno(fecha=fecha, estado='en_atencion')
+        # Las solicitudes pendientes del mismo horario se siguen aceptando
+        self.crear_turno(fecha=fecha, estado='pendiente')
+        self.crear_turno(fecha=fecha, estado='pendiente')
+
+    def test_activar_es_atomico(self):
+        fecha = self.fecha_futura()
+        turno = self.crear_turno(fecha=fecha, estado='pendiente')
+        competidor = self.crear_turno(fecha=fecha, estado='pendiente')
+        with mock.patch.object(Turno, 'rechazar_turnos_pendientes_conflictivos', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                turno.activar()
+        turno.refresh_from_db()
+        competidor.refresh_from_db()
+        self.assertEqual((turno.estado, competidor.estado), ('pendiente', 'pendiente'))
+
+
+class ValidacionConcurrenteTests(TransactionTestCase):
+    """Turno.activar desde varios hilos, cada uno con su conexión, no reserva dos veces un horario"""
+
+    HILOS = 4
+    INTENTOS = 200
+
+    def test_sin_doble_reserva(self):
+        especialidad = Especialidad.objects.create(nombre='Clínica Médica')
+        medico = Medico.objects.create(
+            usuario=Usuario.objects.create(username='medico', rol='medico', dni='20000000'), matricula='MN1'
+        )
+        fecha = timezone.localdate() + timedelta(days=7)
+        turno_ids = []
+        for i in range(self.HILOS * 2):
+            paciente = Paciente.objects.create(usuario=Usuario.objects.create(
+                username=f'paciente{i}', rol='paciente', dni=f'{30000000 + i}'
+            ))
+            for hora in (time(9), time(10)):
+                turno_ids.append(Turno.objects.create(
+                    paciente=paciente, medico=medico, especialidad=especialidad, fecha=fecha, hora=hora, estado='pendiente'
+                ).pk)
+
+        pendientes = list(turno_ids)
+        candado = threading.Lock()
+
+        def validar():
+            try:
+                while True:
+                    with candado:
+                        if not pendientes:
+                            return
+                        turno_id = pendientes.pop()
+                    for _ in range(self.INTENTOS):
+                        try:
+                            Turno.objects.get(pk=turno_id).activar()
+                        except ValidationError:
+                            pass
+                        except DatabaseError:
+                            # SQLite bloquea la tabla mientras otro hilo escribe
+                            reloj.sleep(0.01)
+                            continue
+                        break
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=validar) for _ in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        estados = Turno.objects.values('hora', 'estado').annotate(cantidad=Count('pk'))
+        self.assertEqual(
+            sorted((fila['hora'], fila['estado'], fila['cantidad']) for fila in estados),
+            [(time(9), 'activo', 1), (time(9), 'rechazado', self.HILOS * 2 - 1),
+             (time(10), 'activo', 1), (time(10), 'rechazado', self.HILOS * 2 - 1)]
+        )
+
+
+class ValidacionLoteTests(MediTurnosTestCase):
+    """procesar_lote: activación por orden de solicitud y rechazo de los competidores"""
+
+    def test_activar_lote(self):
+        fecha = self.fecha_futura()
+        primero = self.crear_turno(fecha=fecha, estado='pendiente')
+        segundo = self.crear_turno(fecha=fecha, estado='pendiente')
+        fuera_del_lote = self.crear_turno(fecha=fecha, estado='pendiente')
+        otro_horario = self.crear_turno(fecha=fecha, hora=time(10), estado='pendiente')
+        ocupado = self.crear_turno(fecha=fecha, hora=time(11), estado='activo')
+        en_ocupado = self.crear_turno(fecha=fecha, hora=time(11), estado='pendiente')
+
+        lote = procesar_lote([segundo.pk, primero.pk, otro_horario.pk, en_ocupado.pk, ocupado.pk], 'activar')
+
+        resultados = {resultado['id']: resultado['resultado'] for resultado in lote['resultados']}
+        self.assertEqual(resultados, {
+            primero.pk: 'activado', segundo.pk: 'rechazado', otro_horario.pk: 'activado',
+            en_ocupado.pk: 'omitido', ocupado.pk: 'omitido',
+        })
+        self.assertEqual(lote['rechazados_automaticamente'], 1)
+        estados = dict(Turno.objects.values_list('pk', 'estado'))
+        self.assertEqual(estados[fuera_del_lote.pk], 'rechazado')
+        self.assertEqual(estados[en_ocupado.pk], 'pendiente')
+        self.assertEqual(
+            dict(EstadisticaDiariaTurnos.objects.filter(total__gt=0).values_list('estado', 'total')),
+            {'activo': 3, 'rechazado': 2, 'pendiente': 1}
+        )
+
+    def test_rechazar_lote(self):
+        pendiente = self.crear_turno(estado='pendiente')
+        activo = self.crear_turno(hora=time(10), estado='activo')
+        lote = procesar_lote([pendiente.pk, activo.pk], 'rechazar')
+        self.assertEqual([resultado['resultado'] for resultado in lote['resultados']], ['rechazado', 'omitido'])
+        self.assertEqual(Turno.objects.get(pk=pendiente.pk).estado, 'rechazado')
+        self.assertEqual(Turno.objects.get(pk=activo.pk).estado, 'activo')
+
+    def test_lote_atomico(self):
+        fecha = self.fecha_futura()
+        ganador = self.crear_turno(fecha=fecha, estado='pendiente')
+        perdedor = self.crear_turno(fecha=fecha, estado='pendiente')
+        with mock.patch('appointments.validacion.registrar_cambios_estado', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                procesar_lote([ganador.pk, perdedor.pk], 'activar')
+        self.assertEqual(
+            list(Turno.objects.filter(pk__in=[ganador.pk, perdedor.pk]).values_list('estado', flat=True)),
+            ['pendiente', 'pendiente']
+        )
+
+
+class ConsultasSesionTests(MediTurnosTestCase):
+    """PerfilBackend trae el perfil con el usuario: una consulta menos por pedido en los paneles"""
+
+    def consultas(self, usuario, nombre_url, backend):
+        self.client.force_login(usuario, backend=backend)
+        self.client.get(reverse(nombre_url))
+        with CaptureQueriesContext(connection) as contexto:
+            respuesta = self.client.get(reverse(nombre_url))
+        self.assertEqual(respuesta.status_code, 200)
+        return len(contexto.captured_queries)
+
+    def test_una_consulta_menos(self):
+        for usuario, nombre_url in (
+            (self.medico.usuario, 'medico_dashboard'),
+            (self.medico.usuario, 'medico_agenda'),
+            (self.paciente.usuario, 'paciente_dashboard'),
+            (self.paciente.usuario, 'paciente_mis_turnos'),
+        ):
+            with self.subTest(nombre_url):
+                antes = self.consultas(usuario, nombre_url, 'django.contrib.auth.backends.ModelBackend')
+                despues = self.consultas(usuario, nombre_url, 'appointments.autenticacion.PerfilBackend')
+                self.assertEqual(despues, antes - 1)
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'La base de datos no soporta EXPLAIN')
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class PlanesConsultasTests(MediTurnosTestCase):
+    """Las consultas frecuentes sobre turnos usan los índices compuestos en lugar de recorrer la tabla"""
+
+    def setUp(self):
+        super().setUp()
+        medicos = self.medicos + [self.agregar_medico(numero) for numero in range(2, 20)]
+        hoy = timezone.localdate()
+        estados = ['activo', 'pendiente', 'atendido', 'cancelado_paciente']
+        Turno.objects.bulk_create([
+            Turno(
+                paciente=self.paciente, medico=medico, especialidad=self.especialidad,
+                fecha=hoy + timedelta(days=dia), hora=time(8 + hora), estado=estados[(dia + hora) % 4]
+            )
+            for medico in medicos for dia in range(-60, 60) for hora in range(8)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            if connection.vendor == 'postgresql':
+                # En una tabla de este tamaño PostgreSQL podría preferir leerla entera
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def planes(self, nombre_url, usuario, parametros=None):
+        """Líneas del plan de cada consulta sobre turnos que ejecuta la vista"""
+        self.client.force_login(usuario)
+        with CaptureQueriesContext(connection) as contexto:
+            self.assertEqual(self.client.get(reverse(nombre_url), parametros or {}).status_code, 200)
+        prefijo = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+        tabla = Turno._meta.db_table
+        planes = []
+        for consulta in contexto.captured_queries:
+            if tabla in consulta['sql'] and consulta['sql'].startswith('SELECT'):
+                with connection.cursor() as cursor:
+                    cursor.execute(f"{prefijo} {consulta['sql']}")
+                    planes.append([str(fila[-1]) for fila in cursor.fetchall()])
+        self.assertTrue(planes)
+        # Las subconsultas nombran la tabla U0, U1...
+        alias = {tabla, *re.findall(rf'"{tabla}" (\w+)', ' '.join(q['sql'] for q in contexto.captured_queries))}
+        lineas = [linea for plan in planes for linea in plan]
+        self.assertEqual([linea for linea in lineas if self.recorre_tabla(linea, alias)], [])
+        return '\n'.join(lineas)
+
+    def recorre_tabla(self, linea, alias):
+        """SCAN sin índice en SQLite o Seq Scan en PostgreSQL sobre la tabla de turnos"""
+        encontrado = re.match(r'\s*SCAN (\w+)$', linea) or re.search(r'Seq Scan on (\w+)', linea)
+        return bool(encontrado) and encontrado.group(1) in alias
+
+    def test_agenda_del_medico(self):
+        self.assertIn('turno_medico_fecha_estado_idx', self.planes('medico_agenda', self.medico.usuario))
+
+    def test_listado_de_turnos(self):
+        self.assertIn('turno_fecha_hora_id_idx', self.planes('admin_turnos', self.admin))
+        filtros = {'estado': 'pendiente', 'fecha_desde': timezone.localdate().isoformat()}
+        self.assertIn('turno_estado_fecha_hora_idx', self.planes('admin_turnos', self.admin, filtros))
+
+    def test_cola_de_pendientes(self):
+        self.assertIn('turno_pendiente_horario_idx', self.planes('admin_cola_pendientes', self.admin))
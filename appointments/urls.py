@@ -16,6 +16,7 @@ urlpatterns = [
     
     # --- RUTAS DE ADMINISTRADOR ---
     path('admin-panel/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-panel/metricas/', views.admin_dashboard_metricas, name='admin_dashboard_metricas'),
     
     # Gestión de Especialidades
     path('admin-panel/especialidades/', views.admin_especialidades, name='admin_especialidades'),
@@ -30,17 +31,29 @@ urlpatterns = [
     path('admin-panel/medicos/<int:pk>/eliminar/', views.admin_medico_eliminar, name='admin_medico_eliminar'),
     path('admin-panel/medicos/<int:pk>/horarios/', views.admin_medico_horarios, name='admin_medico_horarios'),
     
+    # Ausencias de médicos y cierres del consultorio
+    path('admin-panel/ausencias/', views.admin_ausencias, name='admin_ausencias'),
+    path('admin-panel/ausencias/nueva/', views.admin_ausencia_crear, name='admin_ausencia_crear'),
+    path('admin-panel/ausencias/<int:pk>/editar/', views.admin_ausencia_editar, name='admin_ausencia_editar'),
+    path('admin-panel/ausencias/<int:pk>/eliminar/', views.admin_ausencia_eliminar, name='admin_ausencia_eliminar'),
+    
     # Gestión de Pacientes
     path('admin-panel/pacientes/', views.admin_pacientes, name='admin_pacientes'),
+    path('admin-panel/pacientes/buscar/', views.admin_pacientes_buscar, name='admin_pacientes_buscar'),
     path('admin-panel/pacientes/<int:pk>/ver/', views.admin_paciente_ver, name='admin_paciente_ver'),
     
     # Gestión de Turnos (Admin)
     path('admin-panel/turnos/', views.admin_turnos, name='admin_turnos'),
+    path('admin-panel/turnos/exportar/', views.admin_turnos_exportar, name='admin_turnos_exportar'),
     path('admin-panel/turnos/nuevo/', views.admin_turno_crear, name='admin_turno_crear'),
     path('admin-panel/turnos/<int:pk>/editar/', views.admin_turno_editar, name='admin_turno_editar'),
     path('admin-panel/turnos/<int:pk>/eliminar/', views.admin_turno_eliminar, name='admin_turno_eliminar'),
     path('admin-panel/turnos/<int:pk>/validar/', views.admin_turno_validar, name='admin_turno_validar'),
     path('admin-panel/turnos/<int:pk>/cambiar-estado/', views.admin_turno_cambiar_estado, name='admin_turno_cambiar_estado'),
+    path('admin-panel/turnos/lote/', views.admin_turnos_lote, name='admin_turnos_lote'),
+    path('admin-panel/autocompletar/<str:modelo>/', views.admin_autocompletar, name='admin_autocompletar'),
+    path('admin-panel/pendientes/', views.admin_cola_pendientes, name='admin_cola_pendientes'),
+    path('admin-panel/pendientes/resolver/', views.admin_cola_pendientes_resolver, name='admin_cola_pendientes_resolver'),
     
     # Estadísticas
     path('admin-panel/estadisticas/', views.admin_estadisticas, name='admin_estadisticas'),
@@ -63,5 +76,8 @@ urlpatterns = [
     # API endpoints (para obtener horarios disponibles en AJAX)
     path('api/medicos-por-especialidad/<int:especialidad_id>/', views.api_medicos_por_especialidad, name='api_medicos_por_especialidad'),
     path('api/horarios-disponibles/', views.api_horarios_disponibles, name='api_horarios_disponibles'),
+    path('api/disponibilidad-rango/', views.api_disponibilidad_rango, name='api_disponibilidad_rango'),
+    path('api/proximos-turnos/', views.api_proximos_turnos, name='api_proximos_turnos'),
+    path('api/dias-no-laborables/', views.api_dias_no_laborables, name='api_dias_no_laborables'),
     path('api/horarios-disponibles-especialidad/', paciente_turnos_wizard.api_horarios_disponibles_especialidad, name='api_horarios_disponibles_especialidad'),
 ]
\ No newline at end of file
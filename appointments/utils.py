@@ -1,148 +1,190 @@
 """
 Utilidades para el manejo de fechas y feriados
+
+Los feriados de cada año se calculan una sola vez y quedan en una tabla
+inmutable por año compartida por todo el proceso: los móviles a partir
+del Domingo de Pascua (cómputo gregoriano) y los trasladables con las
+reglas de la Ley 27.399. Así es_feriado y es_dia_laboral son una búsqueda
+en un diccionario para cualquier año.
 """
-from datetime import date
-from typing import List, Tuple
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Mapping, NamedTuple, Tuple
+
+# Feriados inamovibles: (mes, día) -> nombre
+FERIADOS_INAMOVIBLES = {
+    (1, 1): "Año Nuevo",
+    (3, 24): "Día Nacional de la Memoria por la Verdad y la Justicia",
+    (4, 2): "Día del Veterano y de los Caídos en la Guerra de Malvinas",
+    (5, 1): "Día del Trabajador",
+    (5, 25): "Día de la Revolución de Mayo",
+    (6, 20): "Día de la Bandera Nacional",
+    (7, 9): "Día de la Independencia",
+    (12, 8): "Inmaculada Concepción de María",
+    (12, 25): "Navidad",
+}
+
+# Feriados trasladables: (mes, día) -> nombre
+FERIADOS_TRASLADABLES = {
+    (6, 17): "Paso a la Inmortalidad del General Martín Miguel de Güemes",
+    (8, 17): "Paso a la Inmortalidad del General José de San Martín",
+    (10, 12): "Día del Respeto a la Diversidad Cultural",
+    (11, 20): "Día de la Soberanía Nacional",
+}
+
+# Si un trasladable cae martes o miércoles pasa al lunes anterior, y si cae
+# jueves o viernes al lunes siguiente: día de la semana -> días a sumar
+TRASLADOS = {1: -1, 2: -2, 3: 4, 4: 3}
+
+# Feriados móviles: días respecto del Domingo de Pascua -> nombre
+FERIADOS_MOVILES = {
+    -48: "Carnaval",
+    -47: "Carnaval",
+    -3: "Jueves Santo",
+    -2: "Viernes Santo",
+}
+
+MENSAJE_FIN_DE_SEMANA = "No se pueden solicitar turnos los fines de semana"
+
+# Respuestas compartidas, para no crear tuplas en cada consulta
+_LABORAL = (True, "")
+_NO_FERIADO = (False, "")
+_FIN_DE_SEMANA = (False, MENSAJE_FIN_DE_SEMANA)
+
+# Años de calendario_anual que se conservan por proceso. El año llega en
+# parámetros de las consultas, así que la caché tiene que estar acotada
+ANIOS_EN_CACHE = 16
+
+
+class CalendarioAnual(NamedTuple):
+    """Tablas precalculadas de un año"""
+    feriados: Mapping[date, str]
+    # Fines de semana y feriados -> respuesta de es_dia_laboral
+    no_laborables: Mapping[date, Tuple[bool, str]]
+    # Las mismas fechas ordenadas, para consultas por rango
+    no_laborables_ordenados: Tuple[date, ...]
+
+
+def domingo_de_pascua(anio: int) -> date:
+    """Domingo de Pascua del calendario gregoriano (algoritmo de Meeus/Jones/Butcher)"""
+    a = anio % 19
+    b, c = divmod(anio, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(anio, mes, dia + 1)
+
+
+def trasladar(fecha: date) -> date:
+    """Fecha en que se celebra un feriado trasladable"""
+    return fecha + timedelta(days=TRASLADOS.get(fecha.weekday(), 0))
+
+
+@lru_cache(maxsize=ANIOS_EN_CACHE)
+def calendario_anual(anio: int) -> CalendarioAnual:
+    """Feriados y días no laborables del año, calculados una vez por proceso"""
+    feriados = {date(anio, mes, dia): nombre for (mes, dia), nombre in FERIADOS_INAMOVIBLES.items()}
+    pascua = domingo_de_pascua(anio)
+    for dias, nombre in FERIADOS_MOVILES.items():
+        feriados.setdefault(pascua + timedelta(days=dias), nombre)
+    for (mes, dia), nombre in FERIADOS_TRASLADABLES.items():
+        feriados.setdefault(trasladar(date(anio, mes, dia)), nombre)
+
+    no_laborables = {
+        fecha: (False, f"No se pueden solicitar turnos en feriados: {nombre}")
+        for fecha, nombre in feriados.items()
+    }
+    # Un feriado en fin de semana se informa como fin de semana
+    primero = date(anio, 1, 1)
+    for dias in range((date(anio, 12, 31) - primero).days + 1):
+        fecha = primero + timedelta(days=dias)
+        if es_fin_de_semana(fecha):
+            no_laborables[fecha] = _FIN_DE_SEMANA
+
+    return CalendarioAnual(
+        feriados=MappingProxyType(feriados),
+        no_laborables=MappingProxyType(no_laborables),
+        no_laborables_ordenados=tuple(sorted(no_laborables)),
+    )
 
 
 def obtener_feriados_argentina(anio: int = None) -> List[date]:
     """
-    Retorna una lista de feriados nacionales de Argentina para un año dado.
-    Si no se especifica año, usa el año actual.
-    
-    Incluye feriados fijos y algunos móviles importantes.
+    Retorna una lista ordenada de feriados nacionales de Argentina para un
+    año dado. Si no se especifica año, usa el año actual.
     """
     if anio is None:
         anio = date.today().year
-    
-    feriados = [
-        # Feriados fijos
-        date(anio, 1, 1),   # Año Nuevo
-        date(anio, 2, 24),  # Día de la Bandera (si cae lunes)
-        date(anio, 3, 24),  # Día Nacional de la Memoria por la Verdad y la Justicia
-        date(anio, 4, 2),   # Día del Veterano y de los Caídos en la Guerra de Malvinas
-        date(anio, 5, 1),   # Día del Trabajador
-        date(anio, 5, 25),  # Día de la Revolución de Mayo
-        date(anio, 6, 20),  # Día de la Bandera Nacional
-        date(anio, 7, 9),   # Día de la Independencia
-        date(anio, 8, 17),  # Paso a la Inmortalidad del General José de San Martín (si cae lunes)
-        date(anio, 10, 12), # Día del Respeto a la Diversidad Cultural (si cae lunes)
-        date(anio, 11, 20), # Día de la Soberanía Nacional (si cae lunes)
-        date(anio, 12, 8),  # Inmaculada Concepción de María
-        date(anio, 12, 25), # Navidad
-    ]
-    
-    # Feriados móviles específicos por año (Semana Santa principalmente)
-    feriados_moviles = obtener_feriados_moviles(anio)
-    feriados.extend(feriados_moviles)
-    
-    return sorted(set(feriados))  # Eliminar duplicados y ordenar
+    return sorted(calendario_anual(anio).feriados)
 
 
 def obtener_feriados_moviles(anio: int) -> List[date]:
     """
-    Retorna feriados móviles para un año específico.
-    Nota: Semana Santa cambia cada año, aquí hay algunas fechas aproximadas.
-    Para precisión completa, se recomienda usar una biblioteca de fechas litúrgicas.
+    Retorna los feriados móviles (Carnaval y Semana Santa) de un año,
+    calculados a partir del Domingo de Pascua.
     """
-    feriados_moviles_por_anio = {
-        2024: [
-            date(2024, 3, 28),  # Jueves Santo
-            date(2024, 3, 29),  # Viernes Santo
-            date(2024, 2, 12),  # Carnaval (lunes)
-            date(2024, 2, 13),  # Carnaval (martes)
-        ],
-        2025: [
-            date(2025, 4, 17),  # Jueves Santo
-            date(2025, 4, 18),  # Viernes Santo
-            date(2025, 3, 3),   # Carnaval (lunes)
-            date(2025, 3, 4),   # Carnaval (martes)
-        ],
-        2026: [
-            date(2026, 4, 2),   # Jueves Santo
-            date(2026, 4, 3),   # Viernes Santo
-            date(2026, 2, 16),  # Carnaval (lunes)
-            date(2026, 2, 17),  # Carnaval (martes)
-        ],
-        2027: [
-            date(2027, 3, 25),  # Jueves Santo
-            date(2027, 3, 26),  # Viernes Santo
-            date(2027, 2, 8),   # Carnaval (lunes)
-            date(2027, 2, 9),   # Carnaval (martes)
-        ],
-    }
-    
-    return feriados_moviles_por_anio.get(anio, [])
+    pascua = domingo_de_pascua(anio)
+    return sorted(pascua + timedelta(days=dias) for dias in FERIADOS_MOVILES)
 
 
 def es_feriado(fecha: date) -> Tuple[bool, str]:
     """
     Verifica si una fecha es feriado en Argentina.
-    
+
     Returns:
         Tuple[bool, str]: (es_feriado, nombre_del_feriado)
     """
-    nombres_feriados = {
-        (1, 1): "Año Nuevo",
-        (2, 24): "Día de la Bandera",
-        (3, 24): "Día Nacional de la Memoria por la Verdad y la Justicia",
-        (4, 2): "Día del Veterano y de los Caídos en la Guerra de Malvinas",
-        (5, 1): "Día del Trabajador",
-        (5, 25): "Día de la Revolución de Mayo",
-        (6, 20): "Día de la Bandera Nacional",
-        (7, 9): "Día de la Independencia",
-        (8, 17): "Paso a la Inmortalidad del General José de San Martín",
-        (10, 12): "Día del Respeto a la Diversidad Cultural",
-        (11, 20): "Día de la Soberanía Nacional",
-        (12, 8): "Inmaculada Concepción de María",
-        (12, 25): "Navidad",
-    }
-    
-    # Verificar feriados fijos
-    clave = (fecha.month, fecha.day)
-    if clave in nombres_feriados:
-        return True, nombres_feriados[clave]
-    
-    # Verificar feriados móviles
-    feriados_moviles = obtener_feriados_moviles(fecha.year)
-    if fecha in feriados_moviles:
-        # Determinar qué feriado móvil es
-        mes_dia = (fecha.month, fecha.day)
-        if fecha.month == 2 or fecha.month == 3:
-            if fecha.weekday() == 0:  # Lunes
-                return True, "Carnaval"
-            elif fecha.weekday() == 1:  # Martes
-                return True, "Carnaval"
-        if fecha.month in [3, 4]:
-            # Semana Santa
-            dia_semana = fecha.weekday()
-            if dia_semana == 3:  # Jueves
-                return True, "Jueves Santo"
-            elif dia_semana == 4:  # Viernes
-                return True, "Viernes Santo"
-    
-    return False, ""
+    nombre = calendario_anual(fecha.year).feriados.get(fecha)
+    return (True, nombre) if nombre else _NO_FERIADO
 
 
 def es_fin_de_semana(fecha: date) -> bool:
     """
     Verifica si una fecha cae en fin de semana (sábado o domingo).
     """
-    return fecha.weekday() in [5, 6]  # 5=sábado, 6=domingo
+    return fecha.weekday() >= 5  # 5=sábado, 6=domingo
 
 
 def es_dia_laboral(fecha: date) -> Tuple[bool, str]:
     """
     Verifica si una fecha es día laboral (no es fin de semana ni feriado).
-    
+
     Returns:
         Tuple[bool, str]: (es_laboral, mensaje_error)
     """
-    if es_fin_de_semana(fecha):
-        return False, "No se pueden solicitar turnos los fines de semana"
-    
-    es_fer, nombre_feriado = es_feriado(fecha)
-    if es_fer:
-        return False, f"No se pueden solicitar turnos en feriados: {nombre_feriado}"
-    
-    return True, ""
+    return calendario_anual(fecha.year).no_laborables.get(fecha, _LABORAL)
+
+
+def dias_no_laborables(desde: date, hasta: date) -> List[date]:
+    """Fines de semana y feriados entre dos fechas (inclusive), ordenados"""
+    resultado = []
+    for anio in range(desde.year, hasta.year + 1):
+        fechas = calendario_anual(anio).no_laborables_ordenados
+        resultado.extend(fechas[bisect_left(fechas, desde):bisect_right(fechas, hasta)])
+    return resultado
+
+
+def feriados_entre(desde: date, hasta: date) -> List[Tuple[date, str]]:
+    """(fecha, nombre) de los feriados entre dos fechas (inclusive), ordenados"""
+    return [
+        (fecha, calendario_anual(fecha.year).feriados[fecha])
+        for fecha in dias_no_laborables(desde, hasta)
+        if fecha in calendario_anual(fecha.year).feriados
+    ]
+
+
+def dias_laborables(desde: date, hasta: date) -> List[date]:
+    """Días laborales entre dos fechas (inclusive), ordenados"""
+    resultado = []
+    for dias in range((hasta - desde).days + 1):
+        fecha = desde + timedelta(days=dias)
+        if es_dia_laboral(fecha)[0]:
+            resultado.append(fecha)
+    return resultado
@@ -0,0 +1,225 @@
+"""
+Validación y rechazo de turnos pendientes en lote
+
+Todo el lote se resuelve en una transacción con pocas sentencias: una
+lectura de los turnos, una de los horarios ya ocupados, una de las
+ausencias y cierres que los bloquean y un update por transición (más las
+estadísticas precalculadas que cambian). Los conflictos dentro del lote
+se resuelven por orden de solicitud: en cada horario gana el turno
+pedido primero.
+
+La validación automática usa el mismo lote para activar las solicitudes
+que no compiten con ninguna otra por su horario.
+"""
+from collections import defaultdict
+from datetime import date, time
+from functools import reduce
+from operator import or_
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .disponibilidad import Ausencias, invalidar_agendas, minuto_del_dia
+from .estadisticas import registrar_cambios_estado
+from .models import ConfiguracionSistema, Medico, Turno
+from .slots import actualizar_slots, slots_habilitados
+
+ACCIONES_LOTE = ('activar', 'rechazar')
+MAXIMO_TURNOS_LOTE = 500
+
+
+def _resultado(turno_id, resultado: str, mensaje: str) -> dict:
+    return {'id': turno_id, 'resultado': resultado, 'mensaje': mensaje}
+
+
+def filtro_horarios(horarios: Iterable[Tuple[int, date, time]]) -> Q:
+    """Q que selecciona los turnos de cualquiera de los (medico_id, fecha, hora)"""
+    return reduce(or_, (Q(medico_id=medico_id, fecha=fecha, hora=hora) for medico_id, fecha, hora in horarios))
+
+
+def procesar_lote(turno_ids: Iterable[int], accion: str) -> dict:
+    """
+    Activa o rechaza un lote de turnos pendientes.
+
+    Retorna {'resultados': [{'id', 'resultado', 'mensaje'}, ...], 'rechazados_automaticamente': n},
+    con un resultado por turno en el orden recibido ('activado', 'rechazado'
+    u 'omitido'). Al activar, los pendientes de los horarios ganados que no
+    estaban en el lote también se rechazan y se cuentan aparte.
+    """
+    turno_ids = list(dict.fromkeys(turno_ids))
+    with transaction.atomic():
+        # Bloquear los médicos (en orden, para evitar deadlocks) serializa el
+        # lote con Turno.activar() y con otros lotes sobre las mismas agendas
+        medico_ids = Turno.objects.filter(
+            pk__in=turno_ids, medico__isnull=False
+        ).values_list('medico_id', flat=True).distinct()
+        list(Medico.objects.select_for_update().filter(pk__in=list(medico_ids)).order_by('pk').values_list('pk', flat=True))
+
+        # Los turnos también se bloquean: un paciente puede cancelarlos sin tocar al médico
+        turnos = {
+            turno['id']: turno
+            for turno in Turno.objects.select_for_update().filter(pk__in=turno_ids).values(
+                'id', 'medico_id', 'especialidad_id', 'fecha', 'hora', 'estado', 'fecha_creacion'
+            )
+        }
+
+        resultados = {}
+        validos = []
+        for turno_id in turno_ids:
+            turno = turnos.get(turno_id)
+            if turno is None:
+                resultados[turno_id] = _resultado(turno_id, 'omitido', 'El turno no existe.')
+            elif turno['estado'] != 'pendiente':
+                resultados[turno_id] = _resultado(turno_id, 'omitido', 'Este turno no está pendiente de validación.')
+            elif accion == 'activar' and not turno['medico_id']:
+                resultados[turno_id] = _resultado(turno_id, 'omitido', 'El turno no tiene médico asignado.')
+            else:
+                validos.append(turno)
+
+        rechazados_automaticamente = 0
+        if accion == 'rechazar':
+            _rechazar(validos, resultados)
+        else:
+            rechazados_automaticamente = _activar(validos, resultados)
+
+    return {
+        'resultados': [resultados[turno_id] for turno_id in turno_ids],
+        'rechazados_automaticamente': rechazados_automaticamente,
+    }
+
+
+def _rechazar(turnos: List[dict], resultados: Dict[int, dict]):
+    if not turnos:
+        return
+    Turno.objects.filter(pk__in=[turno['id'] for turno in turnos], estado='pendiente').update(
+        estado='rechazado', fecha_modificacion=timezone.now()
+    )
+    for turno in turnos:
+        resultados[turno['id']] = _resultado(turno['id'], 'rechazado', 'Turno rechazado.')
+    # update() no dispara señales
+    invalidar_agendas((turno['medico_id'], turno['fecha']) for turno in turnos)
+    registrar_cambios_estado(
+        ((turno['fecha'], turno['medico_id'], turno['especialidad_id']) for turno in turnos),
+        'pendiente', 'rechazado'
+    )
+
+
+def _activar(turnos: List[dict], resultados: Dict[int, dict]) -> int:
+    por_horario = defaultdict(list)
+    for turno in turnos:
+        por_horario[(turno['medico_id'], turno['fecha'], turno['hora'])].append(turno)
+    if not por_horario:
+        return 0
+
+    ocupados = set(Turno.objects.filter(
+        filtro_horarios(por_horario),
+        estado__in=Turno.ESTADOS_OCUPAN_HORARIO
+    ).values_list('medico_id', 'fecha', 'hora'))
+    fechas = [fecha for _, fecha, _ in por_horario]
+    ausencias = Ausencias.cargar(min(fechas), max(fechas), {medico_id for medico_id, _, _ in por_horario})
+
+    ganadores = {}
+    for horario, candidatos in por_horario.items():
+        candidatos.sort(key=lambda turno: (turno['fecha_creacion'], turno['id']))
+        medico_id, fecha, hora = horario
+        if horario in ocupados:
+            mensaje = 'Ya existe otro turno activo en el mismo horario para este médico.'
+        elif ausencias and ausencias.mascara(medico_id, fecha) >> minuto_del_dia(hora) & 1:
+            mensaje = 'El médico no atiende en ese horario (ausencia o cierre del consultorio).'
+        else:
+            mensaje = None
+        if mensaje:
+            for turno in candidatos:
+                resultados[turno['id']] = _resultado(turno['id'], 'omitido', mensaje)
+            continue
+        ganador = candidatos[0]
+        ganadores[horario] = ganador['id']
+        resultados[ganador['id']] = _resultado(ganador['id'], 'activado', 'Turno validado.')
+        for turno in candidatos[1:]:
+            resultados[turno['id']] = _resultado(
+                turno['id'], 'rechazado', f"Una solicitud anterior (turno #{ganador['id']}) obtuvo el horario."
+            )
+
+    if not ganadores:
+        return 0
+
+    ahora = timezone.now()
+    Turno.objects.filter(pk__in=ganadores.values(), estado='pendiente').update(estado='activo', fecha_modificacion=ahora)
+    # Los pendientes de los horarios ganados se rechazan, estén o no en el lote
+    rechazados = list(Turno.objects.select_for_update().filter(
+        filtro_horarios(ganadores),
+        estado='pendiente'
+    ).values_list('pk', 'fecha', 'medico_id', 'especialidad_id'))
+    Turno.objects.filter(pk__in=[pk for pk, *_ in rechazados], estado='pendiente').update(
+        estado='rechazado', fecha_modificacion=ahora
+    )
+
+    # update() no dispara señales
+    invalidar_agendas((medico_id, fecha) for medico_id, fecha, _ in ganadores)
+    if slots_habilitados():
+        actualizar_slots(ganadores.keys())
+    por_id = {turno['id']: turno for turno in turnos}
+    registrar_cambios_estado(
+        ((por_id[pk]['fecha'], por_id[pk]['medico_id'], por_id[pk]['especialidad_id']) for pk in ganadores.values()),
+        'pendiente', 'activo'
+    )
+    registrar_cambios_estado((clave for _, *clave in rechazados), 'pendiente', 'rechazado')
+
+    en_lote = sum(1 for resultado in resultados.values() if resultado['resultado'] == 'rechazado')
+    return len(rechazados) - en_lote
+
+
+def pendientes_sin_competencia(turno_ids: Iterable[int] = None):
+    """
+    Pendientes futuros de médicos activos que son la única solicitud de su
+    horario y cuyo horario no está ocupado, en orden de fecha y hora.
+    """
+    mismo_horario = {
+        'medico_id': OuterRef('medico_id'),
+        'fecha': OuterRef('fecha'),
+        'hora': OuterRef('hora'),
+    }
+    competidores = Turno.objects.filter(estado='pendiente', **mismo_horario).exclude(pk=OuterRef('pk'))
+    ocupantes = Turno.objects.filter(estado__in=Turno.ESTADOS_OCUPAN_HORARIO, **mismo_horario)
+
+    ahora = timezone.localtime()
+    pendientes = Turno.objects.filter(
+        Q(fecha__gt=ahora.date()) | Q(fecha=ahora.date(), hora__gt=ahora.time()),
+        estado='pendiente',
+        medico__activo=True
+    ).exclude(Exists(competidores)).exclude(Exists(ocupantes))
+    if turno_ids is not None:
+        pendientes = pendientes.filter(pk__in=list(turno_ids))
+    return pendientes.order_by('fecha', 'hora', 'fecha_creacion', 'pk')
+
+
+def validar_automaticamente(limite: int = None) -> List[dict]:
+    """
+    Activa en lotes los pendientes sin competencia y retorna sus resultados.
+    Los horarios con varias solicitudes quedan para los administradores.
+    """
+    turno_ids = list(pendientes_sin_competencia().values_list('pk', flat=True)[:limite])
+    resultados = []
+    for inicio in range(0, len(turno_ids), MAXIMO_TURNOS_LOTE):
+        lote = procesar_lote(turno_ids[inicio:inicio + MAXIMO_TURNOS_LOTE], 'activar')
+        resultados.extend(lote['resultados'])
+    return resultados
+
+
+def validar_al_solicitar(turno: Turno) -> bool:
+    """
+    Si la validación automática está configurada al solicitar, activa el
+    turno recién pedido cuando nadie más compite por su horario. Retorna
+    True si el turno quedó activo.
+    """
+    modo = ConfiguracionSistema.actual().validacion_automatica
+    if modo != 'al_solicitar' or not pendientes_sin_competencia([turno.pk]).exists():
+        return False
+    resultado = procesar_lote([turno.pk], 'activar')['resultados'][0]
+    if resultado['resultado'] != 'activado':
+        return False
+    turno.estado = 'activo'
+    turno.guardar_valores_originales()
+    return True
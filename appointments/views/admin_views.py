@@ -4,86 +4,69 @@ Vistas del panel de administrador
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import IntegrityError
+from django.db.models import Count, Exists, Min, OuterRef, Q
+from django.urls import reverse
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 import json
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 
+from ..autenticacion import rol_requerido
 from ..models import (
     Usuario, Paciente, Medico, Especialidad, Turno,
-    HorarioAtencion
+    HorarioAtencion, Ausencia
 )
+from ..busqueda import RESULTADOS_BUSQUEDA, filtro_busqueda_personas
+from ..disponibilidad import DURACION_SLOT
+from ..estadisticas import contadores_mes_medico, metricas_dashboard, resumen_estadisticas
+from ..exportacion import FORMATOS_EXPORTACION, exportar_turnos
+from ..listados import (
+    CAMPOS_LISTADO_PACIENTES, CAMPOS_LISTADO_TURNOS, CLAVE_PACIENTES, fecha_parametro, filtrar_turnos,
+    pagina_por_clave
+)
+from ..validacion import ACCIONES_LOTE, MAXIMO_TURNOS_LOTE, filtro_horarios, procesar_lote
 from ..forms import (
     EspecialidadForm, MedicoUsuarioForm, MedicoForm,
-    HorarioAtencionForm, TurnoForm, AsignarMedicoForm, AsignarMedicoRolForm,
-    AtenderTurnoForm, PerfilPacienteForm, PacienteTurnoForm
+    HorarioAtencionForm, AusenciaForm, TurnoForm, AsignarMedicoForm, AsignarMedicoRolForm,
+    AtenderTurnoForm, PerfilPacienteForm, PacienteTurnoForm, etiqueta_paciente
 )
 
-@login_required
+@rol_requerido('admin')
 def admin_dashboard(request):
     """Dashboard principal del administrador"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos para acceder a esta página.')
-        return redirect('dashboard')
-    
-    # Estadísticas generales
-    total_pacientes = Paciente.objects.count()
-    total_medicos = Medico.objects.filter(activo=True).count()
-    total_especialidades = Especialidad.objects.filter(activo=True).count()
-    
-    # Turnos de hoy
-    hoy = timezone.now().date()
-    turnos_hoy = Turno.objects.filter(fecha=hoy).count()
-    turnos_pendientes = Turno.objects.filter(fecha=hoy, estado='pendiente').count()
-    turnos_activos = Turno.objects.filter(fecha=hoy, estado='activo').count()
-    turnos_atendidos = Turno.objects.filter(fecha=hoy, estado='atendido').count()
-    
-    # Turnos pendientes de validación (global)
-    turnos_pendientes_validacion = Turno.objects.filter(estado='pendiente').select_related(
-        'paciente__usuario', 'medico__usuario', 'especialidad'
-    ).order_by('fecha', 'hora')[:10]
+    # Contadores cacheados (ver estadisticas.metricas_dashboard)
+    context = dict(metricas_dashboard())
     
     # Últimos turnos
-    ultimos_turnos = Turno.objects.select_related(
+    context['ultimos_turnos'] = Turno.objects.select_related(
         'paciente__usuario', 'medico__usuario', 'especialidad'
-    ).order_by('-fecha_creacion')[:10]
-    
-    context = {
-        'total_pacientes': total_pacientes,
-        'total_medicos': total_medicos,
-        'total_especialidades': total_especialidades,
-        'turnos_hoy': turnos_hoy,
-        'turnos_pendientes': turnos_pendientes,
-        'turnos_activos': turnos_activos,
-        'turnos_atendidos': turnos_atendidos,
-        'turnos_pendientes_validacion': turnos_pendientes_validacion,
-        'ultimos_turnos': ultimos_turnos,
-    }
+    ).order_by('-fecha_creacion')[:5]
     return render(request, 'appointments/admin/dashboard.html', context)
 
 
+@rol_requerido('admin', respuesta_json=True)
+def admin_dashboard_metricas(request):
+    """Contadores del dashboard para refrescarlos sin recargar la página (AJAX)"""
+    return JsonResponse({'success': True, 'metricas': metricas_dashboard()})
+
+
 # --- Gestión de Especialidades ---
 
-@login_required
+@rol_requerido('admin')
 def admin_especialidades(request):
     """Lista de especialidades"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     especialidades = Especialidad.objects.all().order_by('nombre')
     return render(request, 'appointments/admin/especialidades.html', {'especialidades': especialidades})
 
 
-@login_required
+@rol_requerido('admin')
 def admin_especialidad_crear(request):
     """Crear nueva especialidad"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     if request.method == 'POST':
         form = EspecialidadForm(request.POST)
         if form.is_valid():
@@ -96,13 +79,9 @@ def admin_especialidad_crear(request):
     return render(request, 'appointments/admin/especialidad_form.html', {'form': form, 'accion': 'Crear'})
 
 
-@login_required
+@rol_requerido('admin')
 def admin_especialidad_editar(request, pk):
     """Editar especialidad"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     especialidad = get_object_or_404(Especialidad, pk=pk)
     
     if request.method == 'POST':
@@ -117,13 +96,9 @@ def admin_especialidad_editar(request, pk):
     return render(request, 'appointments/admin/especialidad_form.html', {'form': form, 'accion': 'Editar'})
 
 
-@login_required
+@rol_requerido('admin')
 def admin_especialidad_eliminar(request, pk):
     """Eliminar especialidad"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     especialidad = get_object_or_404(Especialidad, pk=pk)
     
     if request.method == 'POST':
@@ -136,24 +111,16 @@ def admin_especialidad_eliminar(request, pk):
 
 # --- Gestión de Médicos ---
 
-@login_required
+@rol_requerido('admin')
 def admin_medicos(request):
     """Lista de médicos"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     medicos = Medico.objects.select_related('usuario').prefetch_related('especialidades').all()
     return render(request, 'appointments/admin/medicos.html', {'medicos': medicos})
 
 
-@login_required
+@rol_requerido('admin')
 def admin_medico_crear(request):
     """Asignar rol de médico a usuario existente"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     busqueda = request.GET.get('buscar', '')
     usuario_seleccionado = None
     usuarios_encontrados = []
@@ -191,15 +158,11 @@ def admin_medico_crear(request):
     else:
         medico_form = AsignarMedicoRolForm()
     
-    # Obtener usuarios disponibles para mostrar en la búsqueda
-    if busqueda:
-        usuarios_encontrados = Usuario.objects.filter(
-            Q(first_name__icontains=busqueda) |
-            Q(last_name__icontains=busqueda) |
-            Q(email__icontains=busqueda) |
-            Q(dni__icontains=busqueda) |
-            Q(username__icontains=busqueda),
-            rol='paciente'
+    # Obtener usuarios disponibles para mostrar en la búsqueda (prefijos sobre columnas indexadas)
+    filtro = filtro_busqueda_personas(busqueda)
+    if filtro is not None:
+        usuarios_encontrados = Usuario.objects.filter(filtro, rol='paciente').order_by(
+            'apellido_normalizado', 'nombre_normalizado', 'id'
         )[:10]  # Limitar a 10 resultados
     
     context = {
@@ -211,13 +174,9 @@ def admin_medico_crear(request):
     return render(request, 'appointments/admin/medico_form.html', context)
 
 
-@login_required
+@rol_requerido('admin')
 def admin_medico_editar(request, pk):
     """Editar médico"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     medico = get_object_or_404(Medico, pk=pk)
     
     if request.method == 'POST':
@@ -248,13 +207,9 @@ def admin_medico_editar(request, pk):
     return render(request, 'appointments/admin/medico_form.html', context)
 
 
-@login_required
+@rol_requerido('admin')
 def admin_medico_eliminar(request, pk):
     """Eliminar médico"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     medico = get_object_or_404(Medico, pk=pk)
     
     if request.method == 'POST':
@@ -267,13 +222,9 @@ def admin_medico_eliminar(request, pk):
     return render(request, 'appointments/admin/medico_eliminar.html', {'medico': medico})
 
 
-@login_required
+@rol_requerido('admin')
 def admin_medico_horarios(request, pk):
     """Gestionar horarios de atención de un médico"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     medico = get_object_or_404(Medico, pk=pk)
     horarios = medico.horarios.all().order_by('dia_semana', 'hora_inicio')
     
@@ -296,26 +247,143 @@ def admin_medico_horarios(request, pk):
     return render(request, 'appointments/admin/medico_horarios.html', context)
 
 
+# --- Ausencias y Cierres ---
+
+def _avisar_turnos_en_ausencia(request, ausencia):
+    """Advierte si quedaron turnos pendientes o activos dentro de la ausencia"""
+    turnos = Turno.objects.filter(
+        fecha__gte=ausencia.fecha_inicio,
+        fecha__lte=ausencia.fecha_fin,
+        estado__in=('pendiente',) + Turno.ESTADOS_OCUPAN_HORARIO
+    )
+    if ausencia.medico_id:
+        turnos = turnos.filter(medico_id=ausencia.medico_id)
+    if not ausencia.es_dia_completo:
+        # Turnos cuyo slot se superpone con el horario de la ausencia
+        inicio = datetime.combine(ausencia.fecha_inicio, ausencia.hora_inicio) - DURACION_SLOT
+        turnos = turnos.filter(hora__lt=ausencia.hora_fin)
+        if inicio.date() == ausencia.fecha_inicio:
+            turnos = turnos.filter(hora__gt=inicio.time())
+    cantidad = turnos.count()
+    if cantidad:
+        messages.warning(
+            request,
+            f'Hay {cantidad} turno(s) pendientes o activos en el período de la ausencia. Revíselos en Turnos.'
+        )
+
+
+@rol_requerido('admin')
+def admin_ausencias(request):
+    """Lista de ausencias de médicos y cierres del consultorio"""
+    ver_todas = request.GET.get('todas') == '1'
+    ausencias = Ausencia.objects.select_related('medico__usuario')
+    if not ver_todas:
+        ausencias = ausencias.filter(fecha_fin__gte=timezone.localdate())
+    
+    context = {
+        'ausencias': ausencias.order_by('fecha_inicio', 'hora_inicio', 'pk'),
+        'ver_todas': ver_todas,
+    }
+    return render(request, 'appointments/admin/ausencias.html', context)
+
+
+@rol_requerido('admin')
+def admin_ausencia_crear(request):
+    """Registrar ausencia de un médico o cierre del consultorio"""
+    if request.method == 'POST':
+        form = AusenciaForm(request.POST)
+        if form.is_valid():
+            ausencia = form.save()
+            messages.success(request, 'Ausencia registrada correctamente.')
+            _avisar_turnos_en_ausencia(request, ausencia)
+            return redirect('admin_ausencias')
+    else:
+        form = AusenciaForm(initial={'medico': request.GET.get('medico')})
+    
+    return render(request, 'appointments/admin/ausencia_form.html', {'form': form, 'accion': 'Registrar'})
+
+
+@rol_requerido('admin')
+def admin_ausencia_editar(request, pk):
+    """Editar ausencia o cierre"""
+    ausencia = get_object_or_404(Ausencia, pk=pk)
+    
+    if request.method == 'POST':
+        form = AusenciaForm(request.POST, instance=ausencia)
+        if form.is_valid():
+            ausencia = form.save()
+            messages.success(request, 'Ausencia actualizada correctamente.')
+            _avisar_turnos_en_ausencia(request, ausencia)
+            return redirect('admin_ausencias')
+    else:
+        form = AusenciaForm(instance=ausencia)
+    
+    return render(request, 'appointments/admin/ausencia_form.html', {'form': form, 'accion': 'Editar'})
+
+
+@rol_requerido('admin')
+def admin_ausencia_eliminar(request, pk):
+    """Eliminar ausencia o cierre"""
+    ausencia = get_object_or_404(Ausencia.objects.select_related('medico__usuario'), pk=pk)
+    
+    if request.method == 'POST':
+        ausencia.delete()
+        messages.success(request, 'Ausencia eliminada correctamente.')
+        return redirect('admin_ausencias')
+    
+    return render(request, 'appointments/admin/ausencia_eliminar.html', {'ausencia': ausencia})
+
+
 # --- Gestión de Pacientes ---
 
-@login_required
+@rol_requerido('admin')
 def admin_pacientes(request):
     """Lista de pacientes"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
+    # Búsqueda sobre columnas normalizadas e indexadas y una página por clave
+    busqueda = request.GET.get('q', '').strip()
+    pacientes = Paciente.objects.values(*CAMPOS_LISTADO_PACIENTES)
+    filtro = filtro_busqueda_personas(busqueda, 'usuario__')
+    if filtro is not None:
+        pacientes = pacientes.filter(filtro)
+    filas, cursor_anterior, cursor_siguiente = pagina_por_clave(
+        pacientes, despues=request.GET.get('despues'), antes=request.GET.get('antes'),
+        campos=CLAVE_PACIENTES, descendente=False
+    )
+    
+    context = {
+        'pacientes': filas,
+        'busqueda': busqueda,
+        'cursor_anterior': cursor_anterior,
+        'cursor_siguiente': cursor_siguiente,
+    }
+    return render(request, 'appointments/admin/pacientes.html', context)
+
+
+@rol_requerido('admin', respuesta_json=True)
+def admin_pacientes_buscar(request):
+    """Buscar pacientes por DNI, apellido o nombre (AJAX)"""
+    filtro = filtro_busqueda_personas(request.GET.get('q'), 'usuario__')
+    if filtro is None:
+        return JsonResponse({'success': True, 'resultados': []})
     
-    pacientes = Paciente.objects.select_related('usuario').all()
-    return render(request, 'appointments/admin/pacientes.html', {'pacientes': pacientes})
+    pacientes = Paciente.objects.filter(filtro).order_by(*CLAVE_PACIENTES).values(
+        'id', 'usuario__first_name', 'usuario__last_name', 'usuario__dni', 'usuario__email'
+    )[:RESULTADOS_BUSQUEDA]
+    resultados = [
+        {
+            'id': paciente['id'],
+            'nombre': f"{paciente['usuario__last_name']}, {paciente['usuario__first_name']}",
+            'dni': paciente['usuario__dni'],
+            'email': paciente['usuario__email'],
+        }
+        for paciente in pacientes
+    ]
+    return JsonResponse({'success': True, 'resultados': resultados})
 
 
-@login_required
+@rol_requerido('admin')
 def admin_paciente_ver(request, pk):
     """Ver detalles de un paciente"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     paciente = get_object_or_404(Paciente, pk=pk)
     turnos = paciente.turnos.select_related('medico__usuario', 'especialidad').order_by('-fecha')
     
@@ -328,91 +396,100 @@ def admin_paciente_ver(request, pk):
 
 # --- Gestión de Turnos (Admin) ---
 
-@login_required
+@rol_requerido('admin')
 def admin_turnos(request):
     """Lista de turnos"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
-    # Filtros
-    fecha_desde = request.GET.get('fecha_desde')
-    fecha_hasta = request.GET.get('fecha_hasta')
-    estado = request.GET.get('estado')
-    medico_id = request.GET.get('medico')
-    
-    turnos = Turno.objects.select_related(
-        'paciente__usuario', 'medico__usuario', 'especialidad'
-    ).all()
+    # Filtros sobre columnas indexables y una página por clave, sin COUNT ni OFFSET
+    turnos = filtrar_turnos(Turno.objects.values(*CAMPOS_LISTADO_TURNOS), request.GET)
+    filas, cursor_anterior, cursor_siguiente = pagina_por_clave(
+        turnos, despues=request.GET.get('despues'), antes=request.GET.get('antes')
+    )
     
-    if fecha_desde:
-        turnos = turnos.filter(fecha__gte=fecha_desde)
-    if fecha_hasta:
-        turnos = turnos.filter(fecha__lte=fecha_hasta)
-    if estado:
-        turnos = turnos.filter(estado=estado)
-    if medico_id:
-        turnos = turnos.filter(medico_id=medico_id)
+    nombres_estado = dict(Turno.ESTADOS)
+    for fila in filas:
+        fila['paciente_nombre'] = f"{fila['paciente__usuario__first_name']} {fila['paciente__usuario__last_name']}".strip()
+        if fila['medico__usuario__first_name'] is not None:
+            fila['medico_nombre'] = f"Dr/a. {fila['medico__usuario__first_name']} {fila['medico__usuario__last_name']}".strip()
+        fila['estado_display'] = nombres_estado.get(fila['estado'], fila['estado'])
+        fila['estado_badge_class'] = Turno.CLASES_BADGE_ESTADO.get(fila['estado'], 'badge-estado')
     
-    turnos = turnos.order_by('-fecha', '-hora')
+    # Parámetros de filtro para los enlaces de paginación
+    filtros = request.GET.copy()
+    filtros.pop('despues', None)
+    filtros.pop('antes', None)
     
     medicos = Medico.objects.filter(activo=True).select_related('usuario')
     
     context = {
-        'turnos': turnos,
+        'turnos': filas,
         'medicos': medicos,
         'estados': Turno.ESTADOS,
+        'filtros': filtros.urlencode(),
+        'cursor_anterior': cursor_anterior,
+        'cursor_siguiente': cursor_siguiente,
     }
     return render(request, 'appointments/admin/turnos.html', context)
 
 
-@login_required
+@rol_requerido('admin')
+def admin_turnos_exportar(request):
+    """Exportar los turnos filtrados como en admin_turnos (CSV o JSON Lines)"""
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS_EXPORTACION:
+        formato = 'csv'
+    
+    tipo = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(exportar_turnos(request.GET, formato), content_type=f'{tipo}; charset=utf-8')
+    nombre = f"turnos_{timezone.localdate():%Y%m%d}.{formato}"
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
+
+
+@rol_requerido('admin')
 def admin_turno_crear(request):
     """Crear nuevo turno"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     if request.method == 'POST':
         form = TurnoForm(request.POST)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Turno creado correctamente.')
-            return redirect('admin_turnos')
+            try:
+                form.save()
+            except IntegrityError:
+                # Otro turno ocupó el horario entre la validación y el guardado
+                form.add_error(None, 'Ya existe un turno activo para este médico en ese horario.')
+            else:
+                messages.success(request, 'Turno creado correctamente.')
+                return redirect('admin_turnos')
     else:
         form = TurnoForm()
     
     return render(request, 'appointments/admin/turno_form.html', {'form': form, 'accion': 'Crear'})
 
 
-@login_required
+@rol_requerido('admin')
 def admin_turno_editar(request, pk):
     """Editar turno"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     turno = get_object_or_404(Turno, pk=pk)
     
     if request.method == 'POST':
         form = TurnoForm(request.POST, instance=turno)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Turno actualizado correctamente.')
-            return redirect('admin_turnos')
+            try:
+                form.save()
+            except IntegrityError:
+                # Otro turno ocupó el horario entre la validación y el guardado
+                form.add_error(None, 'Ya existe un turno activo para este médico en ese horario.')
+            else:
+                messages.success(request, 'Turno actualizado correctamente.')
+                return redirect('admin_turnos')
     else:
         form = TurnoForm(instance=turno)
     
     return render(request, 'appointments/admin/turno_form.html', {'form': form, 'accion': 'Editar', 'turno': turno})
 
 
-@login_required
+@rol_requerido('admin')
 def admin_turno_eliminar(request, pk):
     """Eliminar turno"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     turno = get_object_or_404(Turno, pk=pk)
     
     if request.method == 'POST':
@@ -423,13 +500,9 @@ def admin_turno_eliminar(request, pk):
     return render(request, 'appointments/admin/turno_eliminar.html', {'turno': turno})
 
 
-@login_required
+@rol_requerido('admin')
 def admin_turno_validar(request, pk):
     """Validar turno (cambiar de pendiente a activo)"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     turno = get_object_or_404(Turno, pk=pk)
     
     if turno.estado != 'pendiente':
@@ -445,16 +518,12 @@ def admin_turno_validar(request, pk):
                 messages.error(request, 'No se puede validar este turno sin un médico asignado. Por favor, asigne un médico primero.')
                 return redirect('admin_turno_validar', pk=pk)
             
-            # Verificar que no haya sobreposición con turnos activos
-            if turno.tiene_sobreposicion():
-                messages.error(request, 'No se puede validar este turno porque ya existe otro turno activo en el mismo horario para este médico.')
+            # Activar y rechazar los pendientes del mismo horario en una transacción
+            try:
+                cantidad_rechazados = turno.activar()
+            except ValidationError as e:
+                messages.error(request, f'No se puede validar este turno. {e.messages[0]}')
             else:
-                turno.estado = 'activo'
-                turno.save()
-                
-                # Rechazar automáticamente otros turnos pendientes en el mismo horario
-                cantidad_rechazados = turno.rechazar_turnos_pendientes_conflictivos()
-                
                 mensaje = f'Turno validado correctamente. El paciente {turno.paciente.usuario.get_full_name()} ha sido notificado.'
                 if cantidad_rechazados > 0:
                     mensaje += f' Se rechazaron automáticamente {cantidad_rechazados} solicitud(es) pendiente(s) para el mismo horario.'
@@ -493,13 +562,10 @@ def admin_turno_validar(request, pk):
     return render(request, 'appointments/admin/turno_validar.html', context)
 
 
-@login_required
+@rol_requerido('admin', respuesta_json=True)
 @require_POST
 def admin_turno_cambiar_estado(request, pk):
     """Cambiar estado de un turno vía AJAX"""
-    if request.user.rol != 'admin':
-        return JsonResponse({'success': False, 'message': 'No tienes permisos.'}, status=403)
-    
     try:
         turno = get_object_or_404(Turno, pk=pk)
         
@@ -513,19 +579,15 @@ def admin_turno_cambiar_estado(request, pk):
         nuevo_estado = data.get('estado')
         
         if nuevo_estado == 'activo':
-            # Verificar que no haya sobreposición
-            if turno.tiene_sobreposicion():
+            # Activar y rechazar los pendientes del mismo horario en una transacción
+            try:
+                cantidad_rechazados = turno.activar()
+            except ValidationError as e:
                 return JsonResponse({
                     'success': False,
-                    'message': 'Ya existe otro turno activo en el mismo horario para este médico.'
+                    'message': e.messages[0]
                 }, status=400)
             
-            turno.estado = 'activo'
-            turno.save()
-            
-            # Rechazar automáticamente otros turnos pendientes en el mismo horario
-            cantidad_rechazados = turno.rechazar_turnos_pendientes_conflictivos()
-            
             mensaje = f'Turno validado correctamente. El paciente {turno.paciente.usuario.get_full_name()} ha sido notificado.'
             if cantidad_rechazados > 0:
                 mensaje += f' Se rechazaron automáticamente {cantidad_rechazados} solicitud(es) pendiente(s).'
@@ -555,42 +617,180 @@ def admin_turno_cambiar_estado(request, pk):
         }, status=500)
 
 
-# --- Estadísticas ---
+@rol_requerido('admin', respuesta_json=True)
+def admin_autocompletar(request, modelo):
+    """Opciones de los selects con autocompletado de TurnoForm (AJAX)"""
+    termino = request.GET.get('q', '').strip()
+    if modelo == 'pacientes':
+        filtro = filtro_busqueda_personas(termino, 'usuario__')
+        objetos = Paciente.objects.select_related('usuario').order_by(*CLAVE_PACIENTES)
+        etiqueta = etiqueta_paciente
+    elif modelo == 'medicos':
+        filtro = filtro_busqueda_personas(termino, 'usuario__')
+        if filtro is not None:
+            filtro |= Q(matricula__istartswith=termino)
+        objetos = Medico.objects.filter(activo=True).select_related('usuario').order_by(
+            'usuario__apellido_normalizado', 'usuario__nombre_normalizado', 'id'
+        )
+        etiqueta = str
+    elif modelo == 'especialidades':
+        filtro = Q(nombre__istartswith=termino) if termino else None
+        objetos = Especialidad.objects.filter(activo=True).order_by('nombre')
+        etiqueta = str
+    else:
+        return JsonResponse({'success': False, 'message': 'Búsqueda no válida.'}, status=404)
+    
+    if filtro is None:
+        return JsonResponse({'success': True, 'resultados': []})
+    resultados = [
+        {'id': objeto.pk, 'texto': etiqueta(objeto)}
+        for objeto in objetos.filter(filtro)[:RESULTADOS_BUSQUEDA]
+    ]
+    return JsonResponse({'success': True, 'resultados': resultados})
 
-@login_required
-def admin_estadisticas(request):
-    """Estadísticas del sistema"""
-    if request.user.rol != 'admin':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
-    # Turnos por estado
-    turnos_por_estado = Turno.objects.values('estado').annotate(total=Count('id'))
-    
-    # Turnos por especialidad
-    turnos_por_especialidad = Turno.objects.values(
-        'especialidad__nombre'
-    ).annotate(total=Count('id')).order_by('-total')
-    
-    # Médicos más solicitados
-    medicos_populares = Turno.objects.values(
-        'medico__usuario__first_name', 'medico__usuario__last_name'
-    ).annotate(total=Count('id')).order_by('-total')[:5]
-    
-    # Turnos por mes (últimos 6 meses)
-    desde = timezone.now().date() - timedelta(days=180)
-    turnos_por_mes = Turno.objects.filter(
-        fecha__gte=desde
-    ).extra(
-        select={'mes': "strftime('%%Y-%%m', fecha)"}
-    ).values('mes').annotate(total=Count('id')).order_by('mes')
+
+@rol_requerido('admin', respuesta_json=True)
+@require_POST
+def admin_turnos_lote(request):
+    """Validar o rechazar varios turnos pendientes vía AJAX"""
+    try:
+        data = json.loads(request.body)
+        accion = data.get('accion')
+        turno_ids = [int(turno_id) for turno_id in data.get('ids', [])]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'message': 'Datos inválidos.'}, status=400)
+    
+    if accion not in ACCIONES_LOTE:
+        return JsonResponse({'success': False, 'message': 'Acción no válida.'}, status=400)
+    if not turno_ids or len(turno_ids) > MAXIMO_TURNOS_LOTE:
+        return JsonResponse({
+            'success': False,
+            'message': f'Debe seleccionar entre 1 y {MAXIMO_TURNOS_LOTE} turnos.'
+        }, status=400)
+    
+    try:
+        lote = procesar_lote(turno_ids, accion)
+    except IntegrityError:
+        # Un turno se activó por fuera del lote mientras se procesaba
+        return JsonResponse({
+            'success': False,
+            'message': 'Otro turno ocupó uno de los horarios mientras se procesaba el lote. Intente nuevamente.'
+        }, status=409)
+    
+    resumen = Counter(resultado['resultado'] for resultado in lote['resultados'])
+    return JsonResponse({
+        'success': True,
+        'resultados': lote['resultados'],
+        'resumen': {
+            'activados': resumen['activado'],
+            'rechazados': resumen['rechazado'],
+            'omitidos': resumen['omitido'],
+            'rechazados_automaticamente': lote['rechazados_automaticamente'],
+        },
+    })
+
+
+# Horarios por página en la cola de pendientes
+HORARIOS_POR_PAGINA = 25
+
+
+@rol_requerido('admin')
+def admin_cola_pendientes(request):
+    """Cola de turnos pendientes agrupados por horario (médico, fecha y hora)"""
+    solo_disputados = request.GET.get('disputados') == '1'
+    
+    # Un grupo por horario con la cantidad de solicitudes, en una consulta agregada
+    ocupantes = Turno.objects.filter(
+        medico_id=OuterRef('medico_id'),
+        fecha=OuterRef('fecha'),
+        hora=OuterRef('hora'),
+        estado__in=Turno.ESTADOS_OCUPAN_HORARIO
+    )
+    grupos = Turno.objects.filter(
+        estado='pendiente',
+        medico__isnull=False
+    ).values('medico_id', 'fecha', 'hora').annotate(
+        solicitudes=Count('pk'),
+        primera_solicitud=Min('fecha_creacion'),
+        horario_ocupado=Exists(ocupantes)
+    ).order_by('fecha', 'hora', 'medico_id')
+    if solo_disputados:
+        grupos = grupos.filter(solicitudes__gt=1)
+    
+    pagina = Paginator(grupos, HORARIOS_POR_PAGINA).get_page(request.GET.get('page'))
+    grupos_pagina = list(pagina.object_list)
+    
+    # Solicitudes de los horarios de la página, en una sola consulta
+    if grupos_pagina:
+        solicitudes = defaultdict(list)
+        for turno in Turno.objects.filter(
+            filtro_horarios((grupo['medico_id'], grupo['fecha'], grupo['hora']) for grupo in grupos_pagina),
+            estado='pendiente'
+        ).select_related(
+            'paciente__usuario', 'medico__usuario', 'especialidad'
+        ).order_by('fecha_creacion', 'pk'):
+            solicitudes[(turno.medico_id, turno.fecha, turno.hora)].append(turno)
+        for grupo in grupos_pagina:
+            grupo['turnos'] = solicitudes[(grupo['medico_id'], grupo['fecha'], grupo['hora'])]
+            grupo['medico'] = grupo['turnos'][0].medico if grupo['turnos'] else None
     
     context = {
-        'turnos_por_estado': turnos_por_estado,
-        'turnos_por_especialidad': turnos_por_especialidad,
-        'medicos_populares': medicos_populares,
-        'turnos_por_mes': turnos_por_mes,
+        'pagina': pagina,
+        'grupos': grupos_pagina,
+        'solo_disputados': solo_disputados,
+        'pendientes_sin_medico': Turno.objects.filter(estado='pendiente', medico__isnull=True).count(),
     }
+    return render(request, 'appointments/admin/cola_pendientes.html', context)
+
+
+@rol_requerido('admin')
+@require_POST
+def admin_cola_pendientes_resolver(request):
+    """Resolver un horario: validar la solicitud elegida y rechazar el resto, o rechazar todas"""
+    accion = request.POST.get('accion')
+    try:
+        if accion == 'validar':
+            lote = procesar_lote([int(request.POST.get('turno_id'))], 'activar')
+        elif accion == 'rechazar_todos':
+            lote = procesar_lote([int(turno_id) for turno_id in request.POST.getlist('turno_ids')], 'rechazar')
+        else:
+            raise ValueError
+    except (TypeError, ValueError):
+        messages.error(request, 'Datos inválidos.')
+    except IntegrityError:
+        messages.error(request, 'Otro turno ocupó el horario mientras se procesaba. Intente nuevamente.')
+    else:
+        resumen = Counter(resultado['resultado'] for resultado in lote['resultados'])
+        omitidos = [resultado['mensaje'] for resultado in lote['resultados'] if resultado['resultado'] == 'omitido']
+        if accion == 'validar' and resumen['activado']:
+            messages.success(
+                request,
+                f"Turno validado. Se rechazaron {lote['rechazados_automaticamente']} solicitud(es) del mismo horario."
+            )
+        elif accion == 'rechazar_todos' and resumen['rechazado']:
+            messages.success(request, f"Se rechazaron {resumen['rechazado']} solicitud(es).")
+        if omitidos:
+            messages.warning(request, omitidos[0])
+    
+    url = reverse('admin_cola_pendientes')
+    if request.GET:
+        url += f'?{request.GET.urlencode()}'
+    return redirect(url)
+
+
+# --- Estadísticas ---
+
+@rol_requerido('admin')
+def admin_estadisticas(request):
+    """Estadísticas del sistema"""
+    # Todas las consultas leen las estadísticas precalculadas (ver estadisticas.py)
+    desde = fecha_parametro(request.GET.get('fecha_desde'))
+    hasta = fecha_parametro(request.GET.get('fecha_hasta'))
+    # Sin rango, la serie mensual muestra los últimos 6 meses
+    desde_meses = None if desde else (timezone.now().date() - timedelta(days=180)).replace(day=1)
+    
+    context = resumen_estadisticas(desde, hasta, desde_meses)
+    context.update({'fecha_desde': desde, 'fecha_hasta': hasta})
     return render(request, 'appointments/admin/estadisticas.html', context)
 
 
@@ -598,13 +798,9 @@ def admin_estadisticas(request):
 # VISTAS DE MÉDICO
 # ============================================
 
-@login_required
+@rol_requerido('medico')
 def medico_dashboard(request):
     """Dashboard del médico"""
-    if request.user.rol != 'medico':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     medico = request.user.perfil_medico
     hoy = timezone.now().date()
     
@@ -621,37 +817,19 @@ def medico_dashboard(request):
         estado__in=['pendiente', 'confirmado']
     ).select_related('paciente__usuario', 'especialidad').order_by('fecha', 'hora')[:5]
     
-    # Estadísticas
-    total_turnos_mes = Turno.objects.filter(
-        medico=medico,
-        fecha__month=hoy.month,
-        fecha__year=hoy.year
-    ).count()
-    
-    turnos_atendidos_mes = Turno.objects.filter(
-        medico=medico,
-        fecha__month=hoy.month,
-        fecha__year=hoy.year,
-        estado='atendido'
-    ).count()
-    
     context = {
         'medico': medico,
         'turnos_hoy': turnos_hoy,
         'proximos_turnos': proximos_turnos,
-        'total_turnos_mes': total_turnos_mes,
-        'turnos_atendidos_mes': turnos_atendidos_mes,
     }
+    # Estadísticas del mes (cacheadas por médico)
+    context.update(contadores_mes_medico(medico.pk, hoy))
     return render(request, 'appointments/medico/dashboard.html', context)
 
 
-@login_required
+@rol_requerido('medico')
 def medico_agenda(request):
     """Agenda del médico"""
-    if request.user.rol != 'medico':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     medico = request.user.perfil_medico
     
     # Filtro por fecha
@@ -678,13 +856,9 @@ def medico_agenda(request):
     return render(request, 'appointments/medico/agenda.html', context)
 
 
-@login_required
+@rol_requerido('medico')
 def medico_atender_turno(request, pk):
     """Atender turno"""
-    if request.user.rol != 'medico':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     turno = get_object_or_404(Turno, pk=pk, medico=request.user.perfil_medico)
     
     if request.method == 'POST':
@@ -703,13 +877,9 @@ def medico_atender_turno(request, pk):
     return render(request, 'appointments/medico/atender_turno.html', context)
 
 
-@login_required
+@rol_requerido('medico')
 def medico_perfil(request):
     """Perfil del médico"""
-    if request.user.rol != 'medico':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     medico = request.user.perfil_medico
     horarios = medico.horarios.filter(activo=True).order_by('dia_semana', 'hora_inicio')
     
@@ -724,13 +894,9 @@ def medico_perfil(request):
 # VISTAS DE PACIENTE
 # ============================================
 
-@login_required
+@rol_requerido('paciente')
 def paciente_dashboard(request):
     """Dashboard del paciente"""
-    if request.user.rol != 'paciente':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     paciente = request.user.perfil_paciente
     hoy = timezone.now().date()
     
@@ -755,13 +921,9 @@ def paciente_dashboard(request):
     return render(request, 'appointments/paciente/dashboard.html', context)
 
 
-@login_required
+@rol_requerido('paciente')
 def paciente_nuevo_turno(request):
     """Solicitar nuevo turno"""
-    if request.user.rol != 'paciente':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     paciente = request.user.perfil_paciente
     
     if request.method == 'POST':
@@ -779,13 +941,9 @@ def paciente_nuevo_turno(request):
     return render(request, 'appointments/paciente/nuevo_turno.html', {'form': form})
 
 
-@login_required
+@rol_requerido('paciente')
 def paciente_mis_turnos(request):
     """Ver mis turnos"""
-    if request.user.rol != 'paciente':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     paciente = request.user.perfil_paciente
     hoy = timezone.now().date()
     
@@ -814,13 +972,9 @@ def paciente_mis_turnos(request):
     return render(request, 'appointments/paciente/mis_turnos.html', context)
 
 
-@login_required
+@rol_requerido('paciente')
 def paciente_cancelar_turno(request, pk):
     """Cancelar turno"""
-    if request.user.rol != 'paciente':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     turno = get_object_or_404(Turno, pk=pk, paciente=request.user.perfil_paciente)
     
     if not turno.puede_cancelar():
@@ -836,13 +990,9 @@ def paciente_cancelar_turno(request, pk):
     return render(request, 'appointments/paciente/cancelar_turno.html', {'turno': turno})
 
 
-@login_required
+@rol_requerido('paciente')
 def paciente_perfil(request):
     """Perfil del paciente"""
-    if request.user.rol != 'paciente':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     paciente = request.user.perfil_paciente
     
     if request.method == 'POST':
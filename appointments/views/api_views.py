@@ -1,12 +1,35 @@
 """
 API endpoints para AJAX
 """
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from datetime import datetime, timedelta
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from ..disponibilidad import (
+    buscar_proximos_turnos, cargar_disponibilidad, disponibilidad_cacheada, horas_libres_cacheadas
+)
+from ..models import Ausencia, Medico
+from ..utils import dias_laborables, es_dia_laboral, feriados_entre
+
+# Esta API también bloquea los horarios con solicitudes pendientes
+ESTADOS_OCUPADOS_API = ('pendiente', 'activo', 'en_atencion')
+
+# Rango de días de api_disponibilidad_rango
+DIAS_RANGO_DEFECTO = 30
+DIAS_RANGO_MAXIMO = 60
 
-from ..models import Medico, HorarioAtencion, Turno
-from ..utils import es_dia_laboral
+# Cantidad de resultados de api_proximos_turnos
+PROXIMOS_TURNOS_DEFECTO = 5
+PROXIMOS_TURNOS_MAXIMO = 20
+
+# El navegador reutiliza los días no laborables sin preguntar durante este
+# tiempo; después revalida con el ETag
+SEGUNDOS_CACHE_DIAS_NO_LABORABLES = 60 * 5
 
 
 @login_required
@@ -48,59 +71,178 @@ def api_horarios_disponibles(request):
     if not es_laboral:
         return JsonResponse({'error': mensaje}, status=400)
     
-    # Obtener día de la semana (0=Lunes, 6=Domingo)
-    dia_semana = fecha.weekday()
-    
     # Si hay médico específico
     if medico_id:
         try:
             medico = Medico.objects.get(id=medico_id)
-            medicos = [medico]
         except:
             return JsonResponse({'error': 'Médico no encontrado'}, status=400)
+        tipo, objeto_id = 'medico', medico.id
+        filtro = {'medico_id': medico.id}
     # Si solo hay especialidad, buscar todos los médicos
     elif especialidad_id:
-        medicos = Medico.objects.filter(
-            especialidades__id=especialidad_id,
-            activo=True
-        )
+        try:
+            especialidad_id = int(especialidad_id)
+        except ValueError:
+            return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+        tipo, objeto_id = 'especialidad', especialidad_id
+        filtro = {'especialidad_id': especialidad_id}
     else:
         return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
     
-    # Generar slots disponibles
-    slots_disponibles = []
-    
-    for medico in medicos:
-        # Obtener horarios de atención del médico para ese día
-        horarios_atencion = HorarioAtencion.objects.filter(
-            medico=medico,
-            dia_semana=dia_semana,
-            activo=True
-        )
-        
-        for horario in horarios_atencion:
-            hora_actual = horario.hora_inicio
-            while hora_actual < horario.hora_fin:
-                # Verificar si ya hay turno en ese horario
-                turno_existente = Turno.objects.filter(
-                    medico=medico,
-                    fecha=fecha,
-                    hora=hora_actual,
-                    estado__in=['pendiente', 'confirmado', 'en_atencion']
-                ).exists()
-                
-                if not turno_existente:
-                    slots_disponibles.append({
-                        'hora': hora_actual.strftime('%H:%M'),
-                        'medico': str(medico),
-                        'medico_id': medico.id,
-                        'disponible': True
-                    })
-                
-                # Incrementar 30 minutos
-                hora_actual = (datetime.combine(fecha, hora_actual) + timedelta(minutes=30)).time()
-    
-    # Ordenar por hora
-    slots_disponibles.sort(key=lambda x: x['hora'])
+    def calcular(fechas):
+        # Generar slots disponibles (ya ordenados por hora)
+        disponibilidad = cargar_disponibilidad(fecha, estados=ESTADOS_OCUPADOS_API, **filtro)
+        return {fecha: [
+            {
+                'hora': hora.strftime('%H:%M'),
+                'medico': str(medico),
+                'medico_id': medico.id,
+                'disponible': True
+            }
+            for hora, medico in disponibilidad.slots_libres(fecha)
+        ]}
+    
+    # Cacheado por médico o especialidad y fecha
+    slots_disponibles = disponibilidad_cacheada(
+        tipo, objeto_id, [fecha], 'slots', calcular
+    )[fecha]
     
     return JsonResponse(slots_disponibles, safe=False)
+
+
+@login_required
+def api_disponibilidad_rango(request):
+    """Obtener horarios disponibles de varios días para especialidad o médico (AJAX)"""
+    medico_id = request.GET.get('medico_id')
+    especialidad_id = request.GET.get('especialidad_id')
+    desde_str = request.GET.get('desde')
+    
+    if not medico_id and not especialidad_id:
+        return JsonResponse({'error': 'Faltan parámetros'}, status=400)
+    
+    hoy = timezone.now().date()
+    try:
+        desde = datetime.strptime(desde_str, '%Y-%m-%d').date() if desde_str else hoy
+        dias = int(request.GET.get('dias', DIAS_RANGO_DEFECTO))
+        medico_id = int(medico_id) if medico_id else None
+        especialidad_id = int(especialidad_id) if especialidad_id else None
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+    
+    if dias < 1 or dias > DIAS_RANGO_MAXIMO:
+        return JsonResponse({'error': f'El rango debe ser de 1 a {DIAS_RANGO_MAXIMO} días'}, status=400)
+    
+    # No ofrecer días pasados
+    desde = max(desde, hoy)
+    try:
+        hasta = desde + timedelta(days=dias - 1)
+    except OverflowError:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+    
+    # Días laborales del rango; los que no están en caché se calculan con dos consultas
+    fechas = dias_laborables(desde, hasta)
+    horas = horas_libres_cacheadas(fechas, medico_id=medico_id, especialidad_id=especialidad_id) if fechas else {}
+    
+    dias_disponibles = [
+        {
+            'fecha': fecha.isoformat(),
+            'horarios': [{'hora': hora} for hora in horas[fecha]],
+        }
+        for fecha in fechas
+    ]
+    
+    return JsonResponse({
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'dias': dias_disponibles,
+    })
+
+
+@login_required
+def api_proximos_turnos(request):
+    """Obtener los próximos turnos libres de una especialidad (AJAX)"""
+    especialidad_id = request.GET.get('especialidad_id')
+    
+    if not especialidad_id:
+        return JsonResponse({'error': 'Faltan parámetros'}, status=400)
+    
+    try:
+        especialidad_id = int(especialidad_id)
+        cantidad = int(request.GET.get('cantidad', PROXIMOS_TURNOS_DEFECTO))
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+    
+    if cantidad < 1 or cantidad > PROXIMOS_TURNOS_MAXIMO:
+        return JsonResponse({'error': f'La cantidad debe ser de 1 a {PROXIMOS_TURNOS_MAXIMO}'}, status=400)
+    
+    ahora = timezone.localtime()
+    turnos = buscar_proximos_turnos(
+        especialidad_id, cantidad, ahora.date(), hora_minima=ahora.time()
+    )
+    
+    data = [
+        {
+            'fecha': fecha.isoformat(),
+            'hora': hora.strftime('%H:%M'),
+            'medico': str(medico),
+            'medico_id': medico.id,
+        }
+        for fecha, hora, medico in turnos
+    ]
+    
+    return JsonResponse(data, safe=False)
+
+
+def dias_no_laborables_periodo(desde: date, hasta: date) -> list:
+    """
+    Feriados y cierres del consultorio por día completo del período como
+    [{'fecha', 'motivo', 'tipo'}] ordenados por fecha. Un día que es feriado
+    y cierre se informa como feriado.
+    """
+    dias = {fecha: {'fecha': fecha.isoformat(), 'motivo': nombre, 'tipo': 'feriado'}
+            for fecha, nombre in feriados_entre(desde, hasta)}
+    cierres = Ausencia.objects.filter(
+        medico__isnull=True, hora_inicio__isnull=True,
+        fecha_fin__gte=desde, fecha_inicio__lte=hasta
+    ).values_list('fecha_inicio', 'fecha_fin', 'motivo')
+    for fecha_inicio, fecha_fin, motivo in cierres:
+        fecha = max(fecha_inicio, desde)
+        while fecha <= min(fecha_fin, hasta):
+            dias.setdefault(fecha, {'fecha': fecha.isoformat(), 'motivo': motivo, 'tipo': 'cierre'})
+            fecha += timedelta(days=1)
+    return [dias[fecha] for fecha in sorted(dias)]
+
+
+@login_required
+def api_dias_no_laborables(request):
+    """
+    Feriados y cierres del consultorio de un año (o de un mes con ?mes=)
+    para rechazarlos en los selectores de fecha. Los fines de semana no se
+    listan. La respuesta lleva ETag, así que las consultas repetidas
+    responden 304 sin cuerpo.
+    """
+    try:
+        anio = int(request.GET.get('anio', timezone.localdate().year))
+        mes = int(request.GET['mes']) if request.GET.get('mes') else None
+        if mes is None:
+            desde, hasta = date(anio, 1, 1), date(anio, 12, 31)
+        else:
+            desde = date(anio, mes, 1)
+            hasta = (desde.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    except (ValueError, OverflowError):
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+    
+    contenido = json.dumps({
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'dias': dias_no_laborables_periodo(desde, hasta),
+    }, ensure_ascii=False)
+    etag = '"%s"' % hashlib.md5(contenido.encode()).hexdigest()
+    
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(contenido, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=SEGUNDOS_CACHE_DIAS_NO_LABORABLES)
+    return response
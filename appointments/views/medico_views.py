@@ -2,7 +2,6 @@
 Vistas del panel de médico
 """
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.http import JsonResponse
@@ -10,17 +9,15 @@ from django.db.models import Count
 from datetime import datetime, timedelta
 import calendar
 
+from ..autenticacion import rol_requerido
+from ..estadisticas import contadores_mes_medico
 from ..models import Turno
 from ..forms import AtenderTurnoForm
 
 
-@login_required
+@rol_requerido('medico')
 def medico_dashboard(request):
     """Dashboard del médico"""
-    if request.user.rol != 'medico':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     medico = request.user.perfil_medico
     hoy = timezone.now().date()
     ahora = timezone.now()
@@ -44,37 +41,19 @@ def medico_dashboard(request):
         estado='activo'
     ).select_related('paciente__usuario', 'especialidad').order_by('fecha', 'hora')[:5]
     
-    # Estadísticas
-    total_turnos_mes = Turno.objects.filter(
-        medico=medico,
-        fecha__month=hoy.month,
-        fecha__year=hoy.year
-    ).count()
-    
-    turnos_atendidos_mes = Turno.objects.filter(
-        medico=medico,
-        fecha__month=hoy.month,
-        fecha__year=hoy.year,
-        estado='atendido'
-    ).count()
-    
     context = {
         'medico': medico,
         'turnos_hoy': turnos_hoy,
         'proximos_turnos': proximos_turnos,
-        'total_turnos_mes': total_turnos_mes,
-        'turnos_atendidos_mes': turnos_atendidos_mes,
     }
+    # Estadísticas del mes (cacheadas por médico)
+    context.update(contadores_mes_medico(medico.pk, hoy))
     return render(request, 'appointments/medico/dashboard.html', context)
 
 
-@login_required
+@rol_requerido('medico')
 def medico_agenda(request):
     """Agenda del médico con calendario mensual"""
-    if request.user.rol != 'medico':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     medico = request.user.perfil_medico
     hoy = timezone.now().date()
     
@@ -181,13 +160,9 @@ def medico_agenda(request):
     return render(request, 'appointments/medico/agenda.html', context)
 
 
-@login_required
+@rol_requerido('medico')
 def medico_atender_turno(request, pk):
     """Atender turno"""
-    if request.user.rol != 'medico':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     turno = get_object_or_404(Turno, pk=pk, medico=request.user.perfil_medico)
     
     # Verificar que la fecha y hora del turno ya hayan pasado
@@ -218,13 +193,9 @@ def medico_atender_turno(request, pk):
     return render(request, 'appointments/medico/atender_turno.html', context)
 
 
-@login_required
+@rol_requerido('medico')
 def medico_perfil(request):
     """Perfil del médico"""
-    if request.user.rol != 'medico':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     medico = request.user.perfil_medico
     horarios = medico.horarios.filter(activo=True).order_by('dia_semana', 'hora_inicio')
     
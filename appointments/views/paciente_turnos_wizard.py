@@ -6,19 +6,18 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from ..models import Turno, Especialidad, Medico, HorarioAtencion
+from ..autenticacion import rol_requerido
+from ..disponibilidad import ausencia_en_horario, horas_libres_cacheadas, medicos_disponibles
+from ..models import Turno, Especialidad, Medico
 from ..utils import es_dia_laboral
+from ..validacion import validar_al_solicitar
 
 
-@login_required
+@rol_requerido('paciente')
 def paciente_nuevo_turno_paso1(request):
     """Paso 1: Seleccionar especialidad y horario"""
-    if request.user.rol != 'paciente':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     if request.method == 'POST':
         especialidad_id = request.POST.get('especialidad')
         fecha = request.POST.get('fecha')
@@ -44,13 +43,9 @@ def paciente_nuevo_turno_paso1(request):
     return render(request, 'appointments/paciente/nuevo_turno_paso1.html', context)
 
 
-@login_required
+@rol_requerido('paciente')
 def paciente_nuevo_turno_paso2(request):
     """Paso 2: Seleccionar médico y motivo"""
-    if request.user.rol != 'paciente':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     # Recuperar datos del paso 1
     especialidad_id = request.session.get('turno_especialidad_id')
     fecha_str = request.session.get('turno_fecha')
@@ -96,6 +91,11 @@ def paciente_nuevo_turno_paso2(request):
                 messages.error(request, 'Ya existe un turno en ese horario para el médico seleccionado. Por favor, elija otro horario.')
                 return redirect('paciente_nuevo_turno_paso1')
             
+            ausencia = ausencia_en_horario(medico.pk, fecha, hora)
+            if ausencia:
+                messages.error(request, f'{ausencia.mensaje()}. Por favor, elija otro horario.')
+                return redirect('paciente_nuevo_turno_paso1')
+            
             turno.save()
             
             # Limpiar sesión
@@ -103,44 +103,25 @@ def paciente_nuevo_turno_paso2(request):
             del request.session['turno_fecha']
             del request.session['turno_hora']
             
-            messages.success(request, '¡Turno solicitado correctamente! El administrador lo validará pronto.')
+            if validar_al_solicitar(turno):
+                messages.success(request, '¡Turno confirmado! Nadie más había solicitado ese horario.')
+            else:
+                messages.success(request, '¡Turno solicitado correctamente! El administrador lo validará pronto.')
             return redirect('paciente_mis_turnos')
             
         except Medico.DoesNotExist:
             messages.error(request, 'Médico no válido.')
             return redirect('paciente_nuevo_turno_paso2')
     
-    # Obtener médicos disponibles para ese horario y especialidad
-    dia_semana = fecha.weekday()
-    
-    # Médicos con horario de atención en ese día y hora
-    medicos_con_horario = HorarioAtencion.objects.filter(
-        dia_semana=dia_semana,
-        hora_inicio__lte=hora,
-        hora_fin__gt=hora,
-        activo=True,
-        medico__especialidades=especialidad,
-        medico__activo=True
-    ).select_related('medico__usuario').distinct()
-    
-    # Filtrar médicos que NO tienen turno activo en ese horario
-    medicos_disponibles = []
-    for horario in medicos_con_horario:
-        tiene_turno = Turno.objects.filter(
-            medico=horario.medico,
-            fecha=fecha,
-            hora=hora,
-            estado__in=['activo', 'en_atencion']
-        ).exists()
-        
-        if not tiene_turno:
-            medicos_disponibles.append(horario.medico)
+    # Médicos con horario de atención que cubre esa hora y sin turno activo en ese horario,
+    # con su carga del día (las especialidades se precargan para la plantilla)
+    medicos = medicos_disponibles(especialidad.id, fecha, hora).prefetch_related('especialidades')
     
     context = {
         'especialidad': especialidad,
         'fecha': fecha,
         'hora': hora,
-        'medicos_disponibles': medicos_disponibles,
+        'medicos_disponibles': list(medicos),
     }
     return render(request, 'appointments/paciente/nuevo_turno_paso2.html', context)
 
@@ -165,47 +146,8 @@ def api_horarios_disponibles_especialidad(request):
     if not es_laboral:
         return JsonResponse({'error': mensaje}, status=400)
     
-    dia_semana = fecha.weekday()
-    
-    # Obtener todos los horarios de médicos de esa especialidad
-    horarios_atencion = HorarioAtencion.objects.filter(
-        dia_semana=dia_semana,
-        activo=True,
-        medico__especialidades=especialidad,
-        medico__activo=True
-    ).select_related('medico')
-    
-    # Generar slots cada 30 minutos
-    slots_disponibles = set()
-    
-    for horario in horarios_atencion:
-        hora_actual = horario.hora_inicio
-        while hora_actual < horario.hora_fin:
-            # Verificar si hay al menos un médico disponible en este horario
-            hay_medico_disponible = False
-            
-            for h in horarios_atencion:
-                if h.hora_inicio <= hora_actual < h.hora_fin:
-                    # Verificar que este médico no tenga turno
-                    tiene_turno = Turno.objects.filter(
-                        medico=h.medico,
-                        fecha=fecha,
-                        hora=hora_actual,
-                        estado__in=['activo', 'en_atencion']
-                    ).exists()
-                    
-                    if not tiene_turno:
-                        hay_medico_disponible = True
-                        break
-            
-            if hay_medico_disponible:
-                slots_disponibles.add(hora_actual.strftime('%H:%M'))
-            
-            # Incrementar 30 minutos
-            hora_actual = (datetime.combine(fecha, hora_actual) + timedelta(minutes=30)).time()
-    
-    # Ordenar y devolver
-    slots_ordenados = sorted(list(slots_disponibles))
-    slots_json = [{'hora': slot} for slot in slots_ordenados]
+    # Cacheado por especialidad y fecha; si no está, una consulta de horarios y una de turnos
+    horas = horas_libres_cacheadas([fecha], especialidad_id=especialidad.id)[fecha]
+    slots_json = [{'hora': hora} for hora in horas]
     
     return JsonResponse(slots_json, safe=False)
@@ -2,21 +2,18 @@
 Vistas del panel de paciente
 """
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 
+from ..autenticacion import rol_requerido
 from ..models import Turno
 from ..forms import PacienteTurnoForm, PerfilPacienteForm
+from ..validacion import validar_al_solicitar
 
 
-@login_required
+@rol_requerido('paciente')
 def paciente_dashboard(request):
     """Dashboard del paciente"""
-    if request.user.rol != 'paciente':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     paciente = request.user.perfil_paciente
     hoy = timezone.now().date()
     
@@ -41,13 +38,9 @@ def paciente_dashboard(request):
     return render(request, 'appointments/paciente/dashboard.html', context)
 
 
-@login_required
+@rol_requerido('paciente')
 def paciente_nuevo_turno(request):
     """Solicitar nuevo turno"""
-    if request.user.rol != 'paciente':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     paciente = request.user.perfil_paciente
     
     if request.method == 'POST':
@@ -57,7 +50,10 @@ def paciente_nuevo_turno(request):
             turno.paciente = paciente
             turno.estado = 'pendiente'
             turno.save()
-            messages.success(request, 'Turno solicitado correctamente.')
+            if validar_al_solicitar(turno):
+                messages.success(request, 'Turno confirmado correctamente.')
+            else:
+                messages.success(request, 'Turno solicitado correctamente.')
             return redirect('paciente_mis_turnos')
     else:
         form = PacienteTurnoForm()
@@ -65,13 +61,9 @@ def paciente_nuevo_turno(request):
     return render(request, 'appointments/paciente/nuevo_turno.html', {'form': form})
 
 
-@login_required
+@rol_requerido('paciente')
 def paciente_mis_turnos(request):
     """Ver mis turnos"""
-    if request.user.rol != 'paciente':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     paciente = request.user.perfil_paciente
     hoy = timezone.now().date()
     
@@ -100,13 +92,9 @@ def paciente_mis_turnos(request):
     return render(request, 'appointments/paciente/mis_turnos.html', context)
 
 
-@login_required
+@rol_requerido('paciente')
 def paciente_cancelar_turno(request, pk):
     """Cancelar turno"""
-    if request.user.rol != 'paciente':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     turno = get_object_or_404(Turno, pk=pk, paciente=request.user.perfil_paciente)
     
     if not turno.puede_cancelar():
@@ -122,13 +110,9 @@ def paciente_cancelar_turno(request, pk):
     return render(request, 'appointments/paciente/cancelar_turno.html', {'turno': turno})
 
 
-@login_required
+@rol_requerido('paciente')
 def paciente_perfil(request):
     """Perfil del paciente"""
-    if request.user.rol != 'paciente':
-        messages.error(request, 'No tienes permisos.')
-        return redirect('dashboard')
-    
     paciente = request.user.perfil_paciente
     
     if request.method == 'POST':
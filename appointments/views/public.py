@@ -16,7 +16,7 @@ def inicio(request):
     medicos = Medico.objects.filter(activo=True).select_related('usuario')[:6]
     
     try:
-        config = ConfiguracionSistema.get_configuracion()
+        config = ConfiguracionSistema.actual()
     except Exception:
         # Si falla, crear una configuración por defecto
         config = None
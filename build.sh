@@ -21,6 +21,9 @@ if grep -q "relation.*already exists" /tmp/migrate.log; then
     python manage.py migrate --noinput
 fi
 
+echo "Creando tabla de caché..."
+python manage.py createcachetable
+
 echo "Colectando archivos estáticos..."
 python manage.py collectstatic --no-input --clear
 
@@ -73,4 +76,9 @@ python manage.py cargar_obras_sociales
 echo "Migrando obras sociales existentes..."
 python manage.py migrar_obras_sociales
 
+if [ "$MEDITURNOS_SLOTS_MATERIALIZADOS" = "True" ]; then
+    echo "Regenerando tabla de slots..."
+    python manage.py regenerar_slots
+fi
+
 echo "Build completado exitosamente"
\ No newline at end of file
@@ -63,6 +63,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'appointments.context_processors.configuracion',
             ],
         },
     },
@@ -86,6 +87,34 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Tomar el lock de escritura al abrir la transacción: las escrituras
+            # concurrentes esperan en lugar de fallar con "database is locked"
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+        }
+    }
+
+# Caché compartida entre procesos de gunicorn
+# Redis si REDIS_URL está configurada (requiere el paquete redis), base de datos
+# en producción (requiere `python manage.py createcachetable`) y memoria local en desarrollo
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+elif os.environ.get('DATABASE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'mediturnos_cache',
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         }
     }
 
@@ -134,6 +163,11 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap4"
 CRISPY_TEMPLATE_PACK = "bootstrap4"
 
+# Disponibilidad materializada en la tabla Slot (opcional)
+# Requiere ejecutar `python manage.py regenerar_slots` una vez por día
+MEDITURNOS_SLOTS_MATERIALIZADOS = os.environ.get('MEDITURNOS_SLOTS_MATERIALIZADOS', 'False') == 'True'
+MEDITURNOS_SLOTS_HORIZONTE_DIAS = int(os.environ.get('MEDITURNOS_SLOTS_HORIZONTE_DIAS', '90'))
+
 # Login URLs
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
@@ -142,6 +176,13 @@ LOGOUT_REDIRECT_URL = 'inicio'
 # Auth User Model
 AUTH_USER_MODEL = 'appointments.Usuario'
 
+# Carga el perfil de médico o paciente junto con el usuario de la sesión.
+# ModelBackend queda para las sesiones iniciadas antes de agregar PerfilBackend
+AUTHENTICATION_BACKENDS = [
+    'appointments.autenticacion.PerfilBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 # Security settings for production
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
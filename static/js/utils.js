@@ -444,6 +444,102 @@ function initTooltips() {
     });
 }
 
+// ============================================
+// AUTOCOMPLETADO DE SELECTS
+// ============================================
+// Los selects con data-autocompletar-url se completan consultando el servidor
+// en lugar de traer todas las opciones con la página
+function setupAutocompletar(select) {
+    const url = select.dataset.autocompletarUrl;
+    const minimo = parseInt(select.dataset.autocompletarMinimo || '2');
+    const buscador = document.createElement('input');
+    buscador.type = 'search';
+    buscador.className = 'form-control mb-1';
+    buscador.placeholder = select.dataset.autocompletarPlaceholder || 'Escriba para buscar...';
+    buscador.autocomplete = 'off';
+    select.parentNode.insertBefore(buscador, select);
+    
+    let temporizador = null;
+    let consulta = null;
+    buscador.addEventListener('input', function() {
+        clearTimeout(temporizador);
+        const termino = this.value.trim();
+        if (termino.length < minimo) return;
+        
+        temporizador = setTimeout(() => {
+            if (consulta) consulta.abort();
+            consulta = new AbortController();
+            fetch(`${url}?q=${encodeURIComponent(termino)}`, { signal: consulta.signal })
+                .then(response => response.json())
+                .then(data => {
+                    const seleccionado = select.value;
+                    select.innerHTML = '';
+                    if (!select.required) {
+                        select.add(new Option('---------', ''));
+                    }
+                    data.resultados.forEach(item => {
+                        select.add(new Option(item.texto, item.id, false, String(item.id) === seleccionado));
+                    });
+                    if (!data.resultados.length) {
+                        select.add(new Option('Sin resultados', '', false, false));
+                    }
+                    select.dispatchEvent(new Event('change'));
+                })
+                .catch(error => {
+                    if (error.name !== 'AbortError') console.error('Error:', error);
+                });
+        }, 250);
+    });
+}
+
+// ============================================
+// DÍAS NO LABORABLES
+// ============================================
+// Feriados y cierres del consultorio por año, consultados una vez por
+// página (el navegador revalida con ETag); los fines de semana se
+// resuelven sin consultar
+const DiasNoLaborables = {
+    url: '/api/dias-no-laborables/',
+    porAnio: {},
+    motivos: {},
+    
+    cargar(anio) {
+        if (!this.porAnio[anio]) {
+            this.porAnio[anio] = fetch(`${this.url}?anio=${anio}`)
+                .then(response => {
+                    if (!response.ok) throw new Error(response.statusText);
+                    return response.json();
+                })
+                .then(data => {
+                    data.dias.forEach(dia => {
+                        this.motivos[dia.fecha] = dia.tipo === 'cierre'
+                            ? `El consultorio está cerrado: ${dia.motivo}`
+                            : `No se pueden solicitar turnos en feriados: ${dia.motivo}`;
+                    });
+                    return this.motivos;
+                })
+                .catch(error => {
+                    // Permitir reintentar; el servidor igual valida la fecha
+                    delete this.porAnio[anio];
+                    console.error('Error:', error);
+                    return this.motivos;
+                });
+        }
+        return this.porAnio[anio];
+    },
+    
+    // Motivo por el que la fecha (AAAA-MM-DD) no es laborable, o null.
+    // Los feriados y cierres solo se conocen después de cargar(anio).
+    motivo(fecha) {
+        const [anio, mes, dia] = fecha.split('-').map(Number);
+        const diaSemana = new Date(anio, mes - 1, dia).getDay();
+        if (diaSemana === 0 || diaSemana === 6) {
+            return 'No se pueden solicitar turnos los fines de semana';
+        }
+        return this.motivos[fecha] || null;
+    }
+};
+
 // ============================================
 // INICIALIZACIÓN AL CARGAR LA PÁGINA
 // ============================================
@@ -451,6 +547,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Inicializar tooltips
     initTooltips();
     
+    // Inicializar selects con autocompletado
+    document.querySelectorAll('select[data-autocompletar-url]').forEach(setupAutocompletar);
+    
     // Convertir mensajes de Django en toasts
     const djangoMessages = document.querySelectorAll('.alert');
     djangoMessages.forEach(alert => {